@@ -1,8 +1,12 @@
 """The Span Panel integration."""
 from __future__ import annotations
+import asyncio
+from collections.abc import Mapping
 from datetime import timedelta
 
 import logging
+import time
+from typing import TYPE_CHECKING, Any
 
 import async_timeout
 import httpx
@@ -12,15 +16,70 @@ from homeassistant.const import (
     CONF_ACCESS_TOKEN,
     CONF_HOST,
     CONF_SCAN_INTERVAL,
+    EVENT_HOMEASSISTANT_STOP,
     Platform,
 )
-from homeassistant.core import HomeAssistant
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
 from homeassistant.exceptions import ConfigEntryAuthFailed
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.event import async_call_later, async_track_time_interval
 from homeassistant.helpers.httpx_client import get_async_client
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+import homeassistant.util.dt as dt_util
 
-from .const import COORDINATOR, DOMAIN, NAME, DEFAULT_SCAN_INTERVAL
+from .const import (
+    ANOMALY_DETECTOR,
+    ANOMALY_SAVE_DELAY,
+    ANOMALY_STORAGE_VERSION,
+    ARCHIVE,
+    ARCHIVE_MAINTAIN_INTERVAL,
+    ARCHIVE_MIN_INTERVAL,
+    BURST_SAMPLER,
+    CONF_ARCHIVE,
+    CONF_CIRCUIT_GROUPS,
+    CONF_FED_FROM,
+    CONF_HEDGE_REQUESTS,
+    CONF_PHASE_LOCK,
+    CONF_SHED_HYSTERESIS,
+    CONF_SHED_LIMIT,
+    CONF_SITE_TOTALS,
+    CONF_STALE_AFTER,
+    COORDINATOR,
+    DEFAULT_SCAN_INTERVAL,
+    DEFAULT_SHED_HYSTERESIS,
+    DEFAULT_SHED_LIMIT,
+    DEFAULT_STALE_AFTER,
+    DOMAIN,
+    EVENT_CIRCUIT_ANOMALY,
+    EVENT_TRANSITION,
+    LIVE_OPTIONS,
+    LOAD_SHEDDER,
+    METRICS_EXPORTER,
+    NAME,
+    OPTIONS,
+    SECTION_PANEL,
+    SETUP_TIMER,
+    SHED_SAVE_DELAY,
+    SHED_STORAGE_VERSION,
+    SIGNAL_SITE_UPDATED,
+    SITE_AGGREGATOR,
+    UPDATE_TIMEOUT,
+)
+from .exceptions import SpanPanelReturnedEmptyData
 from .span_panel import SpanPanel
+from .span_panel_timing import SetupTimer
+from .util import async_import_module
+
+# Everything else is imported in the executor by the setup helper that uses
+# it; optional features only for entries that enable them.
+if TYPE_CHECKING:
+    from .span_panel_anomaly import SpanPanelAnomalyDetector
+    from .span_panel_archive import SpanPanelArchive
+    from .span_panel_burst import SpanPanelBurstSampler
+    from .span_panel_metrics import SpanPanelMetrics
+    from .span_panel_shedding import SpanPanelLoadShedder
+    from .span_panel_site import SpanPanelSite
 
 PLATFORMS: list[Platform] = [
     Platform.BINARY_SENSOR,
@@ -40,32 +99,71 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     host = config[CONF_HOST]
 
     _LOGGER.debug("ASYNC_SETUP_ENTRY %s", host)
+    timer = SetupTimer()
 
-    span_panel = SpanPanel(
-        host=config[CONF_HOST],
-        access_token=config[CONF_ACCESS_TOKEN],
-        async_client=get_async_client(hass),
-    )
+    with timer.phase("client"):
+        span_panel = SpanPanel(
+            host=config[CONF_HOST],
+            access_token=config[CONF_ACCESS_TOKEN],
+            async_client=get_async_client(hass),
+        )
+    span_panel.groups = entry.options.get(CONF_CIRCUIT_GROUPS, {})
 
     _LOGGER.debug("ASYNC_SETUP_ENTRY panel %s", span_panel)
 
     async def async_update_data():
         """Fetch data from API endpoint."""
-        async with async_timeout.timeout(30):
+        budget = min(UPDATE_TIMEOUT, span_panel.scan_interval)
+        # The sections enforce the budget themselves; this is only a backstop.
+        async with async_timeout.timeout(budget + 5):
             try:
-                await span_panel.update()
+                await span_panel.update(budget)
             except httpx.HTTPStatusError as err:
                 raise ConfigEntryAuthFailed from err
             except httpx.HTTPError as err:
                 raise UpdateFailed(f"Error communicating with API: {err}") from err
-
+            except SpanPanelReturnedEmptyData as err:
+                raise UpdateFailed("Span Panel API returned empty result") from err
+            finally:
+                _async_schedule_phase_poll()
             return span_panel
 
+    cancel_phase_poll: CALLBACK_TYPE | None = None
+
+    @callback
+    def _async_schedule_phase_poll() -> None:
+        """
+        With phase lock on the coordinator has no update interval, because it
+        rounds every refresh to its own whole-second slot; the next poll is
+        scheduled here at the instant the phase lock picked instead.
+        """
+        nonlocal cancel_phase_poll
+        if cancel_phase_poll is not None:
+            cancel_phase_poll()
+            cancel_phase_poll = None
+        if (phase := span_panel.phase) is None:
+            return
+        now = time.monotonic()
+        delay = phase.next_delay(now)
+        _LOGGER.debug("Sample age %s, next poll in %.3fs", phase.age(now), delay)
+        cancel_phase_poll = async_call_later(hass, delay, _async_phase_poll)
+
+    async def _async_phase_poll(_now) -> None:
+        nonlocal cancel_phase_poll
+        cancel_phase_poll = None
+        await coordinator.async_refresh()
+
+    @callback
+    def _async_cancel_phase_poll() -> None:
+        if cancel_phase_poll is not None:
+            cancel_phase_poll()
+
     name = "SN-TODO"
 
     scan_interval: int = entry.options.get(
         CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL.seconds
     )
+    span_panel.scan_interval = scan_interval
 
     coordinator = DataUpdateCoordinator(
         hass,
@@ -75,26 +173,371 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         update_interval=timedelta(seconds=scan_interval),
     )
 
-    await coordinator.async_config_entry_first_refresh()
+    async def _async_first_refresh() -> None:
+        # Every update accounts energy, so the first one needs its module.
+        await async_import_module(hass, "span_panel_energy", timer)
+        with timer.phase("first_refresh"):
+            await coordinator.async_config_entry_first_refresh()
+
+    async def _async_import_platforms() -> None:
+        modules = [platform.value for platform in PLATFORMS]
+        modules += ["span_panel_analytics", "span_panel_legs"]
+        if span_panel.groups:
+            modules.append("span_panel_groups")
+        if entry.options.get(CONF_PHASE_LOCK, False):
+            modules.append("span_panel_phase")
+        await asyncio.gather(
+            *(async_import_module(hass, module, timer) for module in modules)
+        )
+
+    # Entities need the first snapshot, but the platform modules and the views
+    # behind their values do not: they are imported in the executor while the
+    # panel answers.
+    await asyncio.gather(_async_first_refresh(), _async_import_platforms())
+
+    with timer.phase("helpers"):
+        # Each waits on its own imports or storage, so they run side by side.
+        load_shedder, anomaly_detector, archive, *_ = await asyncio.gather(
+            async_setup_load_shedder(hass, entry, coordinator, timer),
+            async_setup_anomaly_detection(hass, entry, coordinator, timer),
+            async_setup_archive(hass, entry, coordinator, timer),
+            async_setup_stream(hass, entry, coordinator, timer),
+            async_setup_transitions(hass, entry, coordinator, timer),
+            async_setup_site_member(hass, entry, coordinator, timer),
+            async_setup_metrics(hass, entry, coordinator, timer),
+        )
 
     entry.async_on_unload(entry.add_update_listener(update_listener))
+    entry.async_on_unload(_async_cancel_phase_poll)
 
     hass.data.setdefault(DOMAIN, {})
     hass.data[DOMAIN][entry.entry_id] = {
         COORDINATOR: coordinator,
         NAME: name,
+        OPTIONS: dict(entry.options),
+        # Created by the first burst_capture call.
+        BURST_SAMPLER: None,
+        LOAD_SHEDDER: load_shedder,
+        ANOMALY_DETECTOR: anomaly_detector,
+        ARCHIVE: archive,
+        SETUP_TIMER: timer,
     }
+    apply_live_options(hass.data[DOMAIN][entry.entry_id], entry.options)
 
-    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    async def _async_forward(platform: Platform) -> None:
+        with timer.phase(f"platform_{platform.value}"):
+            await hass.config_entries.async_forward_entry_setups(entry, [platform])
 
+    await asyncio.gather(*(_async_forward(platform) for platform in PLATFORMS))
+    services = await async_import_module(hass, "services", timer)
+    services.async_register_services(hass)
+
+    timer.finish()
+    _LOGGER.debug(
+        "Set up %s in %.1f ms, %.1f ms of it importing: %s",
+        host,
+        timer.total * 1000,
+        timer.imports * 1000,
+        timer.as_dict(),
+    )
     return True
 
 
+async def async_setup_stream(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    coordinator: DataUpdateCoordinator,
+    timer: SetupTimer,
+) -> None:
+    """
+    Prefer pushed updates when the panel offers an event stream; polling
+    keeps running underneath and takes over whenever the stream is down.
+    """
+    span_panel: SpanPanel = coordinator.data
+    # SpanPanel.start_stream imports it, but without blocking the loop here.
+    await async_import_module(hass, "span_panel_stream", timer)
+    span_panel.start_stream(lambda: coordinator.async_set_updated_data(span_panel))
+    entry.async_on_unload(span_panel.stop_stream)
+
+
+async def async_setup_load_shedder(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    coordinator: DataUpdateCoordinator,
+    timer: SetupTimer,
+) -> SpanPanelLoadShedder | None:
+    """
+    Create the load shedder with the circuits it had shed before the entry
+    was last stopped, saving the shed set whenever it changes. The shedder
+    is started by apply_live_options. Entries with shedding off and nothing
+    left to restore get no shedder at all.
+    """
+    store = Store(hass, SHED_STORAGE_VERSION, f"{DOMAIN}.shed.{entry.entry_id}")
+    saved = await store.async_load() or {}
+    enabled = entry.options.get(CONF_SHED_LIMIT, DEFAULT_SHED_LIMIT) > 0
+    if not enabled and not saved.get("shed"):
+        return None
+
+    shedding = await async_import_module(hass, "span_panel_shedding", timer)
+
+    @callback
+    def _async_shed_changed() -> None:
+        store.async_delay_save(load_shedder.to_dict, SHED_SAVE_DELAY)
+        hass.async_create_task(coordinator.async_request_refresh())
+
+    load_shedder: SpanPanelLoadShedder = shedding.SpanPanelLoadShedder(
+        coordinator.data, _async_shed_changed
+    )
+    load_shedder.load(saved)
+    entry.async_on_unload(load_shedder.stop)
+    return load_shedder
+
+
+async def async_setup_anomaly_detection(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    coordinator: DataUpdateCoordinator,
+    timer: SetupTimer,
+) -> SpanPanelAnomalyDetector:
+    """
+    Feed every fresh circuit reading to an anomaly detector whose learned
+    statistics survive restarts, firing an event when a circuit starts or
+    stops behaving abnormally.
+    """
+    span_panel: SpanPanel = coordinator.data
+    anomaly = await async_import_module(hass, "span_panel_anomaly", timer)
+    detector: SpanPanelAnomalyDetector = anomaly.SpanPanelAnomalyDetector()
+    store = Store(hass, ANOMALY_STORAGE_VERSION, f"{DOMAIN}.anomaly.{entry.entry_id}")
+    detector.load(await store.async_load() or {})
+
+    @callback
+    def _async_detect_anomalies() -> None:
+        if not coordinator.last_update_success:
+            return
+        now = dt_util.now()
+        seconds_of_day = now.hour * 3600 + now.minute * 60 + now.second
+        for transition in detector.update(
+            span_panel.circuits, seconds_of_day, now.timestamp(), span_panel.stale
+        ):
+            hass.bus.async_fire(
+                EVENT_CIRCUIT_ANOMALY,
+                {
+                    "serial_number": span_panel.status.serial_number,
+                    "circuit_id": transition.circuit_id,
+                    "circuit": span_panel.circuits[transition.circuit_id].name,
+                    "anomalous": transition.anomalous,
+                    "z_score": round(transition.z_score, 2),
+                    "expected_power": round(transition.expected, 1),
+                    "power": round(transition.level, 1),
+                },
+            )
+        store.async_delay_save(detector.to_dict, ANOMALY_SAVE_DELAY)
+
+    entry.async_on_unload(coordinator.async_add_listener(_async_detect_anomalies))
+    return detector
+
+
+async def async_setup_archive(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    coordinator: DataUpdateCoordinator,
+    timer: SetupTimer,
+) -> SpanPanelArchive | None:
+    """
+    Append every coordinator update to the panel's on-disk archive when the
+    archive option is on. Samples are written in batches, and whatever is
+    still buffered is flushed when Home Assistant stops. File IO runs in the
+    executor.
+    """
+    if not entry.options.get(CONF_ARCHIVE, False):
+        return None
+
+    archive_module = await async_import_module(hass, "span_panel_archive", timer)
+
+    span_panel: SpanPanel = coordinator.data
+    directory = hass.config.path(DOMAIN, span_panel.status.serial_number)
+    archive: SpanPanelArchive = archive_module.SpanPanelArchive(directory)
+    await hass.async_add_executor_job(archive.open, time.time())
+    last_appended = 0.0
+
+    @callback
+    def _async_archive_sample() -> None:
+        nonlocal last_appended
+        if not coordinator.last_update_success:
+            return
+        now = time.time()
+        # Pushed updates can arrive per circuit; one sample a second is plenty.
+        if now - last_appended < ARCHIVE_MIN_INTERVAL:
+            return
+        last_appended = now
+        values = archive_module.archive_sample(
+            span_panel.panel, span_panel.circuits, span_panel.stale
+        )
+        if values:
+            hass.async_add_executor_job(archive.append, now, values)
+
+    async def _async_maintain(_now) -> None:
+        await hass.async_add_executor_job(archive.maintain, time.time())
+
+    async def _async_close() -> None:
+        await hass.async_add_executor_job(archive.close)
+
+    async def _async_flush(_event) -> None:
+        await hass.async_add_executor_job(archive.flush)
+
+    entry.async_on_unload(coordinator.async_add_listener(_async_archive_sample))
+    entry.async_on_unload(
+        async_track_time_interval(hass, _async_maintain, ARCHIVE_MAINTAIN_INTERVAL)
+    )
+    entry.async_on_unload(
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _async_flush)
+    )
+    entry.async_on_unload(lambda: hass.async_create_task(_async_close()))
+    await _async_maintain(None)
+    return archive
+
+
+async def async_setup_transitions(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    coordinator: DataUpdateCoordinator,
+    timer: SetupTimer,
+) -> None:
+    """
+    Diff every coordinator update against the previous one and fire an
+    EVENT_TRANSITION for each relay, priority, door, link or main relay
+    change, so automations can listen to one event instead of many entities.
+    """
+    span_panel: SpanPanel = coordinator.data
+    transitions = await async_import_module(hass, "span_panel_transitions", timer)
+    tracker = transitions.SpanPanelTransitionTracker()
+
+    @callback
+    def _async_fire_transitions() -> None:
+        if not coordinator.last_update_success:
+            return
+        for transition in tracker.update(
+            span_panel.status, span_panel.panel, span_panel.circuits
+        ):
+            event_data = {
+                "serial_number": span_panel.status.serial_number,
+                "type": transition.type,
+                "from": transition.previous,
+                "to": transition.current,
+            }
+            if transition.circuit_id is not None:
+                event_data["circuit_id"] = transition.circuit_id
+                event_data["circuit"] = span_panel.circuits[
+                    transition.circuit_id
+                ].name
+            hass.bus.async_fire(EVENT_TRANSITION, event_data)
+
+    entry.async_on_unload(coordinator.async_add_listener(_async_fire_transitions))
+    _async_fire_transitions()
+
+
+async def async_setup_site_member(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    coordinator: DataUpdateCoordinator,
+    timer: SetupTimer,
+) -> None:
+    """
+    Add the panel to the site shared by all entries, signalling site sensors
+    whenever a round of samples from every panel is complete or the totals
+    stop or start being current.
+    """
+    span_panel: SpanPanel = coordinator.data
+    serial_number = span_panel.status.serial_number
+    site_module = await async_import_module(hass, "span_panel_site", timer)
+    site: SpanPanelSite = hass.data.setdefault(
+        SITE_AGGREGATOR, site_module.SpanPanelSite()
+    )
+    site.add(serial_number, entry.options.get(CONF_FED_FROM) or None)
+    site_totals = entry.options.get(CONF_SITE_TOTALS, False)
+
+    @callback
+    def _async_update_site() -> None:
+        now = time.monotonic()
+        was_current = site.is_current(now)
+        site.mark_stale(
+            serial_number,
+            not coordinator.last_update_success or SECTION_PANEL in span_panel.stale,
+            span_panel.stale_after,
+        )
+        sampled_at = span_panel.fetched_at.get(SECTION_PANEL)
+        closed = (
+            coordinator.last_update_success
+            and sampled_at is not None
+            and site.update(serial_number, span_panel.panel, sampled_at)
+        )
+        if closed or site.is_current(now) != was_current:
+            async_dispatcher_send(hass, SIGNAL_SITE_UPDATED)
+
+    @callback
+    def _async_leave_site() -> None:
+        site.remove(serial_number)
+        # Turning the site totals off reloads the entry with the option unset;
+        # only then are the site sensors not handed to another member.
+        site.release_sensors(
+            entry.entry_id,
+            hand_off=not site_totals or entry.options.get(CONF_SITE_TOTALS, False),
+        )
+        async_dispatcher_send(hass, SIGNAL_SITE_UPDATED)
+
+    entry.async_on_unload(coordinator.async_add_listener(_async_update_site))
+    entry.async_on_unload(_async_leave_site)
+    _async_update_site()
+
+
+async def async_setup_metrics(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    coordinator: DataUpdateCoordinator,
+    timer: SetupTimer,
+) -> None:
+    """
+    Re-render the panel's OpenMetrics samples on every coordinator update,
+    so the metrics view only ever serves a prebuilt buffer. The views live
+    in the export module and are registered along with it.
+    """
+    span_panel: SpanPanel = coordinator.data
+    serial_number = span_panel.status.serial_number
+    metrics_module, export = await asyncio.gather(
+        async_import_module(hass, "span_panel_metrics", timer),
+        async_import_module(hass, "export", timer),
+    )
+    metrics: SpanPanelMetrics = hass.data.setdefault(
+        METRICS_EXPORTER, metrics_module.SpanPanelMetrics()
+    )
+    export.async_register_views(hass)
+
+    @callback
+    def _async_update_metrics() -> None:
+        if coordinator.last_update_success:
+            metrics.update(
+                serial_number, span_panel.panel, span_panel.circuits, span_panel.stale
+            )
+
+    entry.async_on_unload(coordinator.async_add_listener(_async_update_metrics))
+    entry.async_on_unload(lambda: metrics.remove(serial_number))
+    _async_update_metrics()
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """
     Unload a config entry.
     """
     _LOGGER.debug("ASYNC_UNLOAD")
+    data: dict = hass.data[DOMAIN][entry.entry_id]
+    # Circuits must not stay shed once nothing is left to restore them.
+    load_shedder: SpanPanelLoadShedder | None = data[LOAD_SHEDDER]
+    if load_shedder is not None:
+        await load_shedder.async_stop()
+    burst_sampler: SpanPanelBurstSampler | None = data[BURST_SAMPLER]
+    if burst_sampler is not None:
+        burst_sampler.stop()
+
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
         hass.data[DOMAIN].pop(entry.entry_id)
 
@@ -104,5 +547,69 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 async def update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
     """
     Update listener.
+
+    Options listed in LIVE_OPTIONS are applied to the running coordinator;
+    any other change falls back to a full reload of the entry.
+    """
+    data: dict = hass.data[DOMAIN][entry.entry_id]
+    applied: dict = data[OPTIONS]
+
+    changed = {
+        key
+        for key in applied.keys() | entry.options.keys()
+        if applied.get(key) != entry.options.get(key)
+    }
+    if not changed:
+        return
+
+    if not changed <= LIVE_OPTIONS:
+        _LOGGER.debug("Reloading for options %s", changed - LIVE_OPTIONS)
+        await hass.config_entries.async_reload(entry.entry_id)
+        return
+    if data[LOAD_SHEDDER] is None and entry.options.get(
+        CONF_SHED_LIMIT, DEFAULT_SHED_LIMIT
+    ):
+        # Shedding is turned on for the first time: the shedder and its sensor
+        # are only set up for entries that shed.
+        _LOGGER.debug("Reloading to start load shedding")
+        await hass.config_entries.async_reload(entry.entry_id)
+        return
+
+    _LOGGER.debug("Applying options %s in place", changed)
+    if entry.options.get(CONF_PHASE_LOCK, False):
+        await async_import_module(hass, "span_panel_phase")
+    apply_live_options(data, entry.options)
+    data[OPTIONS] = dict(entry.options)
+
+    # Refreshing reschedules the next poll with the new interval.
+    await data[COORDINATOR].async_request_refresh()
+
+
+def apply_live_options(data: dict, options: Mapping[str, Any]) -> None:
+    """
+    Push every option in LIVE_OPTIONS to the running entry.
     """
-    await hass.config_entries.async_reload(entry.entry_id)
+    coordinator: DataUpdateCoordinator = data[COORDINATOR]
+    span_panel: SpanPanel = coordinator.data
+    span_panel.scan_interval = options.get(
+        CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL.seconds
+    )
+    span_panel.set_phase_lock(options.get(CONF_PHASE_LOCK, False))
+    # Phase-locked polls are scheduled by async_update_data instead.
+    coordinator.update_interval = (
+        None
+        if span_panel.phase is not None
+        else timedelta(seconds=span_panel.scan_interval)
+    )
+    span_panel.api.hedge = options.get(CONF_HEDGE_REQUESTS, False)
+    # Never shorter than a poll, or every value would go stale between polls.
+    span_panel.stale_after = max(
+        options.get(CONF_STALE_AFTER, DEFAULT_STALE_AFTER), span_panel.scan_interval
+    )
+
+    load_shedder: SpanPanelLoadShedder | None = data[LOAD_SHEDDER]
+    if load_shedder is not None:
+        load_shedder.configure(
+            options.get(CONF_SHED_LIMIT, DEFAULT_SHED_LIMIT),
+            options.get(CONF_SHED_HYSTERESIS, DEFAULT_SHED_HYSTERESIS),
+        )
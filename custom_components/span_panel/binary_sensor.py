@@ -18,11 +18,12 @@ from homeassistant.helpers.update_coordinator import (
     DataUpdateCoordinator,
 )
 
-from .const import COORDINATOR, DOMAIN
+from .const import ANOMALY_DETECTOR, COORDINATOR, DOMAIN, SECTION_STATUS
 from .span_panel import SpanPanel
+from .span_panel_anomaly import SpanPanelAnomalyDetector
 from .span_panel_api import SpanPanelApi
 from .span_panel_status import SpanPanelStatus
-from .util import panel_to_device_info
+from .util import panel_to_device_info, section_attributes
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -95,6 +96,52 @@ class SpanPanelBinarySensor(CoordinatorEntity, BinarySensorEntity):
         span_panel: SpanPanel = self.coordinator.data
         return self.entity_description.value_fn(span_panel.status)
 
+    @property
+    def available(self) -> bool:
+        span_panel: SpanPanel = self.coordinator.data
+        return super().available and span_panel.is_available(SECTION_STATUS)
+
+    @property
+    def extra_state_attributes(self) -> dict | None:
+        span_panel: SpanPanel = self.coordinator.data
+        return section_attributes(span_panel, SECTION_STATUS)
+
+
+class SpanPanelAnomalyBinarySensor(CoordinatorEntity, BinarySensorEntity):
+    """On while any circuit's draw is far from its learned pattern."""
+
+    _attr_name = "Circuit Anomaly"
+    _attr_device_class = BinarySensorDeviceClass.PROBLEM
+
+    def __init__(
+        self,
+        coordinator: DataUpdateCoordinator,
+        detector: SpanPanelAnomalyDetector,
+    ) -> None:
+        """Initialize Span Panel anomaly entity."""
+        span_panel: SpanPanel = coordinator.data
+
+        self.detector = detector
+        self._attr_unique_id = f"span_{span_panel.status.serial_number}_anomaly"
+        self._attr_device_info = panel_to_device_info(span_panel)
+
+        super().__init__(coordinator)
+
+    @property
+    def is_on(self) -> bool:
+        return bool(self.detector.anomalous)
+
+    @property
+    def extra_state_attributes(self) -> dict:
+        span_panel: SpanPanel = self.coordinator.data
+        return {
+            "circuits": [
+                span_panel.circuits[id].name
+                for id in self.detector.anomalous
+                if id in span_panel.circuits
+            ]
+        }
+
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -108,9 +155,11 @@ async def async_setup_entry(
     data: dict = hass.data[DOMAIN][config_entry.entry_id]
     coordinator: DataUpdateCoordinator = data[COORDINATOR]
 
-    entities: list[SpanPanelBinarySensor] = []
+    entities: list[SpanPanelBinarySensor | SpanPanelAnomalyBinarySensor] = []
 
     for description in BINARY_SENSORS:
         entities.append(SpanPanelBinarySensor(coordinator, description))
 
+    entities.append(SpanPanelAnomalyBinarySensor(coordinator, data[ANOMALY_DETECTOR]))
+
     async_add_entities(entities)
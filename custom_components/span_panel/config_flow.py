@@ -11,11 +11,36 @@ from homeassistant.components import zeroconf
 from homeassistant.const import CONF_ACCESS_TOKEN, CONF_HOST, CONF_SCAN_INTERVAL
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.data_entry_flow import FlowResult
+import homeassistant.helpers.config_validation as cv
 from homeassistant.helpers.httpx_client import get_async_client
+from homeassistant.helpers.typing import DiscoveryInfoType
 from homeassistant.util.network import is_ipv4_address
 
-from .const import DOMAIN, DEFAULT_SCAN_INTERVAL
+from .const import (
+    CONF_ARCHIVE,
+    CONF_CIRCUIT_GROUPS,
+    CONF_FED_FROM,
+    CONF_GROUP_CIRCUITS,
+    CONF_GROUP_NAME,
+    CONF_REMOVE_GROUPS,
+    CONF_SERIAL_NUMBER,
+    CONF_HEDGE_REQUESTS,
+    CONF_PHASE_LOCK,
+    CONF_SHED_HYSTERESIS,
+    CONF_SHED_LIMIT,
+    CONF_SITE_TOTALS,
+    CONF_STALE_AFTER,
+    COORDINATOR,
+    DEFAULT_SCAN_INTERVAL,
+    DEFAULT_SHED_HYSTERESIS,
+    DEFAULT_SHED_LIMIT,
+    DEFAULT_STALE_AFTER,
+    DOMAIN,
+    LANE_PROBE,
+)
 from .span_panel_api import SpanPanelApi
+from .span_panel_discovery import scan_subnet
+from .span_panel_onboarding import onboard_hosts, parse_host_list
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -72,7 +97,7 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         assert self._is_flow_setup is False
 
         span_api = create_api_controller(self.hass, host)
-        panel_status = await span_api.get_status_data()
+        panel_status = await span_api.get_status_data(lane=LANE_PROBE)
 
         self.trigger_flow_type = trigger_type
         self.host = host
@@ -98,18 +123,29 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         """
         Handle a flow initiated by zeroconf discovery.
         """
+        return await self.async_step_discovered_host(discovery_info.host)
+
+    async def async_step_integration_discovery(
+        self, discovery_info: DiscoveryInfoType
+    ) -> FlowResult:
+        """
+        Handle a flow initiated by a subnet scan.
+        """
+        return await self.async_step_discovered_host(discovery_info[CONF_HOST])
+
+    async def async_step_discovered_host(self, host: str) -> FlowResult:
         # Do not probe device if the host is already configured
-        self._async_abort_entries_match({CONF_HOST: discovery_info.host})
+        self._async_abort_entries_match({CONF_HOST: host})
 
         # Do not probe device if it is not an ipv4 address
-        if not is_ipv4_address(discovery_info.host):
+        if not is_ipv4_address(host):
             return self.async_abort(reason="not_ipv4_address")
 
         # Validate that this is a valid Span Panel
-        if not await validate_host(self.hass, discovery_info.host):
+        if not await validate_host(self.hass, host):
             return self.async_abort(reason="not_span_panel")
 
-        await self.setup_flow(TriggerFlowType.CREATE_ENTRY, discovery_info.host)
+        await self.setup_flow(TriggerFlowType.CREATE_ENTRY, host)
         await self.ensure_not_already_configured()
         return await self.async_step_confirm_discovery()
 
@@ -125,6 +161,16 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 step_id="user", data_schema=STEP_USER_DATA_SCHEMA
             )
 
+        # A subnet such as 192.168.10.0/24 is scanned instead
+        if "/" in user_input[CONF_HOST]:
+            return await self.async_step_scan(user_input[CONF_HOST])
+
+        # Several hosts, or hosts with tokens, are onboarded together
+        if len(parse_host_list(user_input[CONF_HOST])) > 1 or (
+            "=" in user_input[CONF_HOST]
+        ):
+            return await self.async_step_fleet(user_input[CONF_HOST])
+
         # Validate host is a valid Span Panel, prompt user again
         if not await validate_host(self.hass, user_input[CONF_HOST]):
             return self.async_show_form(
@@ -137,6 +183,97 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         await self.ensure_not_already_configured()
         return await self.async_step_choose_auth_type()
 
+    async def async_step_scan(self, network: str) -> FlowResult:
+        """
+        Scan a subnet and offer each new panel found as a discovered panel.
+        """
+        try:
+            found = await scan_subnet(get_async_client(self.hass), network)
+        except ValueError:
+            return self.async_show_form(
+                step_id="user",
+                data_schema=STEP_USER_DATA_SCHEMA,
+                errors={"base": "invalid_network"},
+            )
+
+        configured = {entry.unique_id for entry in self._async_current_entries()}
+        found = {
+            serial: host for serial, host in found.items() if serial not in configured
+        }
+        if not found:
+            return self.async_show_form(
+                step_id="user",
+                data_schema=STEP_USER_DATA_SCHEMA,
+                errors={"base": "no_panels_found"},
+            )
+
+        for host in found.values():
+            self.hass.async_create_task(
+                self.hass.config_entries.flow.async_init(
+                    DOMAIN,
+                    context={"source": config_entries.SOURCE_INTEGRATION_DISCOVERY},
+                    data={CONF_HOST: host},
+                )
+            )
+        return self.async_abort(
+            reason="scan_complete", description_placeholders={"count": len(found)}
+        )
+
+    async def async_step_fleet(self, host_list: str) -> FlowResult:
+        """
+        Validate a list of hosts concurrently, registering tokens where
+        proximity is proven, and create an entry for every panel that passed.
+        The abort message reports the outcome for each host.
+        """
+        targets = parse_host_list(host_list)
+        configured = {entry.unique_id for entry in self._async_current_entries()}
+        results = await onboard_hosts(
+            get_async_client(self.hass), targets, configured
+        )
+
+        for result in results:
+            if result.ok:
+                self.hass.async_create_task(
+                    self.hass.config_entries.flow.async_init(
+                        DOMAIN,
+                        context={"source": config_entries.SOURCE_IMPORT},
+                        data={
+                            CONF_HOST: result.host,
+                            CONF_ACCESS_TOKEN: result.access_token,
+                            CONF_SERIAL_NUMBER: result.serial_number,
+                        },
+                    )
+                )
+        report = "\n".join(
+            f"{result.host}: {result.serial_number or '-'} "
+            f"{'added' if result.ok else result.error}"
+            for result in results
+        )
+        _LOGGER.info("Fleet onboarding:\n%s", report)
+        return self.async_abort(
+            reason="fleet_complete",
+            description_placeholders={
+                "added": sum(result.ok for result in results),
+                "count": len(results),
+                "report": report,
+            },
+        )
+
+    async def async_step_import(self, import_data: dict[str, Any]) -> FlowResult:
+        """
+        Create an entry for a panel that was already validated, such as one
+        from fleet onboarding.
+        """
+        await self.async_set_unique_id(import_data[CONF_SERIAL_NUMBER])
+        self._abort_if_unique_id_configured(
+            updates={CONF_HOST: import_data[CONF_HOST]}
+        )
+        return self.create_new_entry(
+            import_data[CONF_HOST],
+            import_data[CONF_SERIAL_NUMBER],
+            import_data[CONF_ACCESS_TOKEN],
+        )
+
     async def async_step_reauth(self, entry_data: Mapping[str, Any]) -> FlowResult:
         """
         Handle a flow initiated by re-auth.
@@ -188,7 +325,7 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         self.ensure_flow_is_set_up()
 
         span_api = create_api_controller(self.hass, self.host)
-        panel_status = await span_api.get_status_data()
+        panel_status = await span_api.get_status_data(lane=LANE_PROBE)
 
         #Check if running firmware newer or older than r202342
         if panel_status.proximity_proven is not None:
@@ -298,16 +435,53 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 class OptionsFlowHandler(config_entries.OptionsFlow):
     def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
         self.config_entry = config_entry
+        self.options: dict[str, Any] = {}
 
     async def async_step_init(
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
+        errors: dict[str, str] = {}
         if user_input is not None:
-            return self.async_create_entry(title="", data=user_input)
+            # Site sensors have one set of unique ids, so one panel owns them.
+            if user_input.get(CONF_SITE_TOTALS) and any(
+                entry.options.get(CONF_SITE_TOTALS, False)
+                for entry in self.hass.config_entries.async_entries(DOMAIN)
+                if entry.entry_id != self.config_entry.entry_id
+            ):
+                errors[CONF_SITE_TOTALS] = "site_totals_taken"
+            # Anything shorter would drop entities on the first missed poll.
+            elif user_input[CONF_STALE_AFTER] < user_input[CONF_SCAN_INTERVAL]:
+                errors[CONF_STALE_AFTER] = "stale_after_too_short"
+            else:
+                self.options = user_input
+                return await self.async_step_circuit_groups()
 
         curr_scan_interval = self.config_entry.options.get(
             CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL.seconds
         )
+        curr_shed_limit = self.config_entry.options.get(
+            CONF_SHED_LIMIT, DEFAULT_SHED_LIMIT
+        )
+        curr_shed_hysteresis = self.config_entry.options.get(
+            CONF_SHED_HYSTERESIS, DEFAULT_SHED_HYSTERESIS
+        )
+        curr_hedge_requests = self.config_entry.options.get(
+            CONF_HEDGE_REQUESTS, False
+        )
+        curr_stale_after = self.config_entry.options.get(
+            CONF_STALE_AFTER, DEFAULT_STALE_AFTER
+        )
+        curr_fed_from = self.config_entry.options.get(CONF_FED_FROM, "")
+        curr_site_totals = self.config_entry.options.get(CONF_SITE_TOTALS, False)
+        curr_archive = self.config_entry.options.get(CONF_ARCHIVE, False)
+        curr_phase_lock = self.config_entry.options.get(CONF_PHASE_LOCK, False)
+
+        # A sub-panel can name any other configured panel as its feed.
+        other_panels = {
+            entry.unique_id: entry.title
+            for entry in self.hass.config_entries.async_entries(DOMAIN)
+            if entry.entry_id != self.config_entry.entry_id and entry.unique_id
+        }
 
         return self.async_show_form(
             step_id="init",
@@ -316,6 +490,75 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                     vol.Optional(
                         CONF_SCAN_INTERVAL, default=curr_scan_interval
                     ): vol.All(int, vol.Range(min=5)),
+                    vol.Optional(
+                        CONF_SHED_LIMIT, default=curr_shed_limit
+                    ): vol.All(int, vol.Range(min=0)),
+                    vol.Optional(
+                        CONF_SHED_HYSTERESIS, default=curr_shed_hysteresis
+                    ): vol.All(int, vol.Range(min=0)),
+                    vol.Optional(
+                        CONF_HEDGE_REQUESTS, default=curr_hedge_requests
+                    ): bool,
+                    vol.Optional(
+                        CONF_STALE_AFTER, default=curr_stale_after
+                    ): vol.All(int, vol.Range(min=0)),
+                    vol.Optional(CONF_FED_FROM, default=curr_fed_from): vol.In(
+                        {"": "None", **other_panels}
+                    ),
+                    vol.Optional(
+                        CONF_SITE_TOTALS, default=curr_site_totals
+                    ): bool,
+                    vol.Optional(CONF_ARCHIVE, default=curr_archive): bool,
+                    vol.Optional(CONF_PHASE_LOCK, default=curr_phase_lock): bool,
                 }
             ),
+            errors=errors,
         )
+
+    async def async_step_circuit_groups(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """
+        Add or replace one circuit group, or remove existing ones. Groups
+        can only be edited while the entry is loaded and its circuits known.
+        """
+        groups: dict[str, list[str]] = dict(
+            self.config_entry.options.get(CONF_CIRCUIT_GROUPS, {})
+        )
+        entry_data = self.hass.data.get(DOMAIN, {}).get(self.config_entry.entry_id)
+        if entry_data is None:
+            return self.create_options_entry(groups)
+
+        if user_input is not None:
+            for name in user_input.get(CONF_REMOVE_GROUPS, []):
+                groups.pop(name, None)
+            name = user_input.get(CONF_GROUP_NAME, "").strip()
+            if name and user_input.get(CONF_GROUP_CIRCUITS):
+                groups[name] = user_input[CONF_GROUP_CIRCUITS]
+            return self.create_options_entry(groups)
+
+        circuits = entry_data[COORDINATOR].data.circuits
+        return self.async_show_form(
+            step_id="circuit_groups",
+            data_schema=vol.Schema(
+                {
+                    vol.Optional(CONF_GROUP_NAME): str,
+                    vol.Optional(CONF_GROUP_CIRCUITS, default=[]): cv.multi_select(
+                        {id: circuit.name for id, circuit in circuits.items()}
+                    ),
+                    vol.Optional(CONF_REMOVE_GROUPS, default=[]): cv.multi_select(
+                        {name: name for name in groups}
+                    ),
+                }
+            ),
+            description_placeholders={
+                "groups": ", ".join(groups) or "none",
+            },
+        )
+
+    def create_options_entry(self, groups: dict[str, list[str]]) -> FlowResult:
+        # Only store groups once there are some, so entries that never use
+        # them do not reload for a new empty option.
+        if groups or CONF_CIRCUIT_GROUPS in self.config_entry.options:
+            self.options[CONF_CIRCUIT_GROUPS] = groups
+        return self.async_create_entry(title="", data=self.options)
@@ -6,20 +6,47 @@ from datetime import timedelta
 DOMAIN = "span_panel"
 COORDINATOR = "coordinator"
 NAME = "name"
+OPTIONS = "options"
+BURST_SAMPLER = "burst_sampler"
+LOAD_SHEDDER = "load_shedder"
+ANOMALY_DETECTOR = "anomaly_detector"
+ARCHIVE = "archive"
+SETUP_TIMER = "setup_timer"
+# Shared by all entries, so kept outside hass.data[DOMAIN].
+SITE_AGGREGATOR = f"{DOMAIN}_site"
+SIGNAL_SITE_UPDATED = f"{DOMAIN}_site_updated"
+METRICS_EXPORTER = f"{DOMAIN}_metrics"
 
 CONF_SERIAL_NUMBER = "serial_number"
+CONF_SHED_LIMIT = "shed_limit"
+CONF_SHED_HYSTERESIS = "shed_hysteresis"
+CONF_HEDGE_REQUESTS = "hedge_requests"
+CONF_STALE_AFTER = "stale_after"
+CONF_CIRCUIT_GROUPS = "circuit_groups"
+CONF_GROUP_NAME = "group_name"
+CONF_GROUP_CIRCUITS = "group_circuits"
+CONF_REMOVE_GROUPS = "remove_groups"
+CONF_FED_FROM = "fed_from"
+CONF_SITE_TOTALS = "site_totals"
+CONF_ARCHIVE = "archive"
+CONF_PHASE_LOCK = "phase_lock"
 
 URL_STATUS = "http://{}/api/v1/status"
 URL_SPACES = "http://{}/api/v1/spaces"
 URL_CIRCUITS = "http://{}/api/v1/circuits"
 URL_PANEL = "http://{}/api/v1/panel"
 URL_REGISTER = "http://{}/api/v1/auth/register"
+# Panel firmware does not serve a stream yet; it answers 404 and the stream is
+# re-probed every STREAM_UNSUPPORTED_RETRY. scripts/stream_server.py serves a
+# stand-in.
+URL_STREAM = "http://{}/api/v1/stream"
 
 CIRCUITS_NAME = "name"
 CIRCUITS_RELAY = "relayState"
 CIRCUITS_POWER = "instantPowerW"
 CIRCUITS_ENERGY_PRODUCED = "producedEnergyWh"
 CIRCUITS_ENERGY_CONSUMED = "consumedEnergyWh"
+CIRCUITS_AVERAGE_POWER = "averagePowerW"
 CIRCUITS_BREAKER_POSITIONS = "tabs"
 CIRCUITS_PRIORITY = "priority"
 CIRCUITS_IS_USER_CONTROLLABLE = "is_user_controllable"
@@ -43,6 +70,171 @@ PANEL_MAIN_RELAY_STATE_UNKNOWN_VALUE = "UNKNOWN"
 DEFAULT_SCAN_INTERVAL = timedelta(seconds=15)
 API_TIMEOUT = 30
 
+# A coordinator update gets at most UPDATE_TIMEOUT seconds, or the scan
+# interval if that is shorter, shared by all sections fetched in parallel.
+UPDATE_TIMEOUT = 30
+
+# Sections of the panel snapshot that are fetched and aged independently.
+# Circuits are aged individually, see span_panel_circuit.circuit_section.
+SECTION_STATUS = "status"
+SECTION_PANEL = "panel"
+SECTION_CIRCUITS = "circuits"
+DEFAULT_STALE_AFTER = 120
+ATTR_STALENESS = "staleness"
+
+ANALYTICS_TOP_N = 5
+
+# Average power from energy counter deltas. An interval longer than
+# ENERGY_GAP_FACTOR scan intervals means polls were missed. The energy
+# counters still include that energy, but the average power sensors report
+# unknown for the interval rather than one mean across the whole gap.
+ENERGY_GAP_FACTOR = 2.5
+ENERGY_KEY_GRID = "grid"
+ENERGY_KEY_FEEDTHROUGH = "feedthrough"
+
+# Phase-locked polling: the panel's sample period and read offset are
+# estimated from the last PHASE_WINDOW samples, and polls are sent
+# PHASE_MARGIN seconds after the next sample is expected near the scan
+# interval. The offset is walked earlier by PHASE_STEP of a period per poll
+# and backed off by PHASE_BACKOFF steps when a poll arrives too early.
+PHASE_WINDOW = 30
+PHASE_MIN_SAMPLES = 3
+PHASE_MARGIN = 0.01
+PHASE_STEP = 0.005
+PHASE_BACKOFF = 20
+# Sample gaps must be within PHASE_PERIOD_TOLERANCE of a period multiple.
+PHASE_PERIOD_TOLERANCE = 0.02
+PHASE_MAX_DIVISOR = 10
+
+# Hedged requests: a second request is sent once the first has been
+# outstanding longer than the p95 of the last HEDGE_WINDOW latencies.
+HEDGE_WINDOW = 50
+HEDGE_MIN_SAMPLES = 10
+
+# Event stream: the server is expected to send a keepalive comment well within
+# STREAM_IDLE_TIMEOUT. Reconnects back off exponentially, and a panel that
+# does not offer a stream at all is only re-probed every STREAM_UNSUPPORTED_RETRY.
+# The backoff only starts over after a connection stayed up STREAM_HEALTHY_AFTER.
+STREAM_IDLE_TIMEOUT = 60
+STREAM_RETRY_MIN = 1
+STREAM_RETRY_MAX = 60
+STREAM_HEALTHY_AFTER = 30
+STREAM_UNSUPPORTED_RETRY = 600
+
+# Burst sampling: bounded in duration, rate and buffer size so a capture can
+# never starve the panel or grow without limit. Up to BURST_PER_CIRCUIT_LIMIT
+# circuits are fetched individually, beyond that the circuits document is
+# cheaper than several requests. A capture uses at most BURST_RATE_SHARE of the
+# governor's rate, leaving the rest for the coordinator's own polls. Captures
+# that can take more than BURST_EVENT_MAX_SAMPLES samples must be saved to a
+# file, since the completion event is stored by the recorder.
+BURST_MIN_INTERVAL = 0.2
+BURST_MAX_DURATION = 300
+BURST_MAX_SAMPLES = 20000
+BURST_EVENT_MAX_SAMPLES = 500
+BURST_MAX_CONCURRENT = 1
+BURST_PER_CIRCUIT_LIMIT = 3
+BURST_RATE_SHARE = 0.5
+
+# Request governor, shared by everything talking to one panel. Lanes are
+# admitted in this order: control commands, setup probes, then polls.
+LANE_CONTROL = "control"
+LANE_PROBE = "probe"
+LANE_POLL = "poll"
+GOVERNOR_RATE = 10
+GOVERNOR_BURST = 10
+GOVERNOR_MAX_IN_FLIGHT = 4
+
+BULK_MAX_CONCURRENT = 4
+PRESETS_STORAGE_KEY = f"{DOMAIN}.circuit_presets"
+PRESETS_STORAGE_VERSION = 1
+
+# Anomaly detection: circuit draw is learned per hour of day and a circuit
+# is flagged once its smoothed draw has been ANOMALY_Z standard deviations
+# off for ANOMALY_PERSIST seconds. Statistics are saved at most every
+# ANOMALY_SAVE_DELAY seconds.
+ANOMALY_BUCKETS = 24
+ANOMALY_EWMA_ALPHA = 0.2
+ANOMALY_MIN_SAMPLES = 100
+ANOMALY_MIN_STD = 25
+ANOMALY_Z = 4
+ANOMALY_PERSIST = 600
+ANOMALY_SAVE_DELAY = 300
+ANOMALY_STORAGE_VERSION = 1
+EVENT_CIRCUIT_ANOMALY = f"{DOMAIN}_circuit_anomaly"
+
+# State transitions found by diffing consecutive snapshots are fired as one
+# event type, with the kind of transition in its "type" field.
+EVENT_TRANSITION = f"{DOMAIN}_transition"
+TRANSITION_CIRCUIT_RELAY_OPENED = "circuit_relay_opened"
+TRANSITION_CIRCUIT_RELAY_CLOSED = "circuit_relay_closed"
+TRANSITION_CIRCUIT_PRIORITY_CHANGED = "circuit_priority_changed"
+TRANSITION_MAIN_RELAY_CHANGED = "main_relay_changed"
+TRANSITION_DOOR_OPENED = "door_opened"
+TRANSITION_DOOR_CLOSED = "door_closed"
+TRANSITION_ETHERNET_LINK_UP = "ethernet_link_up"
+TRANSITION_ETHERNET_LINK_DOWN = "ethernet_link_down"
+TRANSITION_WIFI_LINK_UP = "wifi_link_up"
+TRANSITION_WIFI_LINK_DOWN = "wifi_link_down"
+TRANSITION_CELLULAR_LINK_UP = "cellular_link_up"
+TRANSITION_CELLULAR_LINK_DOWN = "cellular_link_down"
+
+# Sample archive: one segment file per ARCHIVE_SEGMENT_SECONDS, downsampled
+# to ARCHIVE_DOWNSAMPLE_RESOLUTION once older than ARCHIVE_DOWNSAMPLE_AFTER
+# and deleted once older than ARCHIVE_RETENTION (all in seconds). Samples are
+# written in batches every ARCHIVE_FLUSH_INTERVAL seconds.
+ARCHIVE_SEGMENT_SECONDS = 3600
+ARCHIVE_MIN_INTERVAL = 1
+ARCHIVE_FLUSH_INTERVAL = 60
+ARCHIVE_DOWNSAMPLE_AFTER = 7 * 86400
+ARCHIVE_DOWNSAMPLE_RESOLUTION = 300
+ARCHIVE_RETENTION = 365 * 86400
+ARCHIVE_COMPRESSION_LEVEL = 6
+ARCHIVE_MAINTAIN_INTERVAL = timedelta(hours=1)
+
+# The export view streams the last EXPORT_DEFAULT_RANGE seconds by default.
+EXPORT_VIEW_REGISTERED = f"{DOMAIN}_export_view"
+EXPORT_DEFAULT_RANGE = 3600
+
+# Subnet scan discovery probes at most SCAN_MAX_HOSTS addresses,
+# SCAN_CONCURRENCY at a time, giving each SCAN_TIMEOUT seconds to answer.
+SCAN_MAX_HOSTS = 1024
+SCAN_CONCURRENCY = 64
+SCAN_TIMEOUT = 1.0
+
+# Fleet onboarding validates at most ONBOARD_CONCURRENCY panels at a time.
+ONBOARD_CONCURRENCY = 8
+
+# Traffic recordings are gzipped NDJSON, flushed to disk every
+# RECORDING_FLUSH_INTERVAL seconds and bounded to RECORDING_MAX_DURATION.
+RECORDING_FORMAT_VERSION = 1
+RECORDING_FLUSH_INTERVAL = 10
+RECORDING_MAX_DURATION = 86400
+EVENT_RECORDING_COMPLETE = f"{DOMAIN}_recording_complete"
+
+# Load shedding is disabled while the limit is 0. The set of shed circuits
+# is saved within SHED_SAVE_DELAY seconds of changing.
+DEFAULT_SHED_LIMIT = 0
+DEFAULT_SHED_HYSTERESIS = 500
+SHED_INTERVAL = 1
+SHED_SETTLE_TIME = 5
+SHED_RESTORE_DELAY = 30
+SHED_SAVE_DELAY = 1
+SHED_STORAGE_VERSION = 1
+
+# Options that can be applied to a running entry without reloading it.
+# Changing any option not listed here triggers a full reload.
+LIVE_OPTIONS = frozenset(
+    {
+        "scan_interval",
+        CONF_SHED_LIMIT,
+        CONF_SHED_HYSTERESIS,
+        CONF_HEDGE_REQUESTS,
+        CONF_STALE_AFTER,
+        CONF_PHASE_LOCK,
+    }
+)
+
 
 class CircuitRelayState(enum.Enum):
     OPEN = "Open"
@@ -1,2 +1,10 @@
 class SpanPanelReturnedEmptyData(Exception):
     pass
+
+
+class SpanPanelBurstBusy(Exception):
+    pass
+
+
+class SpanPanelReplayExhausted(Exception):
+    pass
@@ -0,0 +1,207 @@
+"""HTTP views exporting archived and current panel data."""
+from __future__ import annotations
+
+from array import array
+from collections.abc import Iterator
+import json
+import logging
+import math
+import time
+from typing import TYPE_CHECKING
+
+from aiohttp import web
+
+from homeassistant.components.http import HomeAssistantView
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+import homeassistant.util.dt as dt_util
+
+from .const import (
+    ARCHIVE,
+    ARCHIVE_SEGMENT_SECONDS,
+    COORDINATOR,
+    EXPORT_DEFAULT_RANGE,
+    EXPORT_VIEW_REGISTERED,
+    METRICS_EXPORTER,
+)
+from .services import resolve_circuit_ids, resolve_entry_data
+from .span_panel import SpanPanel
+from .span_panel_metrics import CONTENT_TYPE, SpanPanelMetrics
+from .util import async_import_module
+
+if TYPE_CHECKING:
+    from .span_panel_archive import Columns, SpanPanelArchive
+
+_LOGGER = logging.getLogger(__name__)
+
+FORMAT_CSV = "csv"
+FORMAT_NDJSON = "ndjson"
+CONTENT_TYPES = {
+    FORMAT_CSV: "text/csv",
+    FORMAT_NDJSON: "application/x-ndjson",
+}
+CIRCUIT_SERIES = ("power", "consumed_energy", "produced_energy")
+
+
+@callback
+def async_register_views(hass: HomeAssistant) -> None:
+    """Views cannot be removed, so they are registered once per run."""
+    if hass.data.get(EXPORT_VIEW_REGISTERED):
+        return
+    hass.http.register_view(SpanPanelExportView())
+    hass.http.register_view(SpanPanelMetricsView())
+    hass.data[EXPORT_VIEW_REGISTERED] = True
+
+
+def _parse_time(value: str | None, default: float) -> float:
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parsed = dt_util.parse_datetime(value)
+    if parsed is None:
+        raise ValueError(f"Invalid time {value}")
+    return dt_util.as_utc(parsed).timestamp()
+
+
+def _format_rows(fmt: str, series: list[str], columns: Columns) -> str:
+    times, values = columns
+    lines = []
+    for row, timestamp in enumerate(times):
+        row_values = [values[name][row] for name in series]
+        if fmt == FORMAT_CSV:
+            lines.append(
+                ",".join(
+                    [repr(timestamp)]
+                    + ["" if math.isnan(value) else repr(value) for value in row_values]
+                )
+            )
+        else:
+            record = {"time": timestamp}
+            for name, value in zip(series, row_values):
+                record[name] = None if math.isnan(value) else value
+            lines.append(json.dumps(record))
+    return "".join(f"{line}\n" for line in lines)
+
+
+class SpanPanelExportView(HomeAssistantView):
+    """
+    GET /api/span_panel/{serial_number}/export streams chunked CSV or NDJSON.
+
+    Query parameters:
+      format      csv (default) or ndjson
+      start, end  epoch seconds or ISO 8601; the last hour by default
+      circuits    comma separated circuit ids or names; every series if left out
+      resolution  average into buckets of this many seconds
+      snapshot    any value exports the current snapshot instead of history
+
+    History comes from the panel's archive one segment at a time, so memory
+    use does not depend on the length of the range.
+    """
+
+    url = "/api/span_panel/{serial_number}/export"
+    name = "api:span_panel:export"
+    requires_auth = True
+
+    async def get(
+        self, request: web.Request, serial_number: str
+    ) -> web.StreamResponse:
+        hass: HomeAssistant = request.app["hass"]
+        query = request.query
+        try:
+            data = resolve_entry_data(hass, serial_number)
+        except HomeAssistantError as err:
+            return self.json_message(str(err), 404)
+        span_panel: SpanPanel = data[COORDINATOR].data
+        archive: SpanPanelArchive | None = data[ARCHIVE]
+        archive_module = await async_import_module(hass, "span_panel_archive")
+
+        fmt = query.get("format", FORMAT_CSV)
+        if fmt not in CONTENT_TYPES:
+            return self.json_message(f"Unknown format {fmt}", 400)
+        try:
+            now = time.time()
+            end = _parse_time(query.get("end"), now)
+            start = _parse_time(query.get("start"), end - EXPORT_DEFAULT_RANGE)
+            resolution = float(query["resolution"]) if "resolution" in query else None
+            circuit_ids = (
+                resolve_circuit_ids(span_panel, query["circuits"].split(","))
+                if "circuits" in query
+                else None
+            )
+        except (ValueError, HomeAssistantError) as err:
+            return self.json_message(str(err), 400)
+        # Buckets must not straddle segments, which are downsampled separately.
+        if resolution is not None and (
+            resolution <= 0 or ARCHIVE_SEGMENT_SECONDS % resolution
+        ):
+            return self.json_message(
+                f"resolution must divide {ARCHIVE_SEGMENT_SECONDS}", 400
+            )
+
+        snapshot = "snapshot" in query
+        if not snapshot and archive is None:
+            return self.json_message("The archive is not enabled for this panel", 404)
+
+        if circuit_ids is not None:
+            series = [
+                f"{id}.{kind}" for id in circuit_ids for kind in CIRCUIT_SERIES
+            ]
+        elif snapshot:
+            series = list(
+                archive_module.archive_sample(span_panel.panel, span_panel.circuits)
+            )
+        else:
+            series = await hass.async_add_executor_job(archive.series)
+
+        response = web.StreamResponse(
+            headers={"Content-Type": CONTENT_TYPES[fmt]}
+        )
+        response.enable_chunked_encoding()
+        await response.prepare(request)
+        if fmt == FORMAT_CSV:
+            await response.write(",".join(["time", *series]).encode() + b"\n")
+
+        if snapshot:
+            values = archive_module.archive_sample(
+                span_panel.panel, span_panel.circuits, span_panel.stale
+            )
+            columns = (
+                array("d", [now]),
+                {name: array("d", [values.get(name, math.nan)]) for name in series},
+            )
+            await response.write(_format_rows(fmt, series, columns).encode())
+        else:
+            chunks: Iterator[Columns] = archive.query(start, end, series)
+            while True:
+                chunk = await hass.async_add_executor_job(next, chunks, None)
+                if chunk is None:
+                    break
+                if resolution is not None:
+                    chunk = archive_module.downsample(*chunk, resolution)
+                await response.write(_format_rows(fmt, series, chunk).encode())
+
+        await response.write_eof()
+        return response
+
+
+class SpanPanelMetricsView(HomeAssistantView):
+    """
+    GET /api/span_panel/metrics serves every panel in OpenMetrics text
+    format, straight from the buffer kept by SpanPanelMetrics.
+    """
+
+    url = "/api/span_panel/metrics"
+    name = "api:span_panel:metrics"
+    requires_auth = True
+
+    async def get(self, request: web.Request) -> web.Response:
+        hass: HomeAssistant = request.app["hass"]
+        metrics: SpanPanelMetrics | None = hass.data.get(METRICS_EXPORTER)
+        if metrics is None:
+            return self.json_message("No Span Panel is loaded", 404)
+        return web.Response(
+            body=metrics.exposition, headers={"Content-Type": CONTENT_TYPE}
+        )
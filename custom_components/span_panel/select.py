@@ -12,7 +12,8 @@ from homeassistant.helpers.update_coordinator import (
 
 from .const import COORDINATOR, DOMAIN, CircuitPriority
 from .span_panel import SpanPanel
-from .util import panel_to_device_info
+from .span_panel_circuit import circuit_section
+from .util import panel_to_device_info, section_attributes
 
 ICON = "mdi:toggle-switch"
 
@@ -49,6 +50,16 @@ class SpanPanelCircuitsSelect(CoordinatorEntity, SelectEntity):
         priority = span_panel.circuits[self.id].priority
         return CircuitPriority[priority].value
 
+    @property
+    def available(self) -> bool:
+        span_panel: SpanPanel = self.coordinator.data
+        return super().available and span_panel.is_available(circuit_section(self.id))
+
+    @property
+    def extra_state_attributes(self) -> dict | None:
+        span_panel: SpanPanel = self.coordinator.data
+        return section_attributes(span_panel, circuit_section(self.id))
+
     async def async_select_option(self, option: str) -> None:
         span_panel: SpanPanel = self.coordinator.data
         priority = CircuitPriority(option)
@@ -4,7 +4,8 @@ from __future__ import annotations
 from collections.abc import Callable
 from dataclasses import dataclass
 import logging
-from typing import cast
+import time
+from typing import TYPE_CHECKING, cast
 
 from homeassistant.components.sensor import (
     SensorDeviceClass,
@@ -13,28 +14,51 @@ from homeassistant.components.sensor import (
     SensorStateClass,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import ENERGY_WATT_HOUR, POWER_WATT
-from homeassistant.core import HomeAssistant
+from homeassistant.const import ENERGY_WATT_HOUR, POWER_WATT, TIME_MILLISECONDS
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.entity import EntityCategory
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.update_coordinator import (
     CoordinatorEntity,
     DataUpdateCoordinator,
 )
+from homeassistant.util import slugify
 
 from .const import (
+    ANALYTICS_TOP_N,
+    CIRCUITS_AVERAGE_POWER,
     CIRCUITS_ENERGY_CONSUMED,
     CIRCUITS_ENERGY_PRODUCED,
     CIRCUITS_POWER,
+    CONF_SITE_TOTALS,
     COORDINATOR,
     DOMAIN,
+    ENERGY_KEY_FEEDTHROUGH,
+    ENERGY_KEY_GRID,
+    LOAD_SHEDDER,
+    SECTION_PANEL,
+    SECTION_STATUS,
+    SETUP_TIMER,
+    SIGNAL_SITE_UPDATED,
+    SITE_AGGREGATOR,
     STAUS_SOFTWARE_VER,
+    CircuitRelayState,
 )
 from .span_panel import SpanPanel
 from .span_panel_api import SpanPanelApi
-from .span_panel_circuit import SpanPanelCircuit
+from .span_panel_circuit import SpanPanelCircuit, circuit_section
 from .span_panel_data import SpanPanelData
 from .span_panel_status import SpanPanelStatus
-from .util import panel_to_device_info
+from .span_panel_timing import SetupTimer
+from .util import panel_to_device_info, section_attributes, site_to_device_info
+
+if TYPE_CHECKING:
+    from .span_panel_analytics import SpanPanelAnalytics, TopConsumer
+    from .span_panel_energy import IntervalPower
+    from .span_panel_groups import CircuitGroupTotals
+    from .span_panel_shedding import SpanPanelLoadShedder
+    from .span_panel_site import SiteTotals, SpanPanelSite
 
 
 @dataclass
@@ -61,6 +85,55 @@ class SpanPanelDataSensorEntityDescription(
     pass
 
 
+@dataclass
+class SpanPanelAnalyticsRequiredKeysMixin:
+    value_fn: Callable[[SpanPanelAnalytics], float | None]
+
+
+@dataclass
+class SpanPanelAnalyticsSensorEntityDescription(
+    SensorEntityDescription, SpanPanelAnalyticsRequiredKeysMixin
+):
+    attributes_fn: Callable[[SpanPanelAnalytics], dict | None] = lambda _: None
+
+
+@dataclass
+class SpanPanelAverageRequiredKeysMixin:
+    value_fn: Callable[[IntervalPower], float]
+
+
+@dataclass
+class SpanPanelAverageSensorEntityDescription(
+    SensorEntityDescription, SpanPanelAverageRequiredKeysMixin
+):
+    # Energy accounting series of a panel sensor; circuits use their id.
+    series: str | None = None
+
+
+@dataclass
+class SpanPanelGroupRequiredKeysMixin:
+    value_fn: Callable[[CircuitGroupTotals], float]
+
+
+@dataclass
+class SpanPanelGroupSensorEntityDescription(
+    SensorEntityDescription, SpanPanelGroupRequiredKeysMixin
+):
+    pass
+
+
+@dataclass
+class SpanPanelSiteRequiredKeysMixin:
+    value_fn: Callable[[SiteTotals], float]
+
+
+@dataclass
+class SpanPanelSiteSensorEntityDescription(
+    SensorEntityDescription, SpanPanelSiteRequiredKeysMixin
+):
+    pass
+
+
 @dataclass
 class SpanPanelStatusRequiredKeysMixin:
     value_fn: Callable[[SpanPanelStatus], str]
@@ -100,6 +173,44 @@ CIRCUITS_SENSORS = (
     ),
 )
 
+CIRCUIT_AVERAGE_SENSORS = (
+    SpanPanelAverageSensorEntityDescription(
+        key=CIRCUITS_AVERAGE_POWER,
+        name="Average Power",
+        native_unit_of_measurement=POWER_WATT,
+        state_class=SensorStateClass.MEASUREMENT,
+        device_class=SensorDeviceClass.POWER,
+        value_fn=lambda interval: abs(interval.net_power),
+    ),
+)
+
+GROUP_SENSORS = (
+    SpanPanelGroupSensorEntityDescription(
+        key=CIRCUITS_POWER,
+        name="Power",
+        native_unit_of_measurement=POWER_WATT,
+        state_class=SensorStateClass.MEASUREMENT,
+        device_class=SensorDeviceClass.POWER,
+        value_fn=lambda totals: totals.power,
+    ),
+    SpanPanelGroupSensorEntityDescription(
+        key=CIRCUITS_ENERGY_PRODUCED,
+        name="Produced Energy",
+        native_unit_of_measurement=ENERGY_WATT_HOUR,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        device_class=SensorDeviceClass.ENERGY,
+        value_fn=lambda totals: totals.produced_energy,
+    ),
+    SpanPanelGroupSensorEntityDescription(
+        key=CIRCUITS_ENERGY_CONSUMED,
+        name="Consumed Energy",
+        native_unit_of_measurement=ENERGY_WATT_HOUR,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        device_class=SensorDeviceClass.ENERGY,
+        value_fn=lambda totals: totals.consumed_energy,
+    ),
+)
+
 PANEL_SENSORS = (
     SpanPanelDataSensorEntityDescription(
         key="instantGridPowerW",
@@ -151,6 +262,62 @@ PANEL_SENSORS = (
     ),
 )
 
+PANEL_AVERAGE_SENSORS = (
+    SpanPanelAverageSensorEntityDescription(
+        key="gridAveragePowerW",
+        name="Average Power",
+        native_unit_of_measurement=POWER_WATT,
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        series=ENERGY_KEY_GRID,
+        value_fn=lambda interval: interval.net_power,
+    ),
+    SpanPanelAverageSensorEntityDescription(
+        key="feedthroughAveragePowerW",
+        name="Feed Through Average Power",
+        native_unit_of_measurement=POWER_WATT,
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        series=ENERGY_KEY_FEEDTHROUGH,
+        value_fn=lambda interval: interval.net_power,
+    ),
+)
+
+SITE_SENSORS = (
+    SpanPanelSiteSensorEntityDescription(
+        key="siteGridPowerW",
+        name="Site Grid Power",
+        native_unit_of_measurement=POWER_WATT,
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda totals: totals.grid_power,
+    ),
+    SpanPanelSiteSensorEntityDescription(
+        key="siteFeedthroughPowerW",
+        name="Site Feed Through Power",
+        native_unit_of_measurement=POWER_WATT,
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda totals: totals.feedthrough_power,
+    ),
+    SpanPanelSiteSensorEntityDescription(
+        key="siteConsumedEnergyWh",
+        name="Site Consumed Energy",
+        native_unit_of_measurement=ENERGY_WATT_HOUR,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        device_class=SensorDeviceClass.ENERGY,
+        value_fn=lambda totals: totals.consumed_energy,
+    ),
+    SpanPanelSiteSensorEntityDescription(
+        key="siteProducedEnergyWh",
+        name="Site Produced Energy",
+        native_unit_of_measurement=ENERGY_WATT_HOUR,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        device_class=SensorDeviceClass.ENERGY,
+        value_fn=lambda totals: totals.produced_energy,
+    ),
+)
+
 STATUS_SENSORS = (
     SpanPanelStatusSensorEntityDescription(
         key=STAUS_SOFTWARE_VER,
@@ -159,6 +326,119 @@ STATUS_SENSORS = (
     ),
 )
 
+
+def _top_consumer_description(rank: int) -> SpanPanelAnalyticsSensorEntityDescription:
+    def _top(analytics: SpanPanelAnalytics) -> TopConsumer | None:
+        consumers = analytics.top_consumers
+        return consumers[rank - 1] if len(consumers) >= rank else None
+
+    def _power(analytics: SpanPanelAnalytics) -> float | None:
+        top = _top(analytics)
+        return None if top is None else top.power
+
+    def _attributes(analytics: SpanPanelAnalytics) -> dict | None:
+        top = _top(analytics)
+        if top is None:
+            return None
+        return {"rank": rank, "circuit_id": top.circuit_id, "circuit": top.name}
+
+    return SpanPanelAnalyticsSensorEntityDescription(
+        key=f"topConsumer{rank}",
+        name=f"Top Consumer {rank} Power",
+        native_unit_of_measurement=POWER_WATT,
+        state_class=SensorStateClass.MEASUREMENT,
+        device_class=SensorDeviceClass.POWER,
+        value_fn=_power,
+        attributes_fn=_attributes,
+    )
+
+
+ANALYTICS_SENSORS = (
+    SpanPanelAnalyticsSensorEntityDescription(
+        key="unmonitoredPowerW",
+        name="Unmonitored Power",
+        native_unit_of_measurement=POWER_WATT,
+        state_class=SensorStateClass.MEASUREMENT,
+        device_class=SensorDeviceClass.POWER,
+        value_fn=lambda analytics: analytics.unmonitored_power,
+    ),
+    SpanPanelAnalyticsSensorEntityDescription(
+        key="circuitsConsumedPowerW",
+        name="Circuits Consumed Power",
+        native_unit_of_measurement=POWER_WATT,
+        state_class=SensorStateClass.MEASUREMENT,
+        device_class=SensorDeviceClass.POWER,
+        value_fn=lambda analytics: analytics.consumed_power,
+    ),
+    SpanPanelAnalyticsSensorEntityDescription(
+        key="circuitsProducedPowerW",
+        name="Circuits Produced Power",
+        native_unit_of_measurement=POWER_WATT,
+        state_class=SensorStateClass.MEASUREMENT,
+        device_class=SensorDeviceClass.POWER,
+        value_fn=lambda analytics: analytics.produced_power,
+    ),
+    SpanPanelAnalyticsSensorEntityDescription(
+        key="circuitsConsumedEnergyWh",
+        name="Circuits Consumed Energy",
+        native_unit_of_measurement=ENERGY_WATT_HOUR,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        device_class=SensorDeviceClass.ENERGY,
+        value_fn=lambda analytics: analytics.consumed_energy,
+    ),
+    SpanPanelAnalyticsSensorEntityDescription(
+        key="circuitsProducedEnergyWh",
+        name="Circuits Produced Energy",
+        native_unit_of_measurement=ENERGY_WATT_HOUR,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        device_class=SensorDeviceClass.ENERGY,
+        value_fn=lambda analytics: analytics.produced_energy,
+    ),
+    SpanPanelAnalyticsSensorEntityDescription(
+        key="circuitsClosed",
+        name="Circuits Closed",
+        icon="mdi:electric-switch-closed",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda analytics: analytics.relay_counts[
+            CircuitRelayState.CLOSED.name
+        ],
+    ),
+    SpanPanelAnalyticsSensorEntityDescription(
+        key="circuitsOpen",
+        name="Circuits Open",
+        icon="mdi:electric-switch",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda analytics: analytics.relay_counts[
+            CircuitRelayState.OPEN.name
+        ],
+    ),
+    SpanPanelAnalyticsSensorEntityDescription(
+        key="legL1PowerW",
+        name="L1 Power",
+        native_unit_of_measurement=POWER_WATT,
+        state_class=SensorStateClass.MEASUREMENT,
+        device_class=SensorDeviceClass.POWER,
+        value_fn=lambda analytics: analytics.l1_power,
+    ),
+    SpanPanelAnalyticsSensorEntityDescription(
+        key="legL2PowerW",
+        name="L2 Power",
+        native_unit_of_measurement=POWER_WATT,
+        state_class=SensorStateClass.MEASUREMENT,
+        device_class=SensorDeviceClass.POWER,
+        value_fn=lambda analytics: analytics.l2_power,
+    ),
+    SpanPanelAnalyticsSensorEntityDescription(
+        key="legImbalanceW",
+        name="Leg Imbalance",
+        native_unit_of_measurement=POWER_WATT,
+        state_class=SensorStateClass.MEASUREMENT,
+        device_class=SensorDeviceClass.POWER,
+        value_fn=lambda analytics: analytics.leg_imbalance,
+    ),
+    *(_top_consumer_description(rank) for rank in range(1, ANALYTICS_TOP_N + 1)),
+)
+
 ICON = "mdi:flash"
 _LOGGER = logging.getLogger(__name__)
 
@@ -195,6 +475,135 @@ class SpanPanelCircuitSensor(CoordinatorEntity, SensorEntity):
         _LOGGER.debug("native_value:[%s] [%s]", self._attr_name, value)
         return cast(float, value)
 
+    @property
+    def available(self) -> bool:
+        span_panel: SpanPanel = self.coordinator.data
+        return super().available and span_panel.is_available(circuit_section(self.id))
+
+    @property
+    def extra_state_attributes(self) -> dict | None:
+        span_panel: SpanPanel = self.coordinator.data
+        return section_attributes(span_panel, circuit_section(self.id))
+
+
+class SpanPanelAveragePowerSensor(CoordinatorEntity, SensorEntity):
+    """
+    Mean power since the previous counter reading, from the panel's energy
+    counters rather than a single instant sample. After a gap in readings
+    the mean would smear the whole outage into one value, so the state is
+    unknown for that interval and the gap attribute is set.
+    """
+
+    _attr_icon = ICON
+
+    def __init__(
+        self,
+        coordinator: DataUpdateCoordinator,
+        description: SpanPanelAverageSensorEntityDescription,
+        circuit_id: str | None = None,
+        name: str | None = None,
+    ) -> None:
+        """Initialize Span Panel average power entity."""
+        span_panel: SpanPanel = coordinator.data
+
+        self.entity_description = description
+        self.series = circuit_id or description.series
+        self.section = circuit_section(circuit_id) if circuit_id else SECTION_PANEL
+        if circuit_id is not None:
+            self._attr_name = f"{name} {description.name}"
+            self._attr_unique_id = (
+                f"span_{span_panel.status.serial_number}_{circuit_id}"
+                f"_{description.key}"
+            )
+        else:
+            self._attr_name = f"{description.name}"
+            self._attr_unique_id = (
+                f"span_{span_panel.status.serial_number}_{description.key}"
+            )
+        self._attr_device_info = panel_to_device_info(span_panel)
+
+        super().__init__(coordinator)
+
+    @property
+    def native_value(self) -> float | None:
+        span_panel: SpanPanel = self.coordinator.data
+        interval = span_panel.energy.get(self.series)
+        if interval is None or interval.gap:
+            return None
+        return round(self.entity_description.value_fn(interval), 1)
+
+    @property
+    def available(self) -> bool:
+        span_panel: SpanPanel = self.coordinator.data
+        return (
+            super().available
+            and span_panel.is_available(self.section)
+            and span_panel.energy.get(self.series) is not None
+        )
+
+    @property
+    def extra_state_attributes(self) -> dict:
+        span_panel: SpanPanel = self.coordinator.data
+        attributes = section_attributes(span_panel, self.section) or {}
+        interval = span_panel.energy.get(self.series)
+        if interval is not None:
+            attributes["interval"] = round(interval.interval)
+            attributes["gap"] = interval.gap
+            if interval.reset:
+                attributes["counter_reset"] = True
+        return attributes
+
+
+class SpanPanelCircuitGroupSensor(CoordinatorEntity, SensorEntity):
+    _attr_icon = ICON
+
+    def __init__(
+        self,
+        coordinator: DataUpdateCoordinator,
+        description: SpanPanelGroupSensorEntityDescription,
+        group: str,
+    ) -> None:
+        """Initialize Span Panel circuit group entity."""
+        span_panel: SpanPanel = coordinator.data
+
+        self.entity_description = description
+        self.group = group
+        self._attr_name = f"{group} {description.name}"
+        self._attr_unique_id = (
+            f"span_{span_panel.status.serial_number}_group_{slugify(group)}"
+            f"_{description.key}"
+        )
+        self._attr_device_info = panel_to_device_info(span_panel)
+
+        super().__init__(coordinator)
+
+    @property
+    def native_value(self) -> float | None:
+        span_panel: SpanPanel = self.coordinator.data
+        return self.entity_description.value_fn(span_panel.group_totals[self.group])
+
+    @property
+    def available(self) -> bool:
+        """A total is only meaningful while every member is current."""
+        span_panel: SpanPanel = self.coordinator.data
+        totals = span_panel.group_totals[self.group]
+        return (
+            super().available
+            and bool(totals.circuit_ids)
+            and all(
+                span_panel.is_available(circuit_section(id))
+                for id in totals.circuit_ids
+            )
+        )
+
+    @property
+    def extra_state_attributes(self) -> dict:
+        span_panel: SpanPanel = self.coordinator.data
+        totals = span_panel.group_totals[self.group]
+        return {
+            "circuits": [span_panel.circuits[id].name for id in totals.circuit_ids]
+        }
+
 
 class SpanPanelPanel(CoordinatorEntity, SensorEntity):
     _attr_icon = ICON
@@ -224,6 +633,109 @@ class SpanPanelPanel(CoordinatorEntity, SensorEntity):
         value = self.entity_description.value_fn(span_panel.panel)
         return cast(float, value)
 
+    @property
+    def available(self) -> bool:
+        span_panel: SpanPanel = self.coordinator.data
+        return super().available and span_panel.is_available(SECTION_PANEL)
+
+    @property
+    def extra_state_attributes(self) -> dict | None:
+        span_panel: SpanPanel = self.coordinator.data
+        return section_attributes(span_panel, SECTION_PANEL)
+
+
+class SpanPanelAnalyticsSensor(CoordinatorEntity, SensorEntity):
+    _attr_icon = ICON
+
+    def __init__(
+        self,
+        coordinator: DataUpdateCoordinator,
+        description: SpanPanelAnalyticsSensorEntityDescription,
+    ) -> None:
+        """Initialize Span Panel analytics entity."""
+        span_panel: SpanPanel = coordinator.data
+
+        self.entity_description = description
+        self._attr_name = f"{description.name}"
+        self._attr_unique_id = (
+            f"span_{span_panel.status.serial_number}_{description.key}"
+        )
+        self._attr_device_info = panel_to_device_info(span_panel)
+
+        super().__init__(coordinator)
+
+    @property
+    def native_value(self) -> float | None:
+        span_panel: SpanPanel = self.coordinator.data
+        return self.entity_description.value_fn(span_panel.analytics)
+
+    @property
+    def available(self) -> bool:
+        """Analytics combine the panel with every circuit, so all must be current."""
+        span_panel: SpanPanel = self.coordinator.data
+        return (
+            super().available
+            and span_panel.is_available(SECTION_PANEL)
+            and all(
+                span_panel.is_available(circuit_section(id))
+                for id in span_panel.circuits
+            )
+        )
+
+    @property
+    def extra_state_attributes(self) -> dict | None:
+        span_panel: SpanPanel = self.coordinator.data
+        return self.entity_description.attributes_fn(span_panel.analytics)
+
+
+class SpanPanelSiteSensor(SensorEntity):
+    """Updated once per round of samples from every panel of the site."""
+
+    _attr_icon = ICON
+    _attr_should_poll = False
+
+    def __init__(
+        self,
+        site: SpanPanelSite,
+        description: SpanPanelSiteSensorEntityDescription,
+    ) -> None:
+        """Initialize Span site entity."""
+        self.site = site
+        self.entity_description = description
+        self._attr_name = f"{description.name}"
+        self._attr_unique_id = f"span_site_{description.key}"
+        self._attr_device_info = site_to_device_info()
+
+    async def async_added_to_hass(self) -> None:
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass, SIGNAL_SITE_UPDATED, self._async_site_updated
+            )
+        )
+
+    @callback
+    def _async_site_updated(self) -> None:
+        self.async_write_ha_state()
+
+    @property
+    def available(self) -> bool:
+        return self.site.is_current(time.monotonic())
+
+    @property
+    def native_value(self) -> float | None:
+        if self.site.totals is None:
+            return None
+        return self.entity_description.value_fn(self.site.totals)
+
+    @property
+    def extra_state_attributes(self) -> dict | None:
+        if self.site.totals is None:
+            return None
+        return {
+            "panels": self.site.totals.panels,
+            "spread": round(self.site.totals.spread, 1),
+        }
+
 
 class SpanPanelStatus(CoordinatorEntity, SensorEntity):
     _attr_icon = ICON
@@ -253,6 +765,116 @@ class SpanPanelStatus(CoordinatorEntity, SensorEntity):
         value = self.entity_description.value_fn(span_panel.status)
         return value
 
+    @property
+    def available(self) -> bool:
+        span_panel: SpanPanel = self.coordinator.data
+        return super().available and span_panel.is_available(SECTION_STATUS)
+
+    @property
+    def extra_state_attributes(self) -> dict | None:
+        span_panel: SpanPanel = self.coordinator.data
+        return section_attributes(span_panel, SECTION_STATUS)
+
+
+class SpanPanelLoadShedLatency(CoordinatorEntity, SensorEntity):
+    _attr_icon = "mdi:timer-outline"
+    _attr_name = "Load Shedding Latency"
+    _attr_native_unit_of_measurement = TIME_MILLISECONDS
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    def __init__(
+        self,
+        coordinator: DataUpdateCoordinator,
+        load_shedder: SpanPanelLoadShedder,
+    ) -> None:
+        """Initialize Span Panel load shedding latency entity."""
+        span_panel: SpanPanel = coordinator.data
+
+        self.load_shedder = load_shedder
+        self._attr_unique_id = (
+            f"span_{span_panel.status.serial_number}_load_shed_latency"
+        )
+        self._attr_device_info = panel_to_device_info(span_panel)
+
+        super().__init__(coordinator)
+
+    @property
+    def native_value(self) -> float | None:
+        """Return the last detection to actuation latency."""
+        if self.load_shedder.last_latency is None:
+            return None
+        return round(self.load_shedder.last_latency * 1000)
+
+    @property
+    def extra_state_attributes(self) -> dict:
+        span_panel: SpanPanel = self.coordinator.data
+        max_latency = self.load_shedder.max_latency
+        return {
+            "enabled": self.load_shedder.enabled,
+            "limit": self.load_shedder.limit,
+            "max_latency": None if max_latency is None else round(max_latency * 1000),
+            "shed_circuits": [
+                span_panel.circuits[id].name
+                for id in self.load_shedder.shed
+                if id in span_panel.circuits
+            ],
+        }
+
+
+class SpanPanelApiQueueDepth(CoordinatorEntity, SensorEntity):
+    _attr_icon = "mdi:tray-full"
+    _attr_name = "API Queue Depth"
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    def __init__(self, coordinator: DataUpdateCoordinator) -> None:
+        """Initialize Span Panel request governor entity."""
+        span_panel: SpanPanel = coordinator.data
+
+        self._attr_unique_id = f"span_{span_panel.status.serial_number}_api_queue"
+        self._attr_device_info = panel_to_device_info(span_panel)
+
+        super().__init__(coordinator)
+
+    @property
+    def native_value(self) -> int:
+        span_panel: SpanPanel = self.coordinator.data
+        return span_panel.api.governor.queue_depth
+
+    @property
+    def extra_state_attributes(self) -> dict:
+        span_panel: SpanPanel = self.coordinator.data
+        governor = span_panel.api.governor
+        return {"in_flight": governor.in_flight, **governor.metrics()}
+
+
+class SpanPanelSetupTime(CoordinatorEntity, SensorEntity):
+    _attr_icon = "mdi:timer-cog-outline"
+    _attr_name = "Setup Time"
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_native_unit_of_measurement = TIME_MILLISECONDS
+
+    def __init__(self, coordinator: DataUpdateCoordinator, timer: SetupTimer) -> None:
+        """Initialize Span Panel setup timing entity."""
+        span_panel: SpanPanel = coordinator.data
+
+        self.timer = timer
+        self._attr_unique_id = f"span_{span_panel.status.serial_number}_setup_time"
+        self._attr_device_info = panel_to_device_info(span_panel)
+
+        super().__init__(coordinator)
+
+    @property
+    def native_value(self) -> float | None:
+        """Unknown until setup has finished, while the platforms load."""
+        if self.timer.total is None:
+            return None
+        return round(self.timer.total * 1000, 1)
+
+    @property
+    def extra_state_attributes(self) -> dict:
+        return self.timer.as_dict()
+
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -275,13 +897,58 @@ async def async_setup_entry(
     for description in PANEL_SENSORS:
         entities.append(SpanPanelPanel(coordinator, description))
 
+    for description in PANEL_AVERAGE_SENSORS:
+        entities.append(SpanPanelAveragePowerSensor(coordinator, description))
+
     for description in STATUS_SENSORS:
         entities.append(SpanPanelStatus(coordinator, description))
 
+    for description in ANALYTICS_SENSORS:
+        entities.append(SpanPanelAnalyticsSensor(coordinator, description))
+
     for description in CIRCUITS_SENSORS:
         for id, circuit_data in span_panel.circuits.items():
             entities.append(
                 SpanPanelCircuitSensor(coordinator, description, id, circuit_data.name)
             )
 
+    for description in CIRCUIT_AVERAGE_SENSORS:
+        for id, circuit_data in span_panel.circuits.items():
+            entities.append(
+                SpanPanelAveragePowerSensor(
+                    coordinator, description, id, circuit_data.name
+                )
+            )
+
+    for description in GROUP_SENSORS:
+        for group in span_panel.groups:
+            entities.append(
+                SpanPanelCircuitGroupSensor(coordinator, description, group)
+            )
+
+    site: SpanPanelSite = hass.data[SITE_AGGREGATOR]
+
+    @callback
+    def _async_publish_site_sensors() -> None:
+        async_add_entities(
+            SpanPanelSiteSensor(site, description) for description in SITE_SENSORS
+        )
+
+    site.add_publisher(config_entry.entry_id, _async_publish_site_sensors)
+    if config_entry.options.get(CONF_SITE_TOTALS, False):
+        if site.claim_sensors(config_entry.entry_id):
+            for description in SITE_SENSORS:
+                entities.append(SpanPanelSiteSensor(site, description))
+        else:
+            _LOGGER.warning(
+                "Site totals are already published by another panel, "
+                "not publishing them on %s",
+                config_entry.title,
+            )
+
+    if data[LOAD_SHEDDER] is not None:
+        entities.append(SpanPanelLoadShedLatency(coordinator, data[LOAD_SHEDDER]))
+    entities.append(SpanPanelApiQueueDepth(coordinator))
+    entities.append(SpanPanelSetupTime(coordinator, data[SETUP_TIMER]))
+
     async_add_entities(entities)
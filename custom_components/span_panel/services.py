@@ -0,0 +1,433 @@
+"""Services for the Span Panel integration."""
+from __future__ import annotations
+
+import asyncio
+from functools import partial
+import json
+import logging
+import math
+import os
+from typing import TYPE_CHECKING, Any
+
+import voluptuous as vol
+
+from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.exceptions import HomeAssistantError
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+import homeassistant.util.dt as dt_util
+
+from .const import (
+    BULK_MAX_CONCURRENT,
+    BURST_EVENT_MAX_SAMPLES,
+    BURST_MAX_DURATION,
+    BURST_MAX_SAMPLES,
+    BURST_MIN_INTERVAL,
+    BURST_SAMPLER,
+    COORDINATOR,
+    DOMAIN,
+    EVENT_RECORDING_COMPLETE,
+    PRESETS_STORAGE_KEY,
+    PRESETS_STORAGE_VERSION,
+    RECORDING_FLUSH_INTERVAL,
+    RECORDING_MAX_DURATION,
+    CircuitPriority,
+    CircuitRelayState,
+)
+from .exceptions import SpanPanelBurstBusy
+from .span_panel import SpanPanel
+from .span_panel_bulk import (
+    CircuitTarget,
+    apply_circuit_targets,
+    plan_circuit_targets,
+)
+from .util import async_import_module
+
+if TYPE_CHECKING:
+    from .span_panel_burst import SpanPanelBurstSampler
+
+_LOGGER = logging.getLogger(__name__)
+
+ATTR_SERIAL_NUMBER = "serial_number"
+ATTR_CIRCUITS = "circuits"
+ATTR_DURATION = "duration"
+ATTR_INTERVAL = "interval"
+ATTR_FILENAME = "filename"
+ATTR_TARGETS = "targets"
+ATTR_CIRCUIT = "circuit"
+ATTR_RELAY = "relay"
+ATTR_PRIORITY = "priority"
+ATTR_PRESET = "preset"
+ATTR_MAX_CONCURRENT = "max_concurrent"
+
+SERVICE_BURST_CAPTURE = "burst_capture"
+SERVICE_SET_CIRCUITS = "set_circuits"
+SERVICE_SAVE_CIRCUIT_PRESET = "save_circuit_preset"
+SERVICE_DELETE_CIRCUIT_PRESET = "delete_circuit_preset"
+SERVICE_RECORD_TRAFFIC = "record_traffic"
+EVENT_BURST_CAPTURE_COMPLETE = f"{DOMAIN}_burst_capture_complete"
+EVENT_CIRCUITS_SET = f"{DOMAIN}_circuits_set"
+
+BURST_CAPTURE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_SERIAL_NUMBER): cv.string,
+        vol.Required(ATTR_CIRCUITS): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional(ATTR_DURATION, default=60): vol.All(
+            vol.Coerce(float), vol.Range(min=1, max=BURST_MAX_DURATION)
+        ),
+        vol.Optional(ATTR_INTERVAL, default=0.5): vol.All(
+            vol.Coerce(float), vol.Range(min=BURST_MIN_INTERVAL, max=10)
+        ),
+        vol.Optional(ATTR_FILENAME): cv.string,
+    }
+)
+
+
+def _priority_name(value: str) -> str:
+    """Accept either the priority name or its display value."""
+    for priority in CircuitPriority:
+        if priority != CircuitPriority.UNKNOWN and value in (
+            priority.name,
+            priority.value,
+        ):
+            return priority.name
+    raise vol.Invalid(f"Unknown priority {value}")
+
+
+CIRCUIT_TARGET_SCHEMA = vol.All(
+    vol.Schema(
+        {
+            vol.Required(ATTR_CIRCUIT): cv.string,
+            vol.Optional(ATTR_RELAY): vol.All(
+                cv.string,
+                vol.Upper,
+                vol.In([CircuitRelayState.OPEN.name, CircuitRelayState.CLOSED.name]),
+            ),
+            vol.Optional(ATTR_PRIORITY): vol.All(cv.string, _priority_name),
+        }
+    ),
+    cv.has_at_least_one_key(ATTR_RELAY, ATTR_PRIORITY),
+)
+
+SET_CIRCUITS_SCHEMA = vol.All(
+    vol.Schema(
+        {
+            vol.Optional(ATTR_SERIAL_NUMBER): cv.string,
+            vol.Exclusive(ATTR_TARGETS, "targets"): [CIRCUIT_TARGET_SCHEMA],
+            vol.Exclusive(ATTR_PRESET, "targets"): cv.string,
+            vol.Optional(ATTR_MAX_CONCURRENT, default=BULK_MAX_CONCURRENT): vol.All(
+                vol.Coerce(int), vol.Range(min=1, max=16)
+            ),
+        }
+    ),
+    cv.has_at_least_one_key(ATTR_TARGETS, ATTR_PRESET),
+)
+
+SAVE_CIRCUIT_PRESET_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_PRESET): cv.string,
+        vol.Optional(ATTR_SERIAL_NUMBER): cv.string,
+        vol.Required(ATTR_TARGETS): [CIRCUIT_TARGET_SCHEMA],
+    }
+)
+
+DELETE_CIRCUIT_PRESET_SCHEMA = vol.Schema({vol.Required(ATTR_PRESET): cv.string})
+
+RECORD_TRAFFIC_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_SERIAL_NUMBER): cv.string,
+        vol.Optional(ATTR_DURATION, default=3600): vol.All(
+            vol.Coerce(float), vol.Range(min=1, max=RECORDING_MAX_DURATION)
+        ),
+        vol.Optional(ATTR_FILENAME): cv.string,
+    }
+)
+
+
+class CircuitPresets:
+    """Named circuit targets, persisted in Home Assistant's storage."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self._store = Store(hass, PRESETS_STORAGE_VERSION, PRESETS_STORAGE_KEY)
+        self._presets: dict[str, dict[str, Any]] | None = None
+
+    async def _async_presets(self) -> dict[str, dict[str, Any]]:
+        if self._presets is None:
+            self._presets = await self._store.async_load() or {}
+        return self._presets
+
+    async def async_get(self, name: str) -> dict[str, Any]:
+        presets = await self._async_presets()
+        if name not in presets:
+            raise HomeAssistantError(f"Unknown circuit preset {name}")
+        return presets[name]
+
+    async def async_save(self, name: str, preset: dict[str, Any]) -> None:
+        presets = await self._async_presets()
+        presets[name] = preset
+        await self._store.async_save(presets)
+
+    async def async_delete(self, name: str) -> None:
+        presets = await self._async_presets()
+        if presets.pop(name, None) is not None:
+            await self._store.async_save(presets)
+
+
+def resolve_entry_data(hass: HomeAssistant, serial_number: str | None) -> dict:
+    """
+    Find the loaded entry for a panel serial number. The serial number may be
+    left out when only one panel is configured.
+    """
+    entries: dict[str, dict] = hass.data.get(DOMAIN, {})
+    matches = [
+        data
+        for data in entries.values()
+        if serial_number is None
+        or data[COORDINATOR].data.status.serial_number == serial_number
+    ]
+    if len(matches) != 1:
+        raise HomeAssistantError(
+            f"Expected exactly one Span Panel for {serial_number or 'any serial'}, "
+            f"found {len(matches)}"
+        )
+    return matches[0]
+
+
+def resolve_circuit_ids(span_panel: SpanPanel, circuits: list[str]) -> list[str]:
+    """Accept circuit ids or circuit names."""
+    by_name = {circuit.name: id for id, circuit in span_panel.circuits.items()}
+    circuit_ids = []
+    for circuit in circuits:
+        if circuit in span_panel.circuits:
+            circuit_ids.append(circuit)
+        elif circuit in by_name:
+            circuit_ids.append(by_name[circuit])
+        else:
+            raise HomeAssistantError(f"Unknown circuit {circuit}")
+    return circuit_ids
+
+
+def _write_json(path: str, payload: dict[str, Any]) -> None:
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(payload, file)
+
+
+async def async_burst_capture(hass: HomeAssistant, call: ServiceCall) -> None:
+    """
+    Start a burst capture in the background. When it ends, the samples are
+    saved to filename (relative to the config directory) if one was given,
+    and an event is fired carrying either the file name or the samples.
+    Captures too large for an event need a filename.
+    """
+    data = resolve_entry_data(hass, call.data.get(ATTR_SERIAL_NUMBER))
+    coordinator: DataUpdateCoordinator = data[COORDINATOR]
+    span_panel: SpanPanel = coordinator.data
+    sampler: SpanPanelBurstSampler | None = data[BURST_SAMPLER]
+    if sampler is None:
+        burst = await async_import_module(hass, "span_panel_burst")
+        sampler = data[BURST_SAMPLER] = burst.SpanPanelBurstSampler(span_panel.api)
+
+    circuit_ids = resolve_circuit_ids(span_panel, call.data[ATTR_CIRCUITS])
+    path = None
+    max_samples = BURST_MAX_SAMPLES
+    if filename := call.data.get(ATTR_FILENAME):
+        path = hass.config.path(filename)
+        if not hass.config.is_allowed_path(path):
+            raise HomeAssistantError(f"Cannot write to {path}")
+    else:
+        # The interval can only be stretched, so this is an upper bound.
+        expected = len(circuit_ids) * math.ceil(
+            call.data[ATTR_DURATION] / call.data[ATTR_INTERVAL]
+        )
+        if expected > BURST_EVENT_MAX_SAMPLES:
+            raise HomeAssistantError(
+                f"A capture of up to {expected} samples needs a filename; "
+                f"at most {BURST_EVENT_MAX_SAMPLES} are sent in the event"
+            )
+        max_samples = BURST_EVENT_MAX_SAMPLES
+    if sampler.busy:
+        raise HomeAssistantError("A burst capture is already running on this panel")
+
+    async def _run() -> None:
+        try:
+            samples = await sampler.capture(
+                circuit_ids,
+                call.data[ATTR_INTERVAL],
+                call.data[ATTR_DURATION],
+                max_samples,
+            )
+        except SpanPanelBurstBusy:
+            _LOGGER.warning("Burst capture refused, panel is busy")
+            return
+
+        event_data: dict[str, Any] = {
+            ATTR_SERIAL_NUMBER: span_panel.status.serial_number,
+            ATTR_CIRCUITS: circuit_ids,
+            "sample_count": len(samples),
+        }
+        if path is not None:
+            await hass.async_add_executor_job(
+                _write_json, path, {**event_data, "samples": samples}
+            )
+            event_data[ATTR_FILENAME] = path
+        else:
+            event_data["samples"] = samples
+        hass.bus.async_fire(EVENT_BURST_CAPTURE_COMPLETE, event_data)
+
+    hass.async_create_task(_run())
+
+
+async def async_record_traffic(hass: HomeAssistant, call: ServiceCall) -> None:
+    """
+    Record every response the panel's API receives for a while, to a
+    recording under span_panel/recordings in the config directory unless a
+    filename is given. An event with the file name is fired when it ends.
+    """
+    data = resolve_entry_data(hass, call.data.get(ATTR_SERIAL_NUMBER))
+    span_panel: SpanPanel = data[COORDINATOR].data
+    serial_number = span_panel.status.serial_number
+    if span_panel.api.recorder is not None:
+        raise HomeAssistantError("Traffic is already being recorded for this panel")
+
+    if filename := call.data.get(ATTR_FILENAME):
+        path = hass.config.path(filename)
+        if not hass.config.is_allowed_path(path):
+            raise HomeAssistantError(f"Cannot write to {path}")
+    else:
+        stamp = dt_util.now().strftime("%Y%m%d-%H%M%S")
+        path = hass.config.path(
+            DOMAIN, "recordings", f"{serial_number}-{stamp}.jsonl.gz"
+        )
+        await hass.async_add_executor_job(
+            partial(os.makedirs, os.path.dirname(path), exist_ok=True)
+        )
+
+    recording = await async_import_module(hass, "span_panel_recording")
+    recorder = recording.SpanPanelRecorder(path, span_panel.host)
+    await hass.async_add_executor_job(recorder.open)
+    span_panel.api.recorder = recorder
+
+    async def _run() -> None:
+        loop = asyncio.get_running_loop()
+        end = loop.time() + call.data[ATTR_DURATION]
+        try:
+            while (remaining := end - loop.time()) > 0:
+                await asyncio.sleep(min(RECORDING_FLUSH_INTERVAL, remaining))
+                await hass.async_add_executor_job(recorder.flush)
+        finally:
+            span_panel.api.recorder = None
+            await hass.async_add_executor_job(recorder.close)
+        hass.bus.async_fire(
+            EVENT_RECORDING_COMPLETE,
+            {
+                ATTR_SERIAL_NUMBER: serial_number,
+                ATTR_FILENAME: path,
+                "response_count": recorder.responses,
+            },
+        )
+
+    hass.async_create_task(_run())
+
+
+async def async_set_circuits(
+    hass: HomeAssistant, call: ServiceCall, presets: CircuitPresets
+) -> None:
+    """
+    Apply relay and priority targets for many circuits at once, then refresh
+    once. Per-circuit results are fired as an event.
+    """
+    serial_number = call.data.get(ATTR_SERIAL_NUMBER)
+    targets = call.data.get(ATTR_TARGETS)
+    if preset_name := call.data.get(ATTR_PRESET):
+        preset = await presets.async_get(preset_name)
+        serial_number = serial_number or preset.get(ATTR_SERIAL_NUMBER)
+        targets = preset[ATTR_TARGETS]
+
+    data = resolve_entry_data(hass, serial_number)
+    coordinator: DataUpdateCoordinator = data[COORDINATOR]
+    span_panel: SpanPanel = coordinator.data
+
+    circuit_ids = resolve_circuit_ids(
+        span_panel, [target[ATTR_CIRCUIT] for target in targets]
+    )
+    plan, results = plan_circuit_targets(
+        span_panel.circuits,
+        [
+            CircuitTarget(
+                circuit_id,
+                CircuitRelayState[target[ATTR_RELAY]] if ATTR_RELAY in target else None,
+                CircuitPriority[target[ATTR_PRIORITY]]
+                if ATTR_PRIORITY in target
+                else None,
+            )
+            for circuit_id, target in zip(circuit_ids, targets)
+        ],
+    )
+    results.update(
+        await apply_circuit_targets(
+            span_panel.api, span_panel.circuits, plan, call.data[ATTR_MAX_CONCURRENT]
+        )
+    )
+    if plan:
+        await coordinator.async_request_refresh()
+
+    hass.bus.async_fire(
+        EVENT_CIRCUITS_SET,
+        {
+            ATTR_SERIAL_NUMBER: span_panel.status.serial_number,
+            ATTR_PRESET: preset_name,
+            "results": results,
+        },
+    )
+
+
+def async_register_services(hass: HomeAssistant) -> None:
+    """Register the integration's services once, on the first entry set up."""
+    if hass.services.has_service(DOMAIN, SERVICE_BURST_CAPTURE):
+        return
+
+    presets = CircuitPresets(hass)
+
+    async def _burst_capture(call: ServiceCall) -> None:
+        await async_burst_capture(hass, call)
+
+    async def _record_traffic(call: ServiceCall) -> None:
+        await async_record_traffic(hass, call)
+
+    async def _set_circuits(call: ServiceCall) -> None:
+        await async_set_circuits(hass, call, presets)
+
+    async def _save_circuit_preset(call: ServiceCall) -> None:
+        await presets.async_save(
+            call.data[ATTR_PRESET],
+            {
+                ATTR_SERIAL_NUMBER: call.data.get(ATTR_SERIAL_NUMBER),
+                ATTR_TARGETS: call.data[ATTR_TARGETS],
+            },
+        )
+
+    async def _delete_circuit_preset(call: ServiceCall) -> None:
+        await presets.async_delete(call.data[ATTR_PRESET])
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_BURST_CAPTURE, _burst_capture, schema=BURST_CAPTURE_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_RECORD_TRAFFIC, _record_traffic, schema=RECORD_TRAFFIC_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_SET_CIRCUITS, _set_circuits, schema=SET_CIRCUITS_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SAVE_CIRCUIT_PRESET,
+        _save_circuit_preset,
+        schema=SAVE_CIRCUIT_PRESET_SCHEMA,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_DELETE_CIRCUIT_PRESET,
+        _delete_circuit_preset,
+        schema=DELETE_CIRCUIT_PRESET_SCHEMA,
+    )
@@ -1,17 +1,39 @@
 """Module to read production and consumption values from a Span panel on the local network."""
+from __future__ import annotations
+
 import asyncio
 import logging
 import time
-import uuid
+from collections.abc import Callable
+from typing import TYPE_CHECKING
 
 import httpx
 
+from .const import (
+    DEFAULT_SCAN_INTERVAL,
+    DEFAULT_STALE_AFTER,
+    ENERGY_KEY_FEEDTHROUGH,
+    ENERGY_KEY_GRID,
+    SECTION_CIRCUITS,
+    SECTION_PANEL,
+    SECTION_STATUS,
+)
 from .exceptions import SpanPanelReturnedEmptyData
 from .span_panel_api import SpanPanelApi
-from .span_panel_circuit import SpanPanelCircuit
+from .span_panel_circuit import SpanPanelCircuit, circuit_section
 from .span_panel_data import SpanPanelData
 from .span_panel_status import SpanPanelStatus
 
+# The derived views are imported on first use; async_setup_entry imports them
+# in the executor beforehand.
+if TYPE_CHECKING:
+    from .span_panel_analytics import SpanPanelAnalytics
+    from .span_panel_energy import SpanPanelEnergyAccounting
+    from .span_panel_groups import CircuitGroupTotals
+    from .span_panel_legs import SpanPanelLegIndex
+    from .span_panel_phase import SpanPanelPhaseLock
+    from .span_panel_stream import SpanPanelStream
+
 STATUS_URL = "http://{}/api/v1/status"
 SPACES_URL = "http://{}/api/v1/spaces"
 CIRCUITS_URL = "http://{}/api/v1/circuits"
@@ -38,26 +60,232 @@ class SpanPanel:
     def __init__(self, host: str, access_token: str, async_client=None) -> None:
         self.api = SpanPanelApi(host, access_token, async_client)
         self.updated_at: int = 0
-        self.status: SpanPanelStatus
-        self.panel: SpanPanelData
-        self.circuits: dict[str, SpanPanelCircuit]
+        self.status: SpanPanelStatus | None = None
+        self.panel: SpanPanelData | None = None
+        self.circuits: dict[str, SpanPanelCircuit] | None = None
+        self.stream: SpanPanelStream | None = None
+        self.scan_interval: float = DEFAULT_SCAN_INTERVAL.total_seconds()
+        # Only set while polls are phase locked, see set_phase_lock.
+        self.phase: SpanPanelPhaseLock | None = None
+        self._energy: SpanPanelEnergyAccounting | None = None
+        # Freshness per section: status, panel and each circuit.
+        self.stale_after: float = DEFAULT_STALE_AFTER
+        self.fetched_at: dict[str, float] = {}
+        self.stale: set[str] = set()
+        # Circuit ids per group name, set from the entry options.
+        self.groups: dict[str, list[str]] = {}
+        self._analytics: SpanPanelAnalytics | None = None
+        self._group_totals: dict[str, CircuitGroupTotals] | None = None
+        self._legs: SpanPanelLegIndex | None = None
 
     @property
     def host(self) -> str:
         return self.api.host
 
-    async def update(self) -> None:
-        try:
-            self.status = await self.api.get_status_data()
-        except SpanPanelReturnedEmptyData:
-            _LOGGER.warn("Span Panel API returned empty result. Ignoring...")
-
-        try:
-            self.panel = await self.api.get_panel_data()
-        except SpanPanelReturnedEmptyData:
-            _LOGGER.warn("Span Panel API returned empty result. Ignoring...")
-
-        try:
-            self.circuits = await self.api.get_circuits_data()
-        except SpanPanelReturnedEmptyData:
-            _LOGGER.warn("Span Panel API returned empty result. Ignoring...")
+    @property
+    def energy(self) -> SpanPanelEnergyAccounting:
+        """Average power from counter deltas, advanced as sections land."""
+        if self._energy is None:
+            from .span_panel_energy import SpanPanelEnergyAccounting
+
+            self._energy = SpanPanelEnergyAccounting()
+        return self._energy
+
+    @property
+    def analytics(self) -> SpanPanelAnalytics:
+        """Aggregates over the current snapshot, computed once per change."""
+        if self._analytics is None:
+            from .span_panel_analytics import SpanPanelAnalytics
+
+            self._analytics = SpanPanelAnalytics.from_snapshot(
+                self.panel, self.circuits, self.legs
+            )
+        return self._analytics
+
+    @property
+    def group_totals(self) -> dict[str, CircuitGroupTotals]:
+        """Totals of each circuit group, computed once per change."""
+        if self._group_totals is None:
+            from .span_panel_groups import group_totals
+
+            self._group_totals = group_totals(self.groups, self.circuits)
+        return self._group_totals
+
+    @property
+    def legs(self) -> SpanPanelLegIndex:
+        """Tab to leg index, rebuilt only when the breaker layout changes."""
+        if self._legs is None or not self._legs.matches(self.circuits):
+            from .span_panel_legs import SpanPanelLegIndex
+
+            self._legs = SpanPanelLegIndex(self.circuits)
+        return self._legs
+
+    def set_phase_lock(self, enabled: bool) -> None:
+        """Start or drop the phase lock, which polls every scan_interval."""
+        if not enabled:
+            self.phase = None
+            return
+        if self.phase is None:
+            from .span_panel_phase import SpanPanelPhaseLock
+
+            self.phase = SpanPanelPhaseLock()
+        self.phase.interval = self.scan_interval
+
+    def mark_fetched(self, section: str) -> None:
+        """Record a good value for a section, or for every circuit."""
+        self._analytics = None
+        self._group_totals = None
+        if section == SECTION_PANEL:
+            self._account_panel_energy()
+        elif section == SECTION_CIRCUITS:
+            self._account_circuit_energy(self.circuits)
+        elif (id := section.removeprefix(circuit_section(""))) != section:
+            self._account_circuit_energy([id])
+        now = time.monotonic()
+        sections = [section]
+        if section == SECTION_CIRCUITS:
+            sections = [circuit_section(id) for id in self.circuits]
+        for section in sections:
+            self.fetched_at[section] = now
+            self.stale.discard(section)
+
+    def _account_panel_energy(self) -> None:
+        sample_time = self.sample_time()
+        if sample_time is None:
+            return
+        panel = self.panel
+        self.energy.update(
+            ENERGY_KEY_GRID,
+            sample_time,
+            panel.main_meter_energy_consumed,
+            panel.main_meter_energy_produced,
+            self.scan_interval,
+        )
+        self.energy.update(
+            ENERGY_KEY_FEEDTHROUGH,
+            sample_time,
+            panel.feedthrough_energy_consumed,
+            panel.feedthrough_energy_produced,
+            self.scan_interval,
+        )
+
+    def _account_circuit_energy(self, circuit_ids) -> None:
+        for id in circuit_ids:
+            circuit = self.circuits[id]
+            self.energy.update(
+                id,
+                circuit.energy_accum_update_time,
+                circuit.consumed_energy,
+                circuit.produced_energy,
+                self.scan_interval,
+            )
+
+    def mark_stale(self, section: str) -> None:
+        """Record a failed refresh; the previous value is kept."""
+        if section == SECTION_CIRCUITS:
+            self.stale.update(circuit_section(id) for id in self.circuits or {})
+        else:
+            self.stale.add(section)
+
+    def age(self, section: str) -> float | None:
+        """Seconds since the section was last fetched successfully."""
+        if section not in self.fetched_at:
+            return None
+        return time.monotonic() - self.fetched_at[section]
+
+    def is_available(self, section: str) -> bool:
+        """Last good values are served until they are stale_after old."""
+        age = self.age(section)
+        return age is not None and age <= self.stale_after
+
+    def staleness(self, section: str) -> float | None:
+        """The section's age while its latest refresh failed, else None."""
+        return self.age(section) if section in self.stale else None
+
+    def sample_time(self) -> float | None:
+        """
+        When the panel took the current sample, in seconds on its own clock.
+        Circuit update times only have second resolution, so they are the
+        fallback for panels that leave the grid sample window out.
+        """
+        if self.panel is not None and self.panel.grid_sample_end_ms:
+            return self.panel.grid_sample_end_ms / 1000
+        if self.circuits:
+            return max(
+                circuit.instant_power_update_time for circuit in self.circuits.values()
+            )
+        return None
+
+    def start_stream(self, on_update: Callable[[], None]) -> None:
+        """Consume the panel's event stream, calling on_update per change."""
+        if self.stream is None:
+            from .span_panel_stream import SpanPanelStream
+
+            self.stream = SpanPanelStream(self, on_update)
+        self.stream.start()
+
+    def stop_stream(self) -> None:
+        if self.stream is not None:
+            self.stream.stop()
+
+    async def update(self, budget: float | None = None) -> None:
+        """
+        Fetch status, panel and circuits in parallel within budget seconds.
+        A section that cannot be refreshed keeps its previous value and is
+        marked stale, so the others still land on time. Only rejected
+        requests, and sections that have never been fetched, fail the update.
+        """
+        if self.stream is not None and self.stream.is_live:
+            _LOGGER.debug("Event stream is live, skipping poll")
+            return
+
+        sent = time.monotonic()
+        deadline = None if budget is None else sent + budget
+        received = sent
+
+        async def _get_panel_data() -> SpanPanelData:
+            nonlocal received
+            panel_data = await self.api.get_panel_data(deadline=deadline)
+            received = time.monotonic()
+            return panel_data
+
+        sections = (SECTION_STATUS, SECTION_PANEL, SECTION_CIRCUITS)
+        results = await asyncio.gather(
+            self.api.get_status_data(deadline=deadline),
+            _get_panel_data(),
+            self.api.get_circuits_data(deadline=deadline),
+            return_exceptions=True,
+        )
+
+        error: BaseException | None = None
+        fetched: set[str] = set()
+        for section, result in zip(sections, results):
+            if isinstance(result, SpanPanelReturnedEmptyData):
+                _LOGGER.warn("Span Panel API returned empty result. Ignoring...")
+                self.mark_stale(section)
+            elif isinstance(result, httpx.HTTPStatusError):
+                error = error or result
+            elif isinstance(result, httpx.HTTPError) and (
+                getattr(self, section) is not None
+            ):
+                _LOGGER.warn("Span Panel %s failed, keeping last value", section)
+                self.mark_stale(section)
+            elif isinstance(result, BaseException):
+                error = error or result
+            else:
+                setattr(self, section, result)
+                self.mark_fetched(section)
+                fetched.add(section)
+
+        # Only a panel document received on this tick says when it was sampled.
+        if (
+            self.phase is not None
+            and SECTION_PANEL in fetched
+            and (sample_time := self.sample_time())
+        ):
+            self.phase.observe(sample_time, sent, received)
+
+        if error is not None:
+            raise error
+        if None in (self.status, self.panel, self.circuits):
+            raise SpanPanelReturnedEmptyData()
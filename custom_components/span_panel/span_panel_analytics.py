@@ -0,0 +1,77 @@
+"""Panel-wide aggregates computed once per snapshot."""
+from __future__ import annotations
+
+from array import array
+import dataclasses
+import heapq
+
+from .const import ANALYTICS_TOP_N, CircuitRelayState
+from .span_panel_circuit import SpanPanelCircuit
+from .span_panel_data import SpanPanelData
+from .span_panel_legs import SpanPanelLegIndex
+
+
+@dataclasses.dataclass
+class TopConsumer:
+    circuit_id: str
+    name: str
+    power: float
+
+
+@dataclasses.dataclass
+class SpanPanelAnalytics:
+    """
+    Circuit instant power follows the panel's convention: negative while a
+    circuit consumes, positive while it produces.
+    """
+
+    consumed_power: float
+    produced_power: float
+    unmonitored_power: float
+    consumed_energy: float
+    produced_energy: float
+    top_consumers: list[TopConsumer]
+    relay_counts: dict[str, int]
+    l1_power: float
+    l2_power: float
+
+    @property
+    def leg_imbalance(self) -> float:
+        return abs(self.l1_power - self.l2_power)
+
+    @staticmethod
+    def from_snapshot(
+        panel: SpanPanelData,
+        circuits: dict[str, SpanPanelCircuit],
+        legs: SpanPanelLegIndex,
+        top_n: int = ANALYTICS_TOP_N,
+    ) -> "SpanPanelAnalytics":
+        ids = list(circuits)
+        values = list(circuits.values())
+        power = array("d", [circuit.instant_power for circuit in values])
+        consumed = sum(-value for value in power if value < 0)
+        produced = sum(value for value in power if value > 0)
+
+        relay_counts = {state.name: 0 for state in CircuitRelayState}
+        for circuit in values:
+            state = circuit.relay_state
+            relay_counts[state if state in relay_counts else "UNKNOWN"] += 1
+
+        l1_power, l2_power = legs.leg_power(power)
+        top = heapq.nlargest(top_n, range(len(power)), key=lambda i: -power[i])
+        return SpanPanelAnalytics(
+            consumed_power=consumed,
+            produced_power=produced,
+            # Whatever the house draws that no circuit accounts for.
+            unmonitored_power=panel.instant_grid_power + produced - consumed,
+            consumed_energy=sum(circuit.consumed_energy for circuit in values),
+            produced_energy=sum(circuit.produced_energy for circuit in values),
+            top_consumers=[
+                TopConsumer(ids[i], values[i].name, -power[i])
+                for i in top
+                if power[i] < 0
+            ],
+            relay_counts=relay_counts,
+            l1_power=l1_power,
+            l2_power=l2_power,
+        )
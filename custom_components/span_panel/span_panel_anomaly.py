@@ -0,0 +1,156 @@
+"""Streaming per-circuit anomaly detection with constant-memory statistics."""
+from __future__ import annotations
+
+from collections.abc import Collection
+import dataclasses
+import math
+from typing import Any
+
+from .const import (
+    ANOMALY_BUCKETS,
+    ANOMALY_EWMA_ALPHA,
+    ANOMALY_MIN_SAMPLES,
+    ANOMALY_MIN_STD,
+    ANOMALY_PERSIST,
+    ANOMALY_Z,
+)
+from .span_panel_circuit import SpanPanelCircuit, circuit_section
+
+
+@dataclasses.dataclass
+class RunningStats:
+    """Welford's online mean and variance."""
+
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+
+@dataclasses.dataclass
+class CircuitAnomalyState:
+    buckets: list[RunningStats]
+    ewma: float | None = None
+    sampled_at: int | None = None
+    deviating_since: float | None = None
+    anomalous: bool = False
+    z_score: float = 0.0
+
+
+@dataclasses.dataclass
+class AnomalyTransition:
+    circuit_id: str
+    anomalous: bool
+    z_score: float
+    expected: float
+    level: float
+
+
+class SpanPanelAnomalyDetector:
+    """
+    Learns each circuit's normal draw per time-of-day bucket and flags
+    circuits whose smoothed draw stays far from it.
+
+    Every sample updates a per-circuit EWMA and the Welford statistics of the
+    current bucket, so memory is fixed at ANOMALY_BUCKETS entries per circuit.
+    Samples are clipped to the detection band before being learned. A
+    circuit is only sampled when its instant power update time has moved on
+    and its section is not stale, so repeated deliveries of one reading,
+    such as pushed updates for other circuits or cached sections served
+    while stale, are learned once.
+    Once a bucket has ANOMALY_MIN_SAMPLES samples, an EWMA more than
+    ANOMALY_Z standard deviations from the bucket mean for ANOMALY_PERSIST
+    seconds marks the circuit anomalous; it clears as soon as the EWMA is
+    back within range.
+    """
+
+    def __init__(self) -> None:
+        self.circuits: dict[str, CircuitAnomalyState] = {}
+
+    @property
+    def anomalous(self) -> list[str]:
+        return [id for id, state in self.circuits.items() if state.anomalous]
+
+    def update(
+        self,
+        circuits: dict[str, SpanPanelCircuit],
+        seconds_of_day: float,
+        now: float,
+        stale: Collection[str] = (),
+    ) -> list[AnomalyTransition]:
+        """Feed one snapshot, returning circuits whose anomaly state changed."""
+        bucket = int(seconds_of_day * ANOMALY_BUCKETS // 86400) % ANOMALY_BUCKETS
+        transitions = []
+        for id, circuit in circuits.items():
+            if circuit_section(id) in stale:
+                continue
+            state = self.circuits.get(id)
+            if state is None:
+                state = self.circuits[id] = CircuitAnomalyState(
+                    [RunningStats() for _ in range(ANOMALY_BUCKETS)]
+                )
+            if state.sampled_at == circuit.instant_power_update_time:
+                continue
+            state.sampled_at = circuit.instant_power_update_time
+
+            value = -circuit.instant_power
+            if state.ewma is None:
+                state.ewma = value
+            else:
+                state.ewma += ANOMALY_EWMA_ALPHA * (value - state.ewma)
+
+            stats = state.buckets[bucket]
+            deviating = False
+            if stats.count >= ANOMALY_MIN_SAMPLES:
+                spread = max(stats.std, ANOMALY_MIN_STD)
+                state.z_score = (state.ewma - stats.mean) / spread
+                deviating = abs(state.z_score) >= ANOMALY_Z
+                # Learn from a clipped sample so a fault cannot quickly
+                # become the new normal, while a lasting change still does.
+                limit = ANOMALY_Z * spread
+                value = min(max(value, stats.mean - limit), stats.mean + limit)
+            stats.add(value)
+
+            if not deviating:
+                state.deviating_since = None
+                anomalous = False
+            else:
+                state.deviating_since = state.deviating_since or now
+                anomalous = now - state.deviating_since >= ANOMALY_PERSIST
+
+            if anomalous != state.anomalous:
+                state.anomalous = anomalous
+                transitions.append(
+                    AnomalyTransition(
+                        id, anomalous, state.z_score, stats.mean, state.ewma
+                    )
+                )
+        return transitions
+
+    def to_dict(self) -> dict[str, Any]:
+        """Learned statistics only; live deviation state is not persisted."""
+        return {
+            id: {
+                "buckets": [
+                    [stats.count, stats.mean, stats.m2] for stats in state.buckets
+                ],
+                "ewma": state.ewma,
+            }
+            for id, state in self.circuits.items()
+        }
+
+    def load(self, data: dict[str, Any]) -> None:
+        for id, saved in data.items():
+            buckets = [RunningStats(*values) for values in saved["buckets"]]
+            if len(buckets) != ANOMALY_BUCKETS:
+                continue
+            self.circuits[id] = CircuitAnomalyState(buckets, saved["ewma"])
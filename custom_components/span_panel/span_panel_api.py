@@ -1,26 +1,72 @@
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from collections.abc import AsyncIterator
+import json
 import logging
+import time
 import uuid
+from typing import TYPE_CHECKING, Any
 
 import httpx
 
 from .const import (
     API_TIMEOUT,
+    HEDGE_MIN_SAMPLES,
+    HEDGE_WINDOW,
+    LANE_CONTROL,
+    LANE_POLL,
+    LANE_PROBE,
     PANEL_MAIN_RELAY_STATE_UNKNOWN_VALUE,
+    STREAM_IDLE_TIMEOUT,
     URL_CIRCUITS,
     URL_PANEL,
     URL_REGISTER,
     URL_STATUS,
+    URL_STREAM,
     CircuitPriority,
     CircuitRelayState,
 )
 from .exceptions import SpanPanelReturnedEmptyData
 from .span_panel_circuit import SpanPanelCircuit
 from .span_panel_data import SpanPanelData
+from .span_panel_governor import SpanPanelGovernor, get_governor
 from .span_panel_status import SpanPanelStatus
 
+if TYPE_CHECKING:
+    from .span_panel_recording import SpanPanelRecorder
+
 _LOGGER = logging.getLogger(__name__)
 
 
+class LatencyTracker:
+    """Recent successful request latencies per URL."""
+
+    def __init__(self, window: int = HEDGE_WINDOW) -> None:
+        self._window = window
+        self._samples: dict[str, deque[float]] = {}
+
+    def record(self, url: str, latency: float) -> None:
+        self._samples.setdefault(url, deque(maxlen=self._window)).append(latency)
+
+    def p95(self, url: str) -> float | None:
+        samples = self._samples.get(url)
+        if not samples or len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(samples)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+
+def _retrieve_exception(task: asyncio.Future) -> None:
+    """
+    Mark a hedged attempt's exception as retrieved. The losing attempt is
+    cancelled or dropped once the other wins, and its failure is expected.
+    """
+    if not task.cancelled():
+        task.exception()
+
+
 class SpanPanelApi:
     def __init__(
         self,
@@ -31,6 +77,12 @@ class SpanPanelApi:
         self.host: str = host.lower()
         self.access_token: str = access_token
         self._async_client = async_client
+        self.governor: SpanPanelGovernor = get_governor(self.host)
+        self.latency = LatencyTracker()
+        self.hedge: bool = False
+        self.hedged_requests: int = 0
+        # Polled responses are written here while set; see SpanPanelRecorder.
+        self.recorder: SpanPanelRecorder | None = None
 
     @property
     def async_client(self):
@@ -39,7 +91,7 @@ class SpanPanelApi:
     async def ping(self) -> bool:
         # status endpoint doesn't require auth.
         try:
-            await self.get_status_data()
+            await self.get_status_data(lane=LANE_PROBE)
             return True
         except httpx.HTTPError:
             return False
@@ -51,16 +103,21 @@ class SpanPanelApi:
                 "name": f"home-assistant-{uuid.uuid4()}",
                 "description": "Home Assistant Local Span Integration",
             },
+            lane=LANE_PROBE,
         )
         return register_results.json()["accessToken"]
 
-    async def get_status_data(self) -> SpanPanelStatus:
-        response = await self.get_data(URL_STATUS)
+    async def get_status_data(
+        self, lane: str = LANE_POLL, deadline: float | None = None
+    ) -> SpanPanelStatus:
+        response = await self.get_data(URL_STATUS, lane, deadline)
         status_data = SpanPanelStatus.from_dict(response.json())
         return status_data
 
-    async def get_panel_data(self) -> SpanPanelData:
-        response = await self.get_data(URL_PANEL)
+    async def get_panel_data(
+        self, lane: str = LANE_POLL, deadline: float | None = None
+    ) -> SpanPanelData:
+        response = await self.get_data(URL_PANEL, lane, deadline)
         panel_data = SpanPanelData.from_dict(response.json())
 
         # Span Panel API might return empty result.
@@ -70,8 +127,10 @@ class SpanPanelApi:
 
         return panel_data
 
-    async def get_circuits_data(self) -> SpanPanelCircuit:
-        response = await self.get_data(URL_CIRCUITS)
+    async def get_circuits_data(
+        self, lane: str = LANE_POLL, deadline: float | None = None
+    ) -> SpanPanelCircuit:
+        response = await self.get_data(URL_CIRCUITS, lane, deadline)
         raw_curcuits_data = response.json()["circuits"]
 
         # Span Panel API might return empty result.
@@ -85,6 +144,12 @@ class SpanPanelApi:
 
         return circuits_data
 
+    async def get_circuit_data(
+        self, circuit_id: str, lane: str = LANE_POLL
+    ) -> SpanPanelCircuit:
+        response = await self.get_data(f"{URL_CIRCUITS}/{circuit_id}", lane)
+        return SpanPanelCircuit.from_dict(response.json())
+
     async def set_relay(self, circuit: SpanPanelCircuit, state: CircuitRelayState):
         await self.post_data(
             f"{URL_CIRCUITS}/{circuit.circuit_id}",
@@ -97,46 +162,164 @@ class SpanPanelApi:
             {"priorityIn": {"priority": priority.name}},
         )
 
-    async def get_data(self, url) -> httpx.Response:
+    async def stream_events(self) -> AsyncIterator[tuple[str, dict[str, Any]]]:
+        """
+        Yield (event, payload) pairs from the panel's server-sent event stream.
+        Lines starting with ':' are keepalives and are skipped, as are events
+        whose data is not JSON. The stream is
+        one long-lived connection and does not go through the governor.
+        """
+        url = URL_STREAM.format(self.host)
+        headers = {"Accept": "text/event-stream"}
+        if self.access_token:
+            headers["Authorization"] = f"Bearer {self.access_token}"
+        timeout = httpx.Timeout(API_TIMEOUT, read=STREAM_IDLE_TIMEOUT)
+
+        _LOGGER.debug("HTTP STREAM: %s", url)
+        async with self.async_client as client:
+            async with client.stream(
+                "GET", url, headers=headers, timeout=timeout
+            ) as resp:
+                resp.raise_for_status()
+                event, data = "message", []
+                async for line in resp.aiter_lines():
+                    if not line:
+                        if data:
+                            try:
+                                payload = json.loads("\n".join(data))
+                            except ValueError:
+                                _LOGGER.warning("Ignoring unparsable %s event", event)
+                            else:
+                                yield event, payload
+                        event, data = "message", []
+                    elif line.startswith(":"):
+                        continue
+                    else:
+                        field, _, value = line.partition(":")
+                        value = value.removeprefix(" ")
+                        if field == "event":
+                            event = value
+                        elif field == "data":
+                            data.append(value)
+
+    async def get_data(
+        self, url, lane: str = LANE_POLL, deadline: float | None = None
+    ) -> httpx.Response:
         """
         Fetch data from the endpoint and if inverters selected default
         to fetching inverter data.
         Update from PC endpoint.
+        deadline is a time.monotonic() value that bounds every attempt,
+        including time spent waiting on the governor.
         """
         formatted_url = url.format(self.host)
         response = await self._async_fetch_with_retry(
-            formatted_url, follow_redirects=False
+            formatted_url, lane, deadline, follow_redirects=False
         )
         return response
 
-    async def post_data(self, url: str, payload: dict) -> httpx.Response:
+    async def post_data(
+        self, url: str, payload: dict, lane: str = LANE_CONTROL
+    ) -> httpx.Response:
         formatted_url = url.format(self.host)
-        response = await self._async_post(formatted_url, payload)
+        response = await self._async_post(formatted_url, lane, payload)
         return response
 
-    async def _async_fetch_with_retry(self, url, **kwargs) -> httpx.Response:
+    async def _async_fetch_with_retry(
+        self, url, lane, deadline=None, **kwargs
+    ) -> httpx.Response:
         """
-        Retry 3 times to fetch the url if there is a transport error.
+        Retry 3 times to fetch the url if there is a transport error, as long
+        as the deadline leaves time for another attempt.
         """
         headers = {"Accept": "application/json"}
         if self.access_token:
             headers["Authorization"] = f"Bearer {self.access_token}"
 
         for attempt in range(3):
+            timeout = API_TIMEOUT
+            if deadline is not None:
+                timeout = min(timeout, deadline - time.monotonic())
+                if timeout <= 0:
+                    raise httpx.TimeoutException(f"Deadline exceeded for {url}")
+
             _LOGGER.debug("HTTP GET Attempt #%s: %s", attempt + 1, url)
             try:
-                async with self.async_client as client:
-                    resp = await client.get(
-                        url, timeout=API_TIMEOUT, headers=headers, **kwargs
-                    )
-                    resp.raise_for_status()
-                    _LOGGER.debug("Fetched from %s: %s: %s", url, resp, resp.text)
-                    return resp
+                return await self._async_fetch_hedged(
+                    url, lane, timeout, headers, **kwargs
+                )
             except httpx.TransportError:
                 if attempt == 2:
                     raise
 
-    async def _async_post(self, url, json=None, **kwargs) -> httpx.Response:
+    async def _async_fetch_hedged(
+        self, url, lane, timeout, headers, **kwargs
+    ) -> httpx.Response:
+        """
+        Fetch the url once. With hedging on, a second request is sent if the
+        first is still outstanding after this url's p95 latency, and whichever
+        answers first wins.
+        """
+        hedge_after = self.latency.p95(url) if self.hedge else None
+        if hedge_after is None or hedge_after >= timeout:
+            return await self._async_fetch(url, lane, timeout, headers, **kwargs)
+
+        first = asyncio.ensure_future(
+            self._async_fetch(url, lane, timeout, headers, **kwargs)
+        )
+        first.add_done_callback(_retrieve_exception)
+
+        pending = {first}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=hedge_after)
+            if not done:
+                _LOGGER.debug("Hedging %s after %.3fs", url, hedge_after)
+                self.hedged_requests += 1
+                hedge = asyncio.ensure_future(
+                    self._async_fetch(
+                        url, lane, timeout - hedge_after, headers, **kwargs
+                    )
+                )
+                hedge.add_done_callback(_retrieve_exception)
+                pending.add(hedge)
+
+            error: BaseException | None = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _async_fetch(self, url, lane, timeout, headers, **kwargs):
+        """
+        Fetch the url once, bounding the wait for the governor and the request
+        itself by timeout.
+        """
+
+        async def _fetch() -> httpx.Response:
+            async with self.governor.slot(lane), self.async_client as client:
+                started = time.monotonic()
+                resp = await client.get(url, timeout=timeout, headers=headers, **kwargs)
+                if self.recorder is not None:
+                    self.recorder.record(resp, time.monotonic() - started)
+                resp.raise_for_status()
+                self.latency.record(url, time.monotonic() - started)
+                _LOGGER.debug("Fetched from %s: %s: %s", url, resp, resp.text)
+                return resp
+
+        try:
+            return await asyncio.wait_for(_fetch(), timeout)
+        except asyncio.TimeoutError as err:
+            raise httpx.TimeoutException(f"Timed out fetching {url}") from err
+
+    async def _async_post(self, url, lane, json=None, **kwargs) -> httpx.Response:
         """
         POST to the url
         """
@@ -145,7 +328,7 @@ class SpanPanelApi:
             headers["Authorization"] = f"Bearer {self.access_token}"
 
         _LOGGER.debug("HTTP POST Attempt: %s", url)
-        async with self.async_client as client:
+        async with self.governor.slot(lane), self.async_client as client:
             resp = await client.post(
                 url, json=json, headers=headers, timeout=API_TIMEOUT, **kwargs
             )
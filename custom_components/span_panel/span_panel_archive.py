@@ -0,0 +1,445 @@
+"""Columnar on-disk archive of panel and circuit samples."""
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Collection, Iterable, Iterator
+import json
+import logging
+import math
+import mmap
+import os
+import shutil
+import struct
+import threading
+import zlib
+
+from .const import (
+    ARCHIVE_COMPRESSION_LEVEL,
+    ARCHIVE_DOWNSAMPLE_AFTER,
+    ARCHIVE_DOWNSAMPLE_RESOLUTION,
+    ARCHIVE_FLUSH_INTERVAL,
+    ARCHIVE_RETENTION,
+    ARCHIVE_SEGMENT_SECONDS,
+    SECTION_PANEL,
+)
+from .span_panel_circuit import SpanPanelCircuit, circuit_section
+from .span_panel_data import SpanPanelData
+
+_LOGGER = logging.getLogger(__name__)
+
+SEGMENT_MAGIC = b"SPNA"
+SEGMENT_SUFFIX = ".seg"
+ACTIVE_PREFIX = "active-"
+COLUMN_SUFFIX = ".col"
+TIME_COLUMN = "time"
+ITEM_SIZE = array("d").itemsize
+_HEADER = struct.Struct("<4sI")
+
+Columns = tuple[array, dict[str, array]]
+
+
+def archive_sample(
+    panel: SpanPanelData,
+    circuits: dict[str, SpanPanelCircuit],
+    stale: Collection[str] = (),
+) -> dict[str, float]:
+    """
+    One value per series. Circuit power is net consumption, like the
+    circuit group totals. Sections in stale only hold the last good value,
+    so their series are left out and read back as missing.
+    """
+    values = {}
+    if SECTION_PANEL not in stale:
+        values["panel.grid_power"] = panel.instant_grid_power
+        values["panel.feedthrough_power"] = panel.feedthrough_power
+        values["panel.consumed_energy"] = panel.main_meter_energy_consumed
+        values["panel.produced_energy"] = panel.main_meter_energy_produced
+    for id, circuit in circuits.items():
+        if circuit_section(id) in stale:
+            continue
+        values[f"{id}.power"] = -circuit.instant_power
+        values[f"{id}.consumed_energy"] = circuit.consumed_energy
+        values[f"{id}.produced_energy"] = circuit.produced_energy
+    return values
+
+
+def is_counter(name: str) -> bool:
+    return name.endswith("_energy")
+
+
+def downsample(times: array, columns: dict[str, array], resolution: float) -> Columns:
+    """
+    Average each series over resolution-wide buckets. Energy counters keep
+    their last value in the bucket instead. Missing values (NaN) are skipped.
+    """
+    buckets: list[tuple[int, int]] = []
+    for index, timestamp in enumerate(times):
+        bucket = math.floor(timestamp / resolution)
+        if not buckets or buckets[-1][0] != bucket:
+            buckets.append((bucket, index))
+    bounds = [index for _, index in buckets] + [len(times)]
+
+    out_times = array("d", (bucket * resolution for bucket, _ in buckets))
+    out_columns = {}
+    for name, column in columns.items():
+        out = array("d")
+        for start, end in zip(bounds, bounds[1:]):
+            values = [value for value in column[start:end] if not math.isnan(value)]
+            if not values:
+                out.append(math.nan)
+            elif is_counter(name):
+                out.append(values[-1])
+            else:
+                out.append(sum(values) / len(values))
+        out_columns[name] = out
+    return out_times, out_columns
+
+
+def _slice(times: array, start: float, end: float) -> slice:
+    return slice(bisect_left(times, start), bisect_right(times, end))
+
+
+class SealedSegment:
+    """
+    A compressed segment file: a small JSON header locating each column,
+    followed by one zlib stream per column. Reads map the file and only
+    decompress the requested columns.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as file:
+            magic, length = _HEADER.unpack(file.read(_HEADER.size))
+            if magic != SEGMENT_MAGIC:
+                raise ValueError(f"{path} is not an archive segment")
+            header = json.loads(file.read(length))
+        self.data_offset = _HEADER.size + length
+        self.start: float = header["start"]
+        self.resolution: float | None = header["resolution"]
+        self.count: int = header["count"]
+        self.columns: dict[str, list[int]] = header["columns"]
+
+    @staticmethod
+    def write(
+        path: str,
+        start: float,
+        times: array,
+        columns: dict[str, array],
+        resolution: float | None = None,
+    ) -> None:
+        blobs = {TIME_COLUMN: times, **columns}
+        offsets = {}
+        payload = bytearray()
+        for name, column in blobs.items():
+            blob = zlib.compress(column.tobytes(), ARCHIVE_COMPRESSION_LEVEL)
+            offsets[name] = [len(payload), len(blob)]
+            payload += blob
+        header = json.dumps(
+            {
+                "start": start,
+                "resolution": resolution,
+                "count": len(times),
+                "columns": offsets,
+            }
+        ).encode()
+
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as file:
+            file.write(_HEADER.pack(SEGMENT_MAGIC, len(header)))
+            file.write(header)
+            file.write(payload)
+        os.replace(tmp, path)
+
+    def read(
+        self,
+        names: Iterable[str] | None = None,
+        start: float = -math.inf,
+        end: float = math.inf,
+    ) -> Columns:
+        """Rows between start and end of the named columns, or of all."""
+        if names is None:
+            names = [name for name in self.columns if name != TIME_COLUMN]
+        with open(self.path, "rb") as file, mmap.mmap(
+            file.fileno(), 0, access=mmap.ACCESS_READ
+        ) as mapped:
+
+            def _column(name: str) -> array:
+                column = array("d")
+                if name not in self.columns:
+                    column.extend([math.nan] * self.count)
+                    return column
+                offset, length = self.columns[name]
+                offset += self.data_offset
+                column.frombytes(zlib.decompress(mapped[offset : offset + length]))
+                return column
+
+            times = _column(TIME_COLUMN)
+            rows = _slice(times, start, end)
+            return times[rows], {name: _column(name)[rows] for name in names}
+
+
+class ActiveSegment:
+    """
+    The segment being written: a directory of raw float64 column files, one
+    value per sample. Rows are buffered in memory and appended to every
+    column file in one batch once ARCHIVE_FLUSH_INTERVAL seconds have built
+    up, opening each file only for that write. A series first seen
+    mid-segment is back-filled with NaN so every column stays aligned with
+    the time column, which is written last.
+    """
+
+    def __init__(self, directory: str, start: float) -> None:
+        self.directory = directory
+        self.start = start
+        os.makedirs(directory, exist_ok=True)
+        self.names = {
+            file[: -len(COLUMN_SUFFIX)]
+            for file in os.listdir(directory)
+            if file.endswith(COLUMN_SUFFIX) and file != TIME_COLUMN + COLUMN_SUFFIX
+        }
+        self.flushed = self._size(TIME_COLUMN)
+        self._times = array("d")
+        self._pending: dict[str, array] = {}
+        # Trim or pad columns left uneven by an interrupted flush.
+        for name in [TIME_COLUMN, *self.names]:
+            if not os.path.exists(self._path(name)):
+                continue
+            if os.path.getsize(self._path(name)) > self.flushed * ITEM_SIZE:
+                with open(self._path(name), "r+b") as file:
+                    file.truncate(self.flushed * ITEM_SIZE)
+            elif (size := self._size(name)) < self.flushed:
+                with open(self._path(name), "ab") as file:
+                    file.write(self._nan(self.flushed - size))
+
+    @property
+    def count(self) -> int:
+        return self.flushed + len(self._times)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name + COLUMN_SUFFIX)
+
+    def _size(self, name: str) -> int:
+        try:
+            return os.path.getsize(self._path(name)) // ITEM_SIZE
+        except FileNotFoundError:
+            return 0
+
+    @staticmethod
+    def _nan(count: int) -> bytes:
+        return array("d", [math.nan] * count).tobytes()
+
+    def append(self, timestamp: float, values: dict[str, float]) -> None:
+        self.names.update(values.keys())
+        buffered = len(self._times)
+        for name in self.names:
+            column = self._pending.get(name)
+            if column is None:
+                column = self._pending[name] = array("d", [math.nan] * buffered)
+            column.append(values.get(name, math.nan))
+        self._times.append(timestamp)
+        if timestamp - self._times[0] >= ARCHIVE_FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the buffered rows to the column files."""
+        if not self._times:
+            return
+        for name, column in self._pending.items():
+            missing = self.flushed - self._size(name)
+            with open(self._path(name), "ab") as file:
+                if missing > 0:
+                    file.write(self._nan(missing))
+                file.write(column.tobytes())
+        with open(self._path(TIME_COLUMN), "ab") as file:
+            file.write(self._times.tobytes())
+        self.flushed += len(self._times)
+        self._times = array("d")
+        self._pending = {}
+
+    def read(
+        self,
+        names: Iterable[str] | None = None,
+        start: float = -math.inf,
+        end: float = math.inf,
+    ) -> Columns:
+        """
+        Rows between start and end of the named columns, or of all. Only
+        those rows are copied out of each mapped column file, followed by
+        any still buffered.
+        """
+
+        def _column(name: str, rows: slice) -> array:
+            column = array("d")
+            on_disk = min(rows.stop, self.flushed)
+            if rows.start < on_disk:
+                if os.path.exists(self._path(name)):
+                    with open(self._path(name), "rb") as file, mmap.mmap(
+                        file.fileno(), 0, access=mmap.ACCESS_READ
+                    ) as mapped:
+                        column.frombytes(
+                            mapped[rows.start * ITEM_SIZE : on_disk * ITEM_SIZE]
+                        )
+                else:
+                    column.extend([math.nan] * (on_disk - rows.start))
+            if rows.stop > self.flushed:
+                buffered = slice(
+                    max(rows.start, self.flushed) - self.flushed,
+                    rows.stop - self.flushed,
+                )
+                if name == TIME_COLUMN:
+                    column.extend(self._times[buffered])
+                elif name in self._pending:
+                    column.extend(self._pending[name][buffered])
+                else:
+                    column.extend([math.nan] * (buffered.stop - buffered.start))
+            return column
+
+        if not self.count:
+            return array("d"), {name: array("d") for name in names or ()}
+        times = _column(TIME_COLUMN, slice(0, self.count))
+        rows = _slice(times, start, end)
+        names = self.names if names is None else names
+        return times[rows], {name: _column(name, rows) for name in names}
+
+    def close(self) -> None:
+        self.flush()
+
+    def seal(self, path: str) -> None:
+        """Compress into a sealed segment file and remove the directory."""
+        self.close()
+        if self.count:
+            times, columns = self.read()
+            SealedSegment.write(path, self.start, times, columns)
+        shutil.rmtree(self.directory)
+
+
+class SpanPanelArchive:
+    """
+    Time-partitioned archive of samples for one panel.
+
+    Samples go to an active segment covering ARCHIVE_SEGMENT_SECONDS; the
+    first sample past its end seals it into a compressed segment file.
+    maintain() downsamples sealed segments older than ARCHIVE_DOWNSAMPLE_AFTER
+    to ARCHIVE_DOWNSAMPLE_RESOLUTION and deletes those older than
+    ARCHIVE_RETENTION. Every method does blocking file IO and is meant to
+    run in an executor; a lock serializes them.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._active: ActiveSegment | None = None
+        self._last: float | None = None
+
+    def _segment_path(self, start: float) -> str:
+        return os.path.join(self.directory, f"{int(start):010d}{SEGMENT_SUFFIX}")
+
+    def _active_path(self, start: float) -> str:
+        return os.path.join(self.directory, f"{ACTIVE_PREFIX}{int(start):010d}")
+
+    def _sealed(self) -> list[tuple[float, str]]:
+        return sorted(
+            (float(file[: -len(SEGMENT_SUFFIX)]), os.path.join(self.directory, file))
+            for file in os.listdir(self.directory)
+            if file.endswith(SEGMENT_SUFFIX)
+        )
+
+    def open(self, now: float) -> None:
+        """Resume the current active segment and seal any left behind."""
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            current = now - now % ARCHIVE_SEGMENT_SECONDS
+            for file in sorted(os.listdir(self.directory)):
+                if not file.startswith(ACTIVE_PREFIX):
+                    continue
+                start = float(file[len(ACTIVE_PREFIX) :])
+                segment = ActiveSegment(os.path.join(self.directory, file), start)
+                if start == current:
+                    self._active = segment
+                    if segment.count:
+                        self._last = segment.read([])[0][-1]
+                else:
+                    segment.seal(self._segment_path(start))
+
+    def append(self, timestamp: float, values: dict[str, float]) -> None:
+        with self._lock:
+            # Executor jobs may finish out of order; keep time increasing.
+            if self._last is not None and timestamp <= self._last:
+                return
+            start = timestamp - timestamp % ARCHIVE_SEGMENT_SECONDS
+            if self._active is not None and self._active.start != start:
+                self._active.seal(self._segment_path(self._active.start))
+                self._active = None
+            if self._active is None:
+                self._active = ActiveSegment(self._active_path(start), start)
+            self._active.append(timestamp, values)
+            self._last = timestamp
+
+    def flush(self) -> None:
+        """Write buffered samples to disk, as on shutdown."""
+        with self._lock:
+            if self._active is not None:
+                self._active.flush()
+
+    def query(
+        self, start: float, end: float, series: list[str] | None = None
+    ) -> Iterator[Columns]:
+        """
+        Yield (times, columns) one segment at a time for samples between
+        start and end inclusive, so memory stays bounded by a segment.
+        Unknown series come back as NaN.
+        """
+        with self._lock:
+            segments: list = [
+                SealedSegment(path)
+                for segment_start, path in self._sealed()
+                if segment_start <= end
+                and segment_start + ARCHIVE_SEGMENT_SECONDS > start
+            ]
+            if self._active is not None and self._active.start <= end:
+                segments.append(self._active)
+
+        for segment in segments:
+            with self._lock:
+                try:
+                    times, columns = segment.read(series, start, end)
+                except (FileNotFoundError, ValueError):
+                    # Sealed or pruned since the listing.
+                    continue
+            if times:
+                yield times, columns
+
+    def series(self) -> list[str]:
+        """Series names known to the newest segment."""
+        with self._lock:
+            if self._active is not None:
+                return sorted(self._active.names)
+            sealed = self._sealed()
+            if not sealed:
+                return []
+            columns = SealedSegment(sealed[-1][1]).columns
+            return sorted(name for name in columns if name != TIME_COLUMN)
+
+    def maintain(self, now: float) -> None:
+        with self._lock:
+            for start, path in self._sealed():
+                if start + ARCHIVE_SEGMENT_SECONDS < now - ARCHIVE_RETENTION:
+                    _LOGGER.debug("Archive dropping segment %s", path)
+                    os.remove(path)
+                elif start + ARCHIVE_SEGMENT_SECONDS < now - ARCHIVE_DOWNSAMPLE_AFTER:
+                    segment = SealedSegment(path)
+                    if segment.resolution is not None:
+                        continue
+                    times, columns = downsample(
+                        *segment.read(), ARCHIVE_DOWNSAMPLE_RESOLUTION
+                    )
+                    SealedSegment.write(
+                        path, start, times, columns, ARCHIVE_DOWNSAMPLE_RESOLUTION
+                    )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._active is not None:
+                self._active.close()
+                self._active = None
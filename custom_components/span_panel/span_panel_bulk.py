@@ -0,0 +1,98 @@
+"""Planning and bounded-concurrency execution of bulk circuit changes."""
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import logging
+
+import httpx
+
+from .const import BULK_MAX_CONCURRENT, CircuitPriority, CircuitRelayState
+from .span_panel_api import SpanPanelApi
+from .span_panel_circuit import SpanPanelCircuit
+
+_LOGGER = logging.getLogger(__name__)
+
+RESULT_OK = "ok"
+RESULT_UNCHANGED = "unchanged"
+RESULT_UNKNOWN_CIRCUIT = "unknown_circuit"
+RESULT_NOT_CONTROLLABLE = "not_controllable"
+
+
+@dataclasses.dataclass
+class CircuitTarget:
+    circuit_id: str
+    relay_state: CircuitRelayState | None = None
+    priority: CircuitPriority | None = None
+
+
+def plan_circuit_targets(
+    circuits: dict[str, SpanPanelCircuit], targets: list[CircuitTarget]
+) -> tuple[list[CircuitTarget], dict[str, str]]:
+    """
+    Merge targets per circuit (later entries win) and drop changes that are
+    already in effect. Returns the remaining work and the results of
+    everything that needs no request.
+    """
+    merged: dict[str, CircuitTarget] = {}
+    for target in targets:
+        current = merged.setdefault(
+            target.circuit_id, CircuitTarget(target.circuit_id)
+        )
+        if target.relay_state is not None:
+            current.relay_state = target.relay_state
+        if target.priority is not None:
+            current.priority = target.priority
+
+    plan: list[CircuitTarget] = []
+    results: dict[str, str] = {}
+    for circuit_id, target in merged.items():
+        circuit = circuits.get(circuit_id)
+        if circuit is None:
+            results[circuit_id] = RESULT_UNKNOWN_CIRCUIT
+            continue
+        if not circuit.is_user_controllable:
+            results[circuit_id] = RESULT_NOT_CONTROLLABLE
+            continue
+        if target.relay_state is not None and (
+            circuit.relay_state == target.relay_state.name
+        ):
+            target.relay_state = None
+        if target.priority is not None and circuit.priority == target.priority.name:
+            target.priority = None
+        if target.relay_state is None and target.priority is None:
+            results[circuit_id] = RESULT_UNCHANGED
+        else:
+            plan.append(target)
+
+    return plan, results
+
+
+async def apply_circuit_targets(
+    api: SpanPanelApi,
+    circuits: dict[str, SpanPanelCircuit],
+    plan: list[CircuitTarget],
+    max_concurrent: int = BULK_MAX_CONCURRENT,
+) -> dict[str, str]:
+    """
+    Execute a plan with at most max_concurrent circuits changing at once.
+    Each circuit's changes are sent in order; failures are reported per
+    circuit and do not stop the rest of the plan.
+    """
+    slots = asyncio.Semaphore(max_concurrent)
+
+    async def _apply(target: CircuitTarget) -> str:
+        circuit = circuits[target.circuit_id]
+        async with slots:
+            try:
+                if target.relay_state is not None:
+                    await api.set_relay(circuit, target.relay_state)
+                if target.priority is not None:
+                    await api.set_priority(circuit, target.priority)
+            except httpx.HTTPError as err:
+                _LOGGER.warning("Failed to update circuit %s: %s", circuit.name, err)
+                return str(err)
+        return RESULT_OK
+
+    outcomes = await asyncio.gather(*(_apply(target) for target in plan))
+    return {target.circuit_id: outcome for target, outcome in zip(plan, outcomes)}
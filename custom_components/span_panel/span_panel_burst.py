@@ -0,0 +1,138 @@
+"""Time-limited high-rate sampling of selected circuits."""
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+import logging
+import time
+from typing import Any
+
+import httpx
+
+from .const import (
+    BURST_MAX_CONCURRENT,
+    BURST_MAX_SAMPLES,
+    BURST_PER_CIRCUIT_LIMIT,
+    BURST_RATE_SHARE,
+)
+from .exceptions import SpanPanelBurstBusy
+from .span_panel_api import SpanPanelApi
+from .span_panel_circuit import SpanPanelCircuit
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class SpanPanelBurstSampler:
+    """
+    Runs burst captures against one panel, independently of regular polling.
+
+    At most BURST_MAX_CONCURRENT captures run at once; further requests are
+    refused with SpanPanelBurstBusy rather than queued, so callers learn right
+    away that the panel is already being sampled.
+
+    A capture shares the governor's poll lane with the coordinator, so it
+    only uses BURST_RATE_SHARE of the governor's rate: the interval is
+    stretched to fit, and circuits are fetched individually only while that
+    costs no more than one circuits document per interval would.
+    """
+
+    def __init__(
+        self, api: SpanPanelApi, max_concurrent: int = BURST_MAX_CONCURRENT
+    ) -> None:
+        self._api = api
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._tasks: set[asyncio.Task] = set()
+
+    @property
+    def busy(self) -> bool:
+        return self._slots.locked()
+
+    async def capture(
+        self,
+        circuit_ids: list[str],
+        interval: float,
+        duration: float,
+        max_samples: int = BURST_MAX_SAMPLES,
+    ) -> list[dict[str, Any]]:
+        """
+        Sample the given circuits every interval seconds for duration seconds.
+        Only the newest max_samples samples are kept.
+        """
+        if self.busy:
+            raise SpanPanelBurstBusy()
+
+        samples: deque[dict[str, Any]] = deque(maxlen=max_samples)
+        task = asyncio.current_task()
+        async with self._slots:
+            self._tasks.add(task)
+            try:
+                await self._sample(circuit_ids, interval, duration, samples)
+            finally:
+                self._tasks.discard(task)
+
+        return list(samples)
+
+    def stop(self) -> None:
+        """Cancel every running capture."""
+        for task in self._tasks:
+            task.cancel()
+
+    async def _sample(
+        self,
+        circuit_ids: list[str],
+        interval: float,
+        duration: float,
+        samples: deque[dict[str, Any]],
+    ) -> None:
+        individually, interval = self._plan(len(circuit_ids), interval)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + duration
+        next_tick = loop.time()
+        while next_tick < deadline:
+            try:
+                circuits = await self._fetch(circuit_ids, individually)
+            except httpx.HTTPError as err:
+                _LOGGER.debug("Burst sample failed: %s", err)
+            else:
+                now = time.time()
+                for circuit in circuits:
+                    samples.append(
+                        {
+                            "time": now,
+                            "circuit_id": circuit.circuit_id,
+                            "instant_power": circuit.instant_power,
+                            "instant_power_update_time": (
+                                circuit.instant_power_update_time
+                            ),
+                            "relay_state": circuit.relay_state,
+                        }
+                    )
+
+            # Never fire back-to-back requests to catch up after a slow one.
+            next_tick = max(next_tick + interval, loop.time())
+            await asyncio.sleep(next_tick - loop.time())
+
+    def _plan(self, count: int, interval: float) -> tuple[bool, float]:
+        """
+        Whether to fetch count circuits individually, and the interval the
+        governor budget allows for it.
+        """
+        budget = self._api.governor.rate * BURST_RATE_SHARE
+        individually = count <= BURST_PER_CIRCUIT_LIMIT and count / budget <= interval
+        allowed = max(interval, (count if individually else 1) / budget)
+        if allowed > interval:
+            _LOGGER.debug(
+                "Burst interval stretched from %.2f s to %.2f s", interval, allowed
+            )
+        return individually, allowed
+
+    async def _fetch(
+        self, circuit_ids: list[str], individually: bool
+    ) -> list[SpanPanelCircuit]:
+        if individually:
+            return await asyncio.gather(
+                *(self._api.get_circuit_data(id) for id in circuit_ids)
+            )
+
+        circuits = await self._api.get_circuits_data()
+        return [circuits[id] for id in circuit_ids if id in circuits]
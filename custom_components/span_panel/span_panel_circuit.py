@@ -4,6 +4,11 @@ from typing import Any
 from .const import CircuitRelayState
 
 
+def circuit_section(circuit_id: str) -> str:
+    """Freshness section key of a single circuit."""
+    return f"circuit.{circuit_id}"
+
+
 @dataclasses.dataclass
 class SpanPanelCircuit:
     circuit_id: str
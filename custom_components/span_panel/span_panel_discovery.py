@@ -0,0 +1,60 @@
+"""Find Span panels by probing every address of a subnet."""
+from __future__ import annotations
+
+import asyncio
+import ipaddress
+import logging
+
+import httpx
+
+from .const import SCAN_CONCURRENCY, SCAN_MAX_HOSTS, SCAN_TIMEOUT, URL_STATUS
+from .span_panel_status import SpanPanelStatus
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def scan_hosts(network: str) -> list[str]:
+    """
+    Host addresses of an IPv4 network such as "192.168.10.0/24". Raises
+    ValueError for anything else or for networks over SCAN_MAX_HOSTS.
+    """
+    subnet = ipaddress.IPv4Network(network, strict=False)
+    if subnet.num_addresses > SCAN_MAX_HOSTS + 2:
+        raise ValueError(f"{network} has more than {SCAN_MAX_HOSTS} hosts")
+    return [str(host) for host in subnet.hosts()]
+
+
+async def probe_host(client: httpx.AsyncClient, host: str) -> SpanPanelStatus | None:
+    """
+    Probes go straight to the client rather than through SpanPanelApi, so
+    scanning does not create a request governor for every address.
+    """
+    try:
+        response = await client.get(URL_STATUS.format(host), timeout=SCAN_TIMEOUT)
+        response.raise_for_status()
+        return SpanPanelStatus.from_dict(response.json())
+    except (httpx.HTTPError, ValueError, KeyError, TypeError):
+        return None
+
+
+async def scan_subnet(client: httpx.AsyncClient, network: str) -> dict[str, str]:
+    """
+    Probe every host of a network, at most SCAN_CONCURRENCY at a time.
+
+    Returns host by serial number. A panel answering on several addresses
+    (wired and wireless) is reported once, at its lowest address.
+    """
+    hosts = scan_hosts(network)
+    semaphore = asyncio.Semaphore(SCAN_CONCURRENCY)
+
+    async def _probe(host: str) -> SpanPanelStatus | None:
+        async with semaphore:
+            return await probe_host(client, host)
+
+    results = await asyncio.gather(*(_probe(host) for host in hosts))
+    found: dict[str, str] = {}
+    for host, status in zip(hosts, results):
+        if status is not None:
+            found.setdefault(status.serial_number, host)
+    _LOGGER.debug("Scanned %d hosts of %s, found %s", len(hosts), network, found)
+    return found
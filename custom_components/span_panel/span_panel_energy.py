@@ -0,0 +1,91 @@
+"""Average power derived from energy counter deltas."""
+from __future__ import annotations
+
+import dataclasses
+
+from .const import ENERGY_GAP_FACTOR
+
+
+@dataclasses.dataclass
+class IntervalPower:
+    """
+    Mean consumed and produced power between two counter readings. Unlike
+    instant power, which is a single sample, these account for every watt
+    hour the panel metered over the interval. gap marks an interval long
+    enough that polls were missed; sensors leave its mean unpublished.
+    """
+
+    consumed_power: float
+    produced_power: float
+    interval: float
+    gap: bool = False
+    reset: bool = False
+
+    @property
+    def net_power(self) -> float:
+        """Consumed minus produced, so positive while drawing."""
+        return self.consumed_power - self.produced_power
+
+
+@dataclasses.dataclass
+class CounterState:
+    time: float
+    consumed: float
+    produced: float
+    result: IntervalPower | None = None
+
+
+class SpanPanelEnergyAccounting:
+    """
+    Keeps the last counter reading of each series (the grid, feed through
+    and every circuit) and turns each new reading into an IntervalPower.
+
+    A reading whose time has not moved on is the same accumulation as before
+    and leaves the result alone. A counter that goes backwards was reset,
+    and, as Home Assistant does for total_increasing sensors, its new value
+    is taken as the energy since the reset. Time going backwards (a panel
+    clock step) starts the series over.
+    """
+
+    def __init__(self) -> None:
+        self._series: dict[str, CounterState] = {}
+
+    def get(self, key: str) -> IntervalPower | None:
+        state = self._series.get(key)
+        return state.result if state is not None else None
+
+    def update(
+        self,
+        key: str,
+        time: float,
+        consumed: float,
+        produced: float,
+        expected_interval: float,
+    ) -> IntervalPower | None:
+        state = self._series.get(key)
+        if state is None or time < state.time:
+            self._series[key] = CounterState(time, consumed, produced)
+            return None
+        interval = time - state.time
+        if interval == 0:
+            return state.result
+
+        consumed_delta = consumed - state.consumed
+        produced_delta = produced - state.produced
+        reset = consumed_delta < 0 or produced_delta < 0
+        if consumed_delta < 0:
+            consumed_delta = consumed
+        if produced_delta < 0:
+            produced_delta = produced
+
+        state.result = IntervalPower(
+            consumed_power=consumed_delta * 3600 / interval,
+            produced_power=produced_delta * 3600 / interval,
+            interval=interval,
+            gap=interval > expected_interval * ENERGY_GAP_FACTOR,
+            reset=reset,
+        )
+        state.time = time
+        state.consumed = consumed
+        state.produced = produced
+        return state.result
@@ -0,0 +1,164 @@
+"""Per-panel request governor: rate limit, in-flight cap and priority lanes."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator
+import contextlib
+import dataclasses
+import heapq
+import itertools
+import time
+
+from .const import (
+    GOVERNOR_BURST,
+    GOVERNOR_MAX_IN_FLIGHT,
+    GOVERNOR_RATE,
+    LANE_CONTROL,
+    LANE_POLL,
+    LANE_PROBE,
+)
+
+LANES = (LANE_CONTROL, LANE_PROBE, LANE_POLL)
+# For offline tools talking to simulated or recorded panels, where there is no
+# panel to protect and rate limiting would only measure itself.
+UNLIMITED_RATE = 1e9
+
+
+@dataclasses.dataclass
+class LaneStats:
+    waiting: int = 0
+    requests: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+    @property
+    def mean_wait(self) -> float:
+        return self.total_wait / self.requests if self.requests else 0.0
+
+
+class SpanPanelGovernor:
+    """
+    Admits requests to one panel's embedded HTTP server.
+
+    Requests take a token from a bucket refilled at rate per second (up to
+    burst) and count against max_in_flight. Waiters are admitted by lane,
+    LANE_CONTROL first, then LANE_PROBE, then LANE_POLL, and in arrival order
+    within a lane. One in-flight slot is held back for LANE_CONTROL so a relay
+    command never waits for a slow bulk read to finish.
+    """
+
+    def __init__(
+        self,
+        rate: float = GOVERNOR_RATE,
+        burst: int = GOVERNOR_BURST,
+        max_in_flight: int = GOVERNOR_MAX_IN_FLIGHT,
+    ) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.stats = {lane: LaneStats() for lane in LANES}
+        self._tokens = float(burst)
+        self._refilled = time.monotonic()
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._wakeup: asyncio.TimerHandle | None = None
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(stats.waiting for stats in self.stats.values())
+
+    def metrics(self) -> dict[str, dict[str, float]]:
+        return {
+            lane: {
+                "waiting": stats.waiting,
+                "requests": stats.requests,
+                "mean_wait_ms": round(stats.mean_wait * 1000, 1),
+                "max_wait_ms": round(stats.max_wait * 1000, 1),
+            }
+            for lane, stats in self.stats.items()
+        }
+
+    @contextlib.asynccontextmanager
+    async def slot(self, lane: str = LANE_POLL) -> AsyncIterator[None]:
+        """Hold an admission slot for the duration of one request."""
+        stats = self.stats[lane]
+        started = time.monotonic()
+        if self._waiters or not self._try_admit(lane):
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(
+                self._waiters, (LANES.index(lane), next(self._sequence), future)
+            )
+            stats.waiting += 1
+            self._dispatch()
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # Admitted just before being cancelled: hand the slot on.
+                    self._release()
+                raise
+            finally:
+                stats.waiting -= 1
+
+        waited = time.monotonic() - started
+        stats.requests += 1
+        stats.total_wait += waited
+        stats.max_wait = max(stats.max_wait, waited)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self.burst, self._tokens + (now - self._refilled) * self.rate
+        )
+        self._refilled = now
+
+    def _try_admit(self, lane: str) -> bool:
+        limit = self.max_in_flight
+        if lane != LANE_CONTROL and limit > 1:
+            limit -= 1
+        if self.in_flight >= limit:
+            return False
+        self._refill()
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        self.in_flight += 1
+        return True
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+            self._wakeup = None
+        while self._waiters:
+            lane_index, _, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if not self._try_admit(LANES[lane_index]):
+                break
+            heapq.heappop(self._waiters)
+            future.set_result(None)
+
+        # Blocked on tokens rather than slots: wake up once one is available.
+        if self._waiters and self._wakeup is None and self._tokens < 1:
+            delay = (1 - self._tokens) / self.rate
+            self._wakeup = asyncio.get_running_loop().call_later(
+                delay, self._dispatch
+            )
+
+
+_GOVERNORS: dict[str, SpanPanelGovernor] = {}
+
+
+def get_governor(host: str) -> SpanPanelGovernor:
+    """Return the governor shared by every client of this panel."""
+    return _GOVERNORS.setdefault(host, SpanPanelGovernor())
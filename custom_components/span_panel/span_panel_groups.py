@@ -0,0 +1,35 @@
+"""User-defined circuit groups totalled once per snapshot."""
+from __future__ import annotations
+
+import dataclasses
+
+from .span_panel_circuit import SpanPanelCircuit
+
+
+@dataclasses.dataclass
+class CircuitGroupTotals:
+    """
+    Power is the group's net consumption: what its circuits draw minus what
+    they produce. Energy totals are the sums of the member counters.
+    """
+
+    power: float
+    consumed_energy: float
+    produced_energy: float
+    circuit_ids: list[str]
+
+
+def group_totals(
+    groups: dict[str, list[str]], circuits: dict[str, SpanPanelCircuit]
+) -> dict[str, CircuitGroupTotals]:
+    """Totals per group; members no longer on the panel are skipped."""
+    totals = {}
+    for name, circuit_ids in groups.items():
+        members = [circuits[id] for id in circuit_ids if id in circuits]
+        totals[name] = CircuitGroupTotals(
+            power=-sum(circuit.instant_power for circuit in members),
+            consumed_energy=sum(circuit.consumed_energy for circuit in members),
+            produced_energy=sum(circuit.produced_energy for circuit in members),
+            circuit_ids=[circuit.circuit_id for circuit in members],
+        )
+    return totals
@@ -0,0 +1,49 @@
+"""Breaker tab to leg (L1/L2) index for split-phase load balance."""
+from __future__ import annotations
+
+from array import array
+
+from .span_panel_circuit import SpanPanelCircuit
+
+LEG_L1 = "L1"
+LEG_L2 = "L2"
+
+
+def tab_leg(tab: int) -> str:
+    """
+    Tabs are numbered down two columns (odd left, even right) and the bus
+    bars alternate legs every row: tabs 1-2 are on L1, 3-4 on L2, and so on.
+    """
+    return LEG_L1 if (tab - 1) // 2 % 2 == 0 else LEG_L2
+
+
+def layout_signature(circuits: dict[str, SpanPanelCircuit]) -> tuple:
+    return tuple((id, tuple(circuit.tabs)) for id, circuit in circuits.items())
+
+
+class SpanPanelLegIndex:
+    """
+    Per-circuit share of each leg, built once per breaker layout. A circuit
+    spanning tabs on both legs (240 V) is split evenly between them.
+    """
+
+    def __init__(self, circuits: dict[str, SpanPanelCircuit]) -> None:
+        self.signature = layout_signature(circuits)
+        self.l1 = array("d")
+        self.l2 = array("d")
+        for circuit in circuits.values():
+            tabs = circuit.tabs or []
+            legs = [tab_leg(tab) for tab in tabs]
+            self.l1.append(legs.count(LEG_L1) / len(legs) if legs else 0.0)
+            self.l2.append(legs.count(LEG_L2) / len(legs) if legs else 0.0)
+
+    def matches(self, circuits: dict[str, SpanPanelCircuit]) -> bool:
+        return self.signature == layout_signature(circuits)
+
+    def leg_power(self, power: array) -> tuple[float, float]:
+        """Net consumption on (L1, L2) for powers in circuit order."""
+        l1 = l2 = 0.0
+        for share1, share2, value in zip(self.l1, self.l2, power):
+            l1 -= share1 * value
+            l2 -= share2 * value
+        return l1, l2
@@ -0,0 +1,175 @@
+"""OpenMetrics exposition of panel snapshots."""
+from __future__ import annotations
+
+from collections.abc import Collection
+
+from .const import SECTION_PANEL
+from .span_panel_circuit import SpanPanelCircuit, circuit_section
+from .span_panel_data import SpanPanelData
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+GAUGE = "gauge"
+COUNTER = "counter"
+
+# name: (type, unit, help)
+PANEL_FAMILIES = {
+    "span_panel_grid_power_watts": (GAUGE, "watts", "Instant grid power"),
+    "span_panel_feedthrough_power_watts": (
+        GAUGE,
+        "watts",
+        "Instant feed through power",
+    ),
+    "span_panel_main_meter_consumed_energy_watt_hours": (
+        COUNTER,
+        "watt_hours",
+        "Main meter consumed energy",
+    ),
+    "span_panel_main_meter_produced_energy_watt_hours": (
+        COUNTER,
+        "watt_hours",
+        "Main meter produced energy",
+    ),
+}
+CIRCUIT_FAMILIES = {
+    "span_panel_circuit_power_watts": (
+        GAUGE,
+        "watts",
+        "Instant circuit power, negative while consuming",
+    ),
+    "span_panel_circuit_consumed_energy_watt_hours": (
+        COUNTER,
+        "watt_hours",
+        "Circuit consumed energy",
+    ),
+    "span_panel_circuit_produced_energy_watt_hours": (
+        COUNTER,
+        "watt_hours",
+        "Circuit produced energy",
+    ),
+}
+
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: dict[str, str]) -> str:
+    return ",".join(f'{name}="{escape(value)}"' for name, value in labels.items())
+
+
+def _sample(family: str, kind: str, labels: str, value: float) -> str:
+    suffix = "_total" if kind == COUNTER else ""
+    return f"{family}{suffix}{{{labels}}} {float(value)!r}\n"
+
+
+def _header(family: str, kind: str, unit: str, help: str) -> str:
+    return (
+        f"# TYPE {family} {kind}\n# UNIT {family} {unit}\n# HELP {family} {help}\n"
+    )
+
+
+class SpanPanelMetrics:
+    """
+    Keeps the exposition text of every panel ready to serve.
+
+    Each panel's samples are rendered once per update, reusing the label
+    set of each circuit until its name, tabs, priority or relay state
+    change. The full document is joined on the first scrape after an
+    update and then served as is, so scrapes never touch a panel.
+    """
+
+    def __init__(self) -> None:
+        self._samples: dict[str, dict[str, list[str]]] = {}
+        self._circuit_labels: dict[tuple[str, str], tuple[tuple, str]] = {}
+        self._exposition: bytes | None = None
+
+    def update(
+        self,
+        serial: str,
+        panel: SpanPanelData,
+        circuits: dict[str, SpanPanelCircuit],
+        stale: Collection[str] = (),
+    ) -> None:
+        """
+        Render the panel's samples. Sections in stale only hold the last
+        good value, so their samples are left out until they refresh.
+        """
+        panel_labels = _labels({"serial": serial})
+        samples: dict[str, list[str]] = {
+            family: [] for family in (*PANEL_FAMILIES, *CIRCUIT_FAMILIES)
+        }
+        if SECTION_PANEL not in stale:
+            for family, value in zip(
+                PANEL_FAMILIES,
+                (
+                    panel.instant_grid_power,
+                    panel.feedthrough_power,
+                    panel.main_meter_energy_consumed,
+                    panel.main_meter_energy_produced,
+                ),
+            ):
+                kind = PANEL_FAMILIES[family][0]
+                samples[family].append(_sample(family, kind, panel_labels, value))
+
+        for id, circuit in circuits.items():
+            if circuit_section(id) in stale:
+                continue
+            labels = self._labels_of(serial, circuit)
+            for family, value in zip(
+                CIRCUIT_FAMILIES,
+                (
+                    circuit.instant_power,
+                    circuit.consumed_energy,
+                    circuit.produced_energy,
+                ),
+            ):
+                kind = CIRCUIT_FAMILIES[family][0]
+                samples[family].append(_sample(family, kind, labels, value))
+
+        self._samples[serial] = samples
+        self._exposition = None
+
+    def _labels_of(self, serial: str, circuit: SpanPanelCircuit) -> str:
+        key = (serial, circuit.circuit_id)
+        identity = (
+            circuit.name,
+            tuple(circuit.tabs or ()),
+            circuit.priority,
+            circuit.relay_state,
+        )
+        cached = self._circuit_labels.get(key)
+        if cached is None or cached[0] != identity:
+            labels = _labels(
+                {
+                    "serial": serial,
+                    "circuit_id": circuit.circuit_id,
+                    "circuit": circuit.name,
+                    "tabs": ",".join(str(tab) for tab in circuit.tabs or ()),
+                    "priority": circuit.priority,
+                    "relay_state": circuit.relay_state,
+                }
+            )
+            cached = self._circuit_labels[key] = (identity, labels)
+        return cached[1]
+
+    def remove(self, serial: str) -> None:
+        self._samples.pop(serial, None)
+        for key in [key for key in self._circuit_labels if key[0] == serial]:
+            del self._circuit_labels[key]
+        self._exposition = None
+
+    @property
+    def exposition(self) -> bytes:
+        if self._exposition is None:
+            parts = []
+            for family, (kind, unit, help) in {
+                **PANEL_FAMILIES,
+                **CIRCUIT_FAMILIES,
+            }.items():
+                parts.append(_header(family, kind, unit, help))
+                for samples in self._samples.values():
+                    parts.extend(samples[family])
+            parts.append("# EOF\n")
+            self._exposition = "".join(parts).encode()
+        return self._exposition
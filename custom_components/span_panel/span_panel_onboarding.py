@@ -0,0 +1,122 @@
+"""Validate many panels at once for fleet onboarding."""
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import logging
+import re
+
+import httpx
+
+from .const import LANE_PROBE, ONBOARD_CONCURRENCY
+from .exceptions import SpanPanelReturnedEmptyData
+from .span_panel_api import SpanPanelApi
+
+_LOGGER = logging.getLogger(__name__)
+
+ERROR_CANNOT_CONNECT = "cannot_connect"
+ERROR_ALREADY_CONFIGURED = "already_configured"
+ERROR_DUPLICATE = "duplicate"
+ERROR_PROXIMITY_NOT_PROVEN = "proximity_not_proven"
+ERROR_INVALID_ACCESS_TOKEN = "invalid_access_token"
+
+
+@dataclasses.dataclass
+class OnboardingResult:
+    host: str
+    serial_number: str | None = None
+    access_token: str | None = None
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def parse_host_list(text: str) -> list[tuple[str, str | None]]:
+    """
+    Hosts separated by commas, spaces or new lines, each optionally
+    followed by =TOKEN as with capture.py.
+    """
+    targets = []
+    for item in re.split(r"[\s,]+", text.strip()):
+        if item:
+            host, _, token = item.partition("=")
+            targets.append((host, token or None))
+    return targets
+
+
+async def onboard_host(
+    client: httpx.AsyncClient,
+    host: str,
+    access_token: str | None,
+    configured: set[str],
+) -> OnboardingResult:
+    """
+    Probe the status once and decide everything from it: the serial number,
+    whether the panel is already configured, and, without a token, whether
+    proximity is proven so one can be registered. The token is then checked
+    with a single authenticated request.
+    """
+    api = SpanPanelApi(host, access_token, client)
+    result = OnboardingResult(host)
+    try:
+        status = await api.get_status_data(lane=LANE_PROBE)
+        result.serial_number = status.serial_number
+        if status.serial_number in configured:
+            result.error = ERROR_ALREADY_CONFIGURED
+            return result
+
+        if access_token is None:
+            if status.proximity_proven is not None:
+                proven = status.proximity_proven
+            else:
+                proven = status.remaining_auth_unlock_button_presses == 0
+            if not proven:
+                result.error = ERROR_PROXIMITY_NOT_PROVEN
+                return result
+            api.access_token = await api.get_access_token()
+
+        try:
+            await api.get_panel_data(lane=LANE_PROBE)
+        except SpanPanelReturnedEmptyData:
+            pass  # authenticated, the panel just had nothing to report
+        except httpx.HTTPStatusError:
+            result.error = ERROR_INVALID_ACCESS_TOKEN
+            return result
+    except (httpx.HTTPError, ValueError, KeyError, TypeError) as err:
+        _LOGGER.debug("Onboarding %s failed: %s", host, err)
+        result.error = ERROR_CANNOT_CONNECT
+        return result
+
+    result.access_token = api.access_token
+    return result
+
+
+async def onboard_hosts(
+    client: httpx.AsyncClient,
+    targets: list[tuple[str, str | None]],
+    configured: set[str],
+    concurrency: int = ONBOARD_CONCURRENCY,
+) -> list[OnboardingResult]:
+    """
+    Onboard every (host, token) target, at most concurrency at a time.
+    Results are in target order; a panel listed under several hosts is only
+    accepted at the first one.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _onboard(host: str, access_token: str | None) -> OnboardingResult:
+        async with semaphore:
+            return await onboard_host(client, host, access_token, configured)
+
+    results = await asyncio.gather(
+        *(_onboard(host, access_token) for host, access_token in targets)
+    )
+    accepted: set[str] = set()
+    for result in results:
+        if result.ok:
+            if result.serial_number in accepted:
+                result.error = ERROR_DUPLICATE
+            accepted.add(result.serial_number)
+    return results
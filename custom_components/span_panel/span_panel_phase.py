@@ -0,0 +1,128 @@
+"""Poll scheduling locked to the panel's own sampling."""
+from __future__ import annotations
+
+from collections import deque
+
+from .const import (
+    DEFAULT_SCAN_INTERVAL,
+    PHASE_BACKOFF,
+    PHASE_MARGIN,
+    PHASE_MAX_DIVISOR,
+    PHASE_MIN_SAMPLES,
+    PHASE_PERIOD_TOLERANCE,
+    PHASE_STEP,
+    PHASE_WINDOW,
+)
+
+
+def sample_period(gaps: list[float]) -> float:
+    """
+    The longest period that every gap between observed samples is a whole
+    multiple of. Polls slower than the panel samples only ever see multiples
+    of its period, so the shortest gap alone is not enough.
+    """
+    shortest = min(gaps)
+    for divisor in range(1, PHASE_MAX_DIVISOR + 1):
+        period = shortest / divisor
+        if all(
+            abs(gap / period - round(gap / period)) <= PHASE_PERIOD_TOLERANCE
+            for gap in gaps
+        ):
+            return period
+    return shortest
+
+
+class SpanPanelPhaseLock:
+    """
+    Estimates when the panel's next sample becomes readable, so polls land
+    just after it instead of at an arbitrary phase.
+
+    Each poll is observed as the panel timestamp of the sample it returned
+    and the local midpoint of the request. The period comes from the gaps
+    between distinct samples. The offset is how long after a sample (on the
+    panel clock, plus the clock difference) a request first returns it; a
+    poll can only ever show that it was late, so the offset is walked earlier
+    by PHASE_STEP of a period after every poll that got its sample, and
+    backed off by PHASE_BACKOFF steps after one that was too early. That
+    keeps polls hugging the sample boundary and follows clock drift, which
+    is reported from the offset's slope across the window. A sample time
+    that goes backwards (a panel reboot or clock step) starts over.
+    """
+
+    def __init__(self, window: int = PHASE_WINDOW) -> None:
+        self.interval: float = DEFAULT_SCAN_INTERVAL.total_seconds()
+        self.period: float | None = None
+        self.offset: float | None = None
+        self.drift: float = 0.0
+        self._gaps: deque[float] = deque(maxlen=window)
+        self._offsets: deque[tuple[float, float]] = deque(maxlen=window)
+        self._last_sample: float | None = None
+        self._expected: float | None = None
+        self._latency: float = 0.0
+
+    def reset(self) -> None:
+        self.period = None
+        self.offset = None
+        self.drift = 0.0
+        self._gaps.clear()
+        self._offsets.clear()
+        self._last_sample = None
+        self._expected = None
+
+    def observe(self, sample_time: float, sent: float, received: float) -> None:
+        """Record a poll that returned the sample taken at sample_time."""
+        if self._last_sample is not None and sample_time < self._last_sample:
+            self.reset()
+        local = (sent + received) / 2
+        self._latency = (received - sent) / 2
+
+        measured = local - sample_time
+        if self.offset is None:
+            self.offset = measured
+        elif self._expected is not None and self.period is not None:
+            step = PHASE_STEP * self.period
+            if sample_time < self._expected - self.period / 2:
+                self.offset += PHASE_BACKOFF * step
+            else:
+                self.offset = min(self.offset - step, measured)
+        else:
+            self.offset = min(self.offset, measured)
+        self._expected = None
+
+        self._offsets.append((local, self.offset))
+        first_local, first_offset = self._offsets[0]
+        if local > first_local:
+            self.drift = (self.offset - first_offset) / (local - first_local)
+
+        if self._last_sample is not None and sample_time > self._last_sample:
+            self._gaps.append(sample_time - self._last_sample)
+            self.period = sample_period(list(self._gaps))
+        self._last_sample = sample_time
+
+    def age(self, now: float) -> float | None:
+        """Seconds since the newest observed sample became readable."""
+        if self._last_sample is None or self.offset is None:
+            return None
+        return now - self._last_sample - self.offset
+
+    def next_delay(self, now: float) -> float:
+        """
+        Seconds until the next poll: the scan interval, moved to just after
+        the sample boundary nearest to it once the phase is known.
+        """
+        if (
+            self.period is None
+            or len(self._gaps) < PHASE_MIN_SAMPLES
+            or self.period >= self.interval * 2
+        ):
+            return self.interval
+
+        target = now + self.interval
+        periods = round((target - self.offset - self._last_sample) / self.period)
+        # Send so the request reaches the panel just after the sample.
+        delay = -1.0
+        while delay <= 0:
+            self._expected = self._last_sample + periods * self.period
+            delay = self._expected + self.offset - self._latency + PHASE_MARGIN - now
+            periods += 1
+        return delay
@@ -0,0 +1,164 @@
+"""Recording of raw panel responses, and a transport that replays them."""
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from collections.abc import Iterator
+import gzip
+import json
+import time
+from typing import Any
+
+import httpx
+
+from .const import RECORDING_FORMAT_VERSION
+from .exceptions import SpanPanelReplayExhausted
+
+
+class SpanPanelRecorder:
+    """
+    Records every response SpanPanelApi receives to a gzipped NDJSON file.
+
+    The first line is a header; each following line holds the seconds since
+    the recording started, the request path, status, latency and the raw
+    body. Request headers are never written, so access tokens stay out of
+    recordings. record() only queues the line, so it is safe to call from
+    the event loop; flush() and close() do the file IO.
+    """
+
+    def __init__(self, path: str, host: str) -> None:
+        self.path = path
+        self.host = host
+        self.responses = 0
+        self._file: gzip.GzipFile | None = None
+        self._started = time.monotonic()
+        self._pending: list[bytes] = []
+
+    def open(self) -> None:
+        self._file = gzip.open(self.path, "wb")
+        self._started = time.monotonic()
+        self._write_line(
+            {
+                "format": RECORDING_FORMAT_VERSION,
+                "host": self.host,
+                "started": time.time(),
+            }
+        )
+
+    def record(self, response: httpx.Response, latency: float) -> None:
+        self.responses += 1
+        self._pending.append(
+            json.dumps(
+                {
+                    "t": round(time.monotonic() - self._started, 3),
+                    "path": response.url.raw_path.decode(),
+                    "status": response.status_code,
+                    "latency": round(latency, 4),
+                    "body": response.text,
+                },
+                separators=(",", ":"),
+            ).encode()
+            + b"\n"
+        )
+
+    def flush(self) -> None:
+        pending, self._pending = self._pending, []
+        if self._file is not None:
+            self._file.write(b"".join(pending))
+            self._file.flush()
+
+    def close(self) -> None:
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write_line(self, record: dict[str, Any]) -> None:
+        self._file.write(json.dumps(record, separators=(",", ":")).encode() + b"\n")
+
+
+def read_recording(path: str) -> tuple[dict[str, Any], Iterator[dict[str, Any]]]:
+    """The header of a recording and an iterator over its responses."""
+    file = gzip.open(path, "rb")
+    header = json.loads(file.readline())
+    if header.get("format") != RECORDING_FORMAT_VERSION:
+        file.close()
+        raise ValueError(
+            f"{path} is not a version {RECORDING_FORMAT_VERSION} recording"
+        )
+
+    def _records() -> Iterator[dict[str, Any]]:
+        with file:
+            for line in file:
+                yield json.loads(line)
+
+    return header, _records()
+
+
+class SpanPanelReplayTransport(httpx.AsyncBaseTransport):
+    """
+    Answers requests from a recording instead of a panel.
+
+    Without a speed, every request gets the next recorded response for its
+    path, as fast as it is asked for. With a speed, the recording plays
+    against the clock from the first request, speed times faster than real
+    time: a request gets the newest response recorded for its path by then,
+    after the recorded latency (also scaled). Only as much of the recording
+    as the replay has reached is held in memory.
+
+    SpanPanelReplayExhausted is raised once the recording has nothing more
+    to give.
+    """
+
+    def __init__(self, path: str, speed: float | None = None) -> None:
+        self.header, self._records = read_recording(path)
+        self.speed = speed
+        self._queued: dict[str, deque[dict[str, Any]]] = {}
+        self._latest: dict[str, dict[str, Any]] = {}
+        self._next: dict[str, Any] | None = None
+        self._ended = False
+        self._end = 0.0
+        self._started: float | None = None
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.raw_path.decode()
+        if self.speed is None:
+            record = self._next_for(path)
+        else:
+            record = self._newest_for(path)
+            await asyncio.sleep(record["latency"] / self.speed)
+        return httpx.Response(
+            record["status"],
+            content=record["body"].encode(),
+            headers={"Content-Type": "application/json"},
+            request=request,
+        )
+
+    def _next_for(self, path: str) -> dict[str, Any]:
+        queued = self._queued.setdefault(path, deque())
+        while not queued:
+            record = next(self._records, None)
+            if record is None:
+                raise SpanPanelReplayExhausted(path)
+            self._queued.setdefault(record["path"], deque()).append(record)
+        return queued.popleft()
+
+    def _newest_for(self, path: str) -> dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        if self._started is None:
+            self._started = loop.time()
+        position = (loop.time() - self._started) * self.speed
+        while True:
+            if self._next is None and not self._ended:
+                self._next = next(self._records, None)
+                self._ended = self._next is None
+            if self._next is None:
+                if path in self._latest and position <= self._end:
+                    return self._latest[path]
+                raise SpanPanelReplayExhausted(path)
+            # The first response for a path is served even if it is early.
+            if self._next["t"] > position and path in self._latest:
+                return self._latest[path]
+            self._latest[self._next["path"]] = self._next
+            self._end = self._next["t"]
+            self._next = None
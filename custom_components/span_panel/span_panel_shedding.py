@@ -0,0 +1,231 @@
+"""Local load shedding of sheddable circuits by priority."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+import logging
+from typing import TYPE_CHECKING, Any
+
+import httpx
+
+from .const import (
+    LANE_POLL,
+    SHED_INTERVAL,
+    SHED_RESTORE_DELAY,
+    SHED_SETTLE_TIME,
+    CircuitPriority,
+    CircuitRelayState,
+)
+from .exceptions import SpanPanelReturnedEmptyData
+from .span_panel_circuit import SpanPanelCircuit
+
+if TYPE_CHECKING:
+    from .span_panel import SpanPanel
+
+_LOGGER = logging.getLogger(__name__)
+
+# Lower ranks are shed first; circuits of any other priority are never shed.
+SHED_ORDER = {
+    CircuitPriority.NON_ESSENTIAL.name: 0,
+    CircuitPriority.NICE_TO_HAVE.name: 1,
+}
+
+
+class SpanPanelLoadShedder:
+    """
+    Keeps instant grid power under a limit by opening sheddable circuits.
+
+    The panel endpoint is polled every SHED_INTERVAL seconds in the governor's
+    poll lane, independently of the coordinator; only relay commands use the
+    control lane. When grid power exceeds the limit, enough sheddable, closed
+    circuits to cover the excess are opened at once, NON_ESSENTIAL before
+    NICE_TO_HAVE and larger loads first.
+
+    Shed circuits are restored one at a time once grid power has stayed
+    below the limit minus the hysteresis for SHED_RESTORE_DELAY seconds: the
+    most recently shed circuit whose last known load fits in that margin
+    goes first. Disabling shedding or stopping the shedder restores every
+    shed circuit at once. The shed set is persisted through to_dict() and
+    load(), so circuits shed before a restart are still restored afterwards.
+    """
+
+    def __init__(self, panel: SpanPanel, on_change: Callable[[], None]) -> None:
+        self._panel = panel
+        self._on_change = on_change
+        self._task: asyncio.Task | None = None
+        self._restoring: asyncio.Task | None = None
+        self.limit: float = 0
+        self.hysteresis: float = 0
+        self.shed: dict[str, float] = {}
+        self.last_latency: float | None = None
+        self.max_latency: float | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.limit > 0
+
+    def configure(self, limit: float, hysteresis: float) -> None:
+        """Apply new settings, starting or stopping the control loop."""
+        self.limit = limit
+        self.hysteresis = hysteresis
+        if self.enabled and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        elif not self.enabled:
+            self.stop()
+            if self.shed and self._restoring is None:
+                self._restoring = asyncio.get_running_loop().create_task(
+                    self.async_restore_all()
+                )
+
+    def stop(self) -> None:
+        """Stop the control loop, leaving shed circuits as they are."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def async_stop(self) -> None:
+        """Stop the control loop and restore every shed circuit."""
+        self.stop()
+        if self._restoring is not None:
+            await self._restoring
+        await self.async_restore_all()
+
+    async def async_restore_all(self) -> None:
+        """
+        Close every shed circuit, last shed first. Circuits the panel fails
+        to close stay in the shed set, to be retried on the next start.
+        """
+        try:
+            for circuit_id in reversed(list(self.shed)):
+                circuit = self._panel.circuits.get(circuit_id)
+                if circuit is not None:
+                    _LOGGER.info("Restoring %s", circuit.name)
+                    try:
+                        await self._panel.api.set_relay(
+                            circuit, CircuitRelayState.CLOSED
+                        )
+                    except httpx.HTTPError as err:
+                        _LOGGER.warning(
+                            "Failed to restore %s: %s", circuit.name, err
+                        )
+                        continue
+                self.shed.pop(circuit_id)
+        finally:
+            self._restoring = None
+            self._on_change()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        hold_until = 0.0
+        below_since: float | None = None
+        while True:
+            await asyncio.sleep(SHED_INTERVAL)
+            try:
+                panel_data = await self._panel.api.get_panel_data(LANE_POLL)
+            except (httpx.HTTPError, SpanPanelReturnedEmptyData) as err:
+                _LOGGER.debug("Load shedding poll failed: %s", err)
+                continue
+
+            detected = loop.time()
+            grid_power = panel_data.instant_grid_power
+            if grid_power > self.limit:
+                below_since = None
+                if detected >= hold_until:
+                    if await self._shed(grid_power - self.limit, detected):
+                        hold_until = loop.time() + SHED_SETTLE_TIME
+            elif self.shed and grid_power < self.limit - self.hysteresis:
+                below_since = below_since or detected
+                if detected - below_since >= SHED_RESTORE_DELAY:
+                    margin = self.limit - self.hysteresis - grid_power
+                    if await self._restore(margin):
+                        below_since = None
+            else:
+                below_since = None
+
+    def _candidates(self) -> list[SpanPanelCircuit]:
+        circuits = [
+            circuit
+            for circuit in self._panel.circuits.values()
+            if circuit.is_sheddable
+            and circuit.is_user_controllable
+            and circuit.is_relay_closed
+            and circuit.priority in SHED_ORDER
+            and circuit.circuit_id not in self.shed
+        ]
+        circuits.sort(
+            key=lambda circuit: (
+                SHED_ORDER[circuit.priority],
+                -abs(circuit.instant_power),
+            )
+        )
+        return circuits
+
+    async def _shed(self, excess: float, detected: float) -> bool:
+        selected: list[SpanPanelCircuit] = []
+        covered = 0.0
+        for circuit in self._candidates():
+            if covered >= excess:
+                break
+            selected.append(circuit)
+            covered += abs(circuit.instant_power)
+        if not selected:
+            return False
+
+        _LOGGER.info(
+            "Shedding %s to cover %.0f W over the limit",
+            [circuit.name for circuit in selected],
+            excess,
+        )
+        results = await asyncio.gather(
+            *(
+                self._panel.api.set_relay(circuit, CircuitRelayState.OPEN)
+                for circuit in selected
+            ),
+            return_exceptions=True,
+        )
+        self._record_latency(asyncio.get_running_loop().time() - detected)
+        for circuit, result in zip(selected, results):
+            if isinstance(result, Exception):
+                _LOGGER.warning("Failed to shed %s: %s", circuit.name, result)
+            else:
+                self.shed[circuit.circuit_id] = abs(circuit.instant_power)
+        self._on_change()
+        return True
+
+    async def _restore(self, margin: float) -> bool:
+        """
+        Restore the most recently shed circuit whose load fits in margin. A
+        large circuit that does not fit is skipped rather than holding back
+        the smaller ones shed before it.
+        """
+        shed = len(self.shed)
+        for circuit_id, power in reversed(list(self.shed.items())):
+            circuit = self._panel.circuits.get(circuit_id)
+            if circuit is None:
+                self.shed.pop(circuit_id)
+            elif power <= margin:
+                break
+        else:
+            if len(self.shed) < shed:
+                self._on_change()
+            return False
+
+        _LOGGER.info("Restoring %s", circuit.name)
+        try:
+            await self._panel.api.set_relay(circuit, CircuitRelayState.CLOSED)
+        except httpx.HTTPError as err:
+            _LOGGER.warning("Failed to restore %s: %s", circuit.name, err)
+            return False
+        self.shed.pop(circuit_id)
+        self._on_change()
+        return True
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"shed": dict(self.shed)}
+
+    def load(self, data: dict[str, Any]) -> None:
+        self.shed.update(data.get("shed", {}))
+
+    def _record_latency(self, latency: float) -> None:
+        self.last_latency = latency
+        self.max_latency = max(latency, self.max_latency or 0)
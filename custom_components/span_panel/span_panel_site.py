@@ -0,0 +1,144 @@
+"""Site-wide totals across several panels, one sample of each per round."""
+from __future__ import annotations
+
+from collections.abc import Callable
+import dataclasses
+
+from .const import DEFAULT_STALE_AFTER
+from .span_panel_data import SpanPanelData
+
+
+@dataclasses.dataclass
+class SiteMember:
+    fed_from: str | None
+    panel: SpanPanelData | None = None
+    sampled_at: float | None = None
+    fresh: bool = False
+    # Set while the member's panel section is stale or its update failed.
+    stale: bool = False
+    stale_after: float = DEFAULT_STALE_AFTER
+
+
+@dataclasses.dataclass
+class SiteTotals:
+    grid_power: float
+    feedthrough_power: float
+    consumed_energy: float
+    produced_energy: float
+    panels: int
+    # Seconds between the oldest and newest sample of the round.
+    spread: float
+    # When the newest sample of the round was taken, as a monotonic time.
+    sampled_at: float
+
+
+class SpanPanelSite:
+    """
+    Combines the panels of one site, keyed by serial number.
+
+    A sub-panel wired to another member's feedthrough lugs names that panel
+    in fed_from. Its draw is already part of the upstream panel's grid power
+    and feedthrough, so grid power and main meter energy only come from the
+    panels fed by no other member, and feedthrough only counts what leaves
+    the site's panels: every panel's feedthrough less the grid power of the
+    sub-panels it feeds.
+
+    Totals are published in rounds: a round closes once every member has
+    reported a sample newer than the previous round, so a total never
+    combines a sample with one that is a whole interval older. A member
+    that goes stale stops rounds from closing, so the totals are only
+    current while no member is stale and the last round is younger than
+    the members' stale_after.
+
+    The site's sensors are published by a single owner, the first to claim
+    them, since their unique ids are the same whichever panel publishes them.
+    Every member registers a publisher, and when the owner leaves, ownership
+    is handed to another member, which publishes the sensors in its place.
+    """
+
+    def __init__(self) -> None:
+        self.members: dict[str, SiteMember] = {}
+        self.totals: SiteTotals | None = None
+        self.sensor_owner: str | None = None
+        self._publishers: dict[str, Callable[[], None]] = {}
+
+    def add_publisher(self, owner: str, publish: Callable[[], None]) -> None:
+        """Register how owner publishes the site sensors if handed them."""
+        self._publishers[owner] = publish
+
+    def claim_sensors(self, owner: str) -> bool:
+        """Whether owner publishes the site sensors, claiming them if unowned."""
+        if self.sensor_owner is None:
+            self.sensor_owner = owner
+        return self.sensor_owner == owner
+
+    def release_sensors(self, owner: str, hand_off: bool = True) -> None:
+        """
+        Drop owner's publisher. If owner held the site sensors they are
+        handed to another member, unless hand_off is False because the site
+        totals were turned off.
+        """
+        self._publishers.pop(owner, None)
+        if self.sensor_owner != owner:
+            return
+        self.sensor_owner = None
+        if hand_off and self._publishers:
+            self.sensor_owner, publish = next(iter(self._publishers.items()))
+            publish()
+
+    def mark_stale(self, serial: str, stale: bool, stale_after: float) -> None:
+        member = self.members[serial]
+        member.stale = stale
+        member.stale_after = stale_after
+
+    def is_current(self, now: float) -> bool:
+        """Whether the totals still describe the site at monotonic time now."""
+        if self.totals is None:
+            return False
+        members = self.members.values()
+        return not any(member.stale for member in members) and (
+            now - self.totals.sampled_at
+            <= min(member.stale_after for member in members)
+        )
+
+    def add(self, serial: str, fed_from: str | None) -> None:
+        self.members[serial] = SiteMember(fed_from)
+
+    def remove(self, serial: str) -> None:
+        self.members.pop(serial, None)
+
+    def update(self, serial: str, panel: SpanPanelData, sampled_at: float) -> bool:
+        """Record a member's sample, returning whether it closed a round."""
+        member = self.members[serial]
+        if member.sampled_at is not None and sampled_at <= member.sampled_at:
+            return False
+        member.panel = panel
+        member.sampled_at = sampled_at
+        member.fresh = True
+
+        if not all(member.fresh for member in self.members.values()):
+            return False
+        for member in self.members.values():
+            member.fresh = False
+        self.totals = self._totals()
+        return True
+
+    def _totals(self) -> SiteTotals:
+        members = self.members.values()
+        roots = [member for member in members if member.fed_from not in self.members]
+        fed = [member for member in members if member.fed_from in self.members]
+        times = [member.sampled_at for member in members]
+        return SiteTotals(
+            grid_power=sum(member.panel.instant_grid_power for member in roots),
+            feedthrough_power=sum(member.panel.feedthrough_power for member in members)
+            - sum(member.panel.instant_grid_power for member in fed),
+            consumed_energy=sum(
+                member.panel.main_meter_energy_consumed for member in roots
+            ),
+            produced_energy=sum(
+                member.panel.main_meter_energy_produced for member in roots
+            ),
+            panels=len(self.members),
+            spread=max(times) - min(times),
+            sampled_at=max(times),
+        )
@@ -0,0 +1,135 @@
+"""Event stream ingestion for a Span panel, with polling as the fallback."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+import logging
+from typing import TYPE_CHECKING, Any
+
+import httpx
+
+from .const import (
+    PANEL_MAIN_RELAY_STATE_UNKNOWN_VALUE,
+    SECTION_CIRCUITS,
+    SECTION_PANEL,
+    SECTION_STATUS,
+    STREAM_HEALTHY_AFTER,
+    STREAM_RETRY_MAX,
+    STREAM_RETRY_MIN,
+    STREAM_UNSUPPORTED_RETRY,
+)
+from .span_panel_circuit import SpanPanelCircuit, circuit_section
+from .span_panel_data import SpanPanelData
+from .span_panel_status import SpanPanelStatus
+
+if TYPE_CHECKING:
+    from .span_panel import SpanPanel
+
+_LOGGER = logging.getLogger(__name__)
+
+STREAM_EVENT_STATUS = "status"
+STREAM_EVENT_PANEL = "panel"
+STREAM_EVENT_CIRCUITS = "circuits"
+STREAM_EVENT_CIRCUIT = "circuit"
+
+
+class SpanPanelStream:
+    """
+    Keeps a SpanPanel current from the panel's event stream.
+
+    Each event carries a complete status, panel or circuits document, or a
+    single complete circuit object, in the same shape the polling endpoints
+    return. A server should send full documents right after connecting so
+    nothing missed while disconnected is lost. While the stream is connected
+    SpanPanel.update() skips polling; when it drops, polling resumes on the
+    next tick and the stream reconnects in the background, whatever the
+    reason it dropped. An event that cannot be applied is logged and skipped
+    without dropping the connection. scripts/stream_server.py serves a
+    stand-in stream to exercise this.
+    """
+
+    def __init__(self, panel: SpanPanel, on_update: Callable[[], None]) -> None:
+        self._panel = panel
+        self._on_update = on_update
+        self._task: asyncio.Task | None = None
+        self.is_live: bool = False
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self.is_live = False
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        retry = STREAM_RETRY_MIN
+        while True:
+            connected_at: float | None = None
+            try:
+                async for event, payload in self._panel.api.stream_events():
+                    if connected_at is None:
+                        _LOGGER.debug("Event stream connected")
+                        connected_at = loop.time()
+                        self.is_live = True
+                    try:
+                        changed = self._apply(event, payload)
+                    except Exception as err:  # one bad event must not drop the stream
+                        _LOGGER.warning("Ignoring malformed %s event: %r", event, err)
+                        continue
+                    if changed:
+                        self._on_update()
+            except httpx.HTTPStatusError as err:
+                if err.response.status_code == httpx.codes.NOT_FOUND:
+                    _LOGGER.debug("Panel has no event stream, polling only")
+                    retry = STREAM_UNSUPPORTED_RETRY
+                else:
+                    _LOGGER.debug("Event stream refused: %s", err)
+            except (httpx.HTTPError, ValueError, KeyError) as err:
+                _LOGGER.debug("Event stream dropped: %s", err)
+            except Exception:  # keep the stream alive through anything else
+                _LOGGER.exception("Event stream failed, reconnecting")
+            finally:
+                self.is_live = False
+
+            # A panel that keeps dropping the connection early is not retried
+            # at the minimum interval forever.
+            if (
+                connected_at is not None
+                and loop.time() - connected_at >= STREAM_HEALTHY_AFTER
+            ):
+                retry = STREAM_RETRY_MIN
+            await asyncio.sleep(retry)
+            retry = min(retry * 2, max(retry, STREAM_RETRY_MAX))
+
+    def _apply(self, event: str, payload: dict[str, Any]) -> bool:
+        """Apply a single event to the panel, returning whether it changed."""
+        if event == STREAM_EVENT_STATUS:
+            self._panel.status = SpanPanelStatus.from_dict(payload)
+            self._panel.mark_fetched(SECTION_STATUS)
+        elif event == STREAM_EVENT_PANEL:
+            panel_data = SpanPanelData.from_dict(payload)
+            if panel_data.main_relay_state == PANEL_MAIN_RELAY_STATE_UNKNOWN_VALUE:
+                return False
+            self._panel.panel = panel_data
+            self._panel.mark_fetched(SECTION_PANEL)
+        elif event == STREAM_EVENT_CIRCUITS:
+            raw_circuits = payload["circuits"]
+            if not raw_circuits:
+                return False
+            self._panel.circuits = {
+                id: SpanPanelCircuit.from_dict(raw_circuit)
+                for id, raw_circuit in raw_circuits.items()
+            }
+            self._panel.mark_fetched(SECTION_CIRCUITS)
+        elif event == STREAM_EVENT_CIRCUIT:
+            circuit = SpanPanelCircuit.from_dict(payload)
+            self._panel.circuits[circuit.circuit_id] = circuit
+            self._panel.mark_fetched(circuit_section(circuit.circuit_id))
+        else:
+            _LOGGER.debug("Ignoring event stream message %s", event)
+            return False
+        return True
@@ -0,0 +1,50 @@
+"""Wall clock timing of the phases of setting up an entry."""
+from __future__ import annotations
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+import time
+
+IMPORT_PHASE_PREFIX = "import_"
+
+
+class SetupTimer:
+    """
+    Seconds spent per named phase. Phases may overlap, for instance the
+    first refresh and loading the platforms, so they can add up to more
+    than total, which is measured from creation to finish().
+    """
+
+    def __init__(self) -> None:
+        self.phases: dict[str, float] = {}
+        self.total: float | None = None
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def record(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    @property
+    def imports(self) -> float:
+        """Seconds spent importing modules, which overlaps other phases."""
+        return sum(
+            seconds
+            for name, seconds in self.phases.items()
+            if name.startswith(IMPORT_PHASE_PREFIX)
+        )
+
+    def finish(self) -> None:
+        self.total = time.perf_counter() - self._started
+
+    def as_dict(self) -> dict[str, float]:
+        """Milliseconds per phase and importing, rounded for logs and attributes."""
+        return {
+            name: round(seconds * 1000, 1) for name, seconds in self.phases.items()
+        } | {"imports": round(self.imports * 1000, 1)}
@@ -0,0 +1,120 @@
+"""State transitions found by diffing consecutive panel snapshots."""
+from __future__ import annotations
+
+import dataclasses
+from typing import Any
+
+from .const import (
+    TRANSITION_CELLULAR_LINK_DOWN,
+    TRANSITION_CELLULAR_LINK_UP,
+    TRANSITION_CIRCUIT_PRIORITY_CHANGED,
+    TRANSITION_CIRCUIT_RELAY_CLOSED,
+    TRANSITION_CIRCUIT_RELAY_OPENED,
+    TRANSITION_DOOR_CLOSED,
+    TRANSITION_DOOR_OPENED,
+    TRANSITION_ETHERNET_LINK_DOWN,
+    TRANSITION_ETHERNET_LINK_UP,
+    TRANSITION_MAIN_RELAY_CHANGED,
+    TRANSITION_WIFI_LINK_DOWN,
+    TRANSITION_WIFI_LINK_UP,
+    CircuitRelayState,
+)
+from .span_panel_circuit import SpanPanelCircuit
+from .span_panel_data import SpanPanelData
+from .span_panel_status import (
+    SYSTEM_DOOR_STATE_CLOSED,
+    SYSTEM_DOOR_STATE_OPEN,
+    SpanPanelStatus,
+)
+
+# Snapshot field: {new value: transition type}. Values not listed, such as
+# an unknown door state, are tracked but not reported.
+PANEL_TRANSITIONS: dict[str, dict[Any, str]] = {
+    "door_state": {
+        SYSTEM_DOOR_STATE_OPEN: TRANSITION_DOOR_OPENED,
+        SYSTEM_DOOR_STATE_CLOSED: TRANSITION_DOOR_CLOSED,
+    },
+    "is_ethernet_connected": {
+        True: TRANSITION_ETHERNET_LINK_UP,
+        False: TRANSITION_ETHERNET_LINK_DOWN,
+    },
+    "is_wifi_connected": {
+        True: TRANSITION_WIFI_LINK_UP,
+        False: TRANSITION_WIFI_LINK_DOWN,
+    },
+    "is_cellular_connected": {
+        True: TRANSITION_CELLULAR_LINK_UP,
+        False: TRANSITION_CELLULAR_LINK_DOWN,
+    },
+}
+RELAY_TRANSITIONS = {
+    CircuitRelayState.OPEN.name: TRANSITION_CIRCUIT_RELAY_OPENED,
+    CircuitRelayState.CLOSED.name: TRANSITION_CIRCUIT_RELAY_CLOSED,
+}
+
+
+@dataclasses.dataclass
+class Transition:
+    type: str
+    previous: Any
+    current: Any
+    circuit_id: str | None = None
+
+
+class SpanPanelTransitionTracker:
+    """
+    Keeps only the fields that transitions are reported for, as tuples, so
+    a tick with no changes costs one comparison per circuit. The first
+    snapshot is the baseline and reports nothing; circuits that appear or
+    disappear are taken in silently.
+    """
+
+    def __init__(self) -> None:
+        self._panel: tuple | None = None
+        self._circuits: dict[str, tuple[str, str]] = {}
+
+    def update(
+        self,
+        status: SpanPanelStatus,
+        panel: SpanPanelData,
+        circuits: dict[str, SpanPanelCircuit],
+    ) -> list[Transition]:
+        transitions = []
+
+        current = tuple(getattr(status, field) for field in PANEL_TRANSITIONS) + (
+            panel.main_relay_state,
+        )
+        if self._panel is not None and current != self._panel:
+            for field, previous, value in zip(
+                PANEL_TRANSITIONS, self._panel, current
+            ):
+                if value != previous and value in PANEL_TRANSITIONS[field]:
+                    transitions.append(
+                        Transition(PANEL_TRANSITIONS[field][value], previous, value)
+                    )
+            if current[-1] != self._panel[-1]:
+                transitions.append(
+                    Transition(
+                        TRANSITION_MAIN_RELAY_CHANGED, self._panel[-1], current[-1]
+                    )
+                )
+        self._panel = current
+
+        seen = {}
+        for id, circuit in circuits.items():
+            state = seen[id] = (circuit.relay_state, circuit.priority)
+            previous = self._circuits.get(id)
+            if previous is None or previous == state:
+                continue
+            if state[0] != previous[0] and state[0] in RELAY_TRANSITIONS:
+                transitions.append(
+                    Transition(RELAY_TRANSITIONS[state[0]], previous[0], state[0], id)
+                )
+            if state[1] != previous[1]:
+                transitions.append(
+                    Transition(
+                        TRANSITION_CIRCUIT_PRIORITY_CHANGED, previous[1], state[1], id
+                    )
+                )
+        self._circuits = seen
+        return transitions
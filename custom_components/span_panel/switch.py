@@ -13,7 +13,8 @@ from homeassistant.helpers.update_coordinator import (
 from .const import COORDINATOR, DOMAIN, CircuitRelayState
 from .span_panel import SpanPanel
 from .span_panel_api import SpanPanelApi
-from .util import panel_to_device_info
+from .span_panel_circuit import circuit_section
+from .util import panel_to_device_info, section_attributes
 
 ICON = "mdi:toggle-switch"
 
@@ -64,6 +65,16 @@ class SpanPanelCircuitsSwitch(CoordinatorEntity, SwitchEntity):
         span_panel: SpanPanel = self.coordinator.data
         return span_panel.circuits[self.id].is_relay_closed
 
+    @property
+    def available(self) -> bool:
+        span_panel: SpanPanel = self.coordinator.data
+        return super().available and span_panel.is_available(circuit_section(self.id))
+
+    @property
+    def extra_state_attributes(self) -> dict | None:
+        span_panel: SpanPanel = self.coordinator.data
+        return section_attributes(span_panel, circuit_section(self.id))
+
 
 async def async_setup_entry(
     hass: HomeAssistant,
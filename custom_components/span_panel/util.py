@@ -1,7 +1,14 @@
+import importlib
+import sys
+from types import ModuleType
+from typing import Any
+
+from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity import DeviceInfo
 
-from .const import DOMAIN
+from .const import ATTR_STALENESS, DOMAIN
 from .span_panel import SpanPanel
+from .span_panel_timing import IMPORT_PHASE_PREFIX, SetupTimer
 
 
 def panel_to_device_info(panel: SpanPanel):
@@ -13,3 +20,40 @@ def panel_to_device_info(panel: SpanPanel):
         sw_version=panel.status.firmware_version,
         configuration_url=f"http://{panel.host}",
     )
+
+
+def site_to_device_info():
+    return DeviceInfo(
+        identifiers={(DOMAIN, "site")},
+        manufacturer="Span",
+        name="Span Site",
+    )
+
+
+def section_attributes(panel: SpanPanel, section: str) -> dict[str, Any] | None:
+    """
+    Attributes for an entity backed by a section of the snapshot. The age is
+    only reported while the section is stale, so fresh entities do not write
+    a new state every tick.
+    """
+    staleness = panel.staleness(section)
+    if staleness is None:
+        return None
+    return {ATTR_STALENESS: round(staleness)}
+
+
+async def async_import_module(
+    hass: HomeAssistant, name: str, timer: SetupTimer | None = None
+) -> ModuleType:
+    """
+    Import a module of this package in the executor, so deferred imports
+    never block the event loop. A first import is timed as import_<name>
+    when a setup timer is given.
+    """
+    full_name = f"{__package__}.{name}"
+    if (module := sys.modules.get(full_name)) is not None:
+        return module
+    if timer is None:
+        return await hass.async_add_executor_job(importlib.import_module, full_name)
+    with timer.phase(f"{IMPORT_PHASE_PREFIX}{name}"):
+        return await hass.async_add_executor_job(importlib.import_module, full_name)
@@ -0,0 +1,282 @@
+"""
+Record circuit power from one or more Span panels without Home Assistant.
+
+    python scripts/capture.py 192.168.1.2=TOKEN \
+        --interval 1 --format csv --output capture/panel --rotate-minutes 60
+
+Samples are queued to a single writer with a bounded queue, so memory stays
+flat no matter how long the capture runs. Samples that cannot be queued, and
+ticks skipped because a poll overran the interval, are counted as dropped
+samples.
+"""
+from __future__ import annotations
+
+import importlib.machinery
+import importlib.util
+import os
+import sys
+
+if "span_panel" not in sys.modules:
+    # Expose the integration as a package without executing its __init__.py,
+    # which needs Home Assistant.
+    _spec = importlib.machinery.ModuleSpec("span_panel", None, is_package=True)
+    _spec.submodule_search_locations = [
+        os.path.join(
+            os.path.dirname(os.path.abspath(__file__)),
+            os.pardir,
+            "custom_components",
+            "span_panel",
+        )
+    ]
+    sys.modules["span_panel"] = importlib.util.module_from_spec(_spec)
+
+import argparse
+import asyncio
+import csv
+import dataclasses
+import io
+import json
+import logging
+import time
+from typing import Any, TextIO
+
+import httpx
+
+from span_panel.span_panel_api import SpanPanelApi
+
+_LOGGER = logging.getLogger(__name__)
+
+FIELDS = (
+    "time",
+    "host",
+    "circuit_id",
+    "name",
+    "relay_state",
+    "instant_power",
+    "instant_power_update_time",
+    "produced_energy",
+    "consumed_energy",
+    "energy_accum_update_time",
+)
+
+
+class _SharedAsyncClient(httpx.AsyncClient):
+    """
+    SpanPanelApi enters its client for every request; keep this one open
+    across requests, the same way Home Assistant's shared client does.
+    """
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        pass
+
+
+@dataclasses.dataclass
+class CaptureStats:
+    samples: int = 0
+    dropped: int = 0
+    errors: int = 0
+
+
+class RotatingWriter:
+    """Write NDJSON or CSV rows, starting a new file by size or age."""
+
+    def __init__(
+        self,
+        fmt: str,
+        prefix: str | None,
+        rotate_bytes: int | None,
+        rotate_seconds: float | None,
+    ) -> None:
+        self._fmt = fmt
+        self._prefix = prefix
+        self._rotate_bytes = rotate_bytes
+        self._rotate_seconds = rotate_seconds
+        self._file: TextIO | None = None
+        self._opened_at = 0.0
+        self._written = 0
+        self._sequence = 0
+        self._csv: csv.DictWriter | None = None
+
+    def _open(self) -> None:
+        self.close()
+        if self._prefix is None:
+            self._file = sys.stdout
+        else:
+            stamp = time.strftime("%Y%m%d-%H%M%S")
+            path = f"{self._prefix}-{stamp}-{self._sequence:04d}.{self._fmt}"
+            self._sequence += 1
+            self._file = open(path, "w", encoding="utf-8", newline="")
+            _LOGGER.info("Writing %s", path)
+        self._opened_at = time.monotonic()
+        self._written = 0
+        if self._fmt == "csv":
+            self._csv = csv.DictWriter(self._file, fieldnames=FIELDS)
+            self._csv.writeheader()
+
+    def _should_rotate(self) -> bool:
+        if self._file is None:
+            return True
+        if self._prefix is None:
+            return False
+        if self._rotate_bytes and self._written >= self._rotate_bytes:
+            return True
+        if self._rotate_seconds:
+            return time.monotonic() - self._opened_at >= self._rotate_seconds
+        return False
+
+    def write(self, row: dict[str, Any]) -> None:
+        if self._should_rotate():
+            self._open()
+        if self._fmt == "csv":
+            buffer = io.StringIO()
+            csv.DictWriter(buffer, fieldnames=FIELDS).writerow(row)
+            line = buffer.getvalue()
+        else:
+            line = json.dumps(row, separators=(",", ":")) + "\n"
+        self._file.write(line)
+        self._written += len(line)
+
+    def flush(self) -> None:
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None and self._file is not sys.stdout:
+            self._file.close()
+        self._file = None
+
+
+async def poll_panel(
+    api: SpanPanelApi,
+    interval: float,
+    queue: asyncio.Queue,
+    stats: CaptureStats,
+    deadline: float | None,
+) -> None:
+    """Poll circuits at a fixed rate, skipping ticks missed by slow polls."""
+    loop = asyncio.get_running_loop()
+    next_tick = loop.time()
+    while deadline is None or next_tick < deadline:
+        try:
+            circuits = await api.get_circuits_data()
+        except Exception as err:  # keep capturing through transient failures
+            _LOGGER.warning("Poll of %s failed: %s", api.host, err)
+            stats.errors += 1
+        else:
+            now = time.time()
+            stats.samples += 1
+            for circuit in circuits.values():
+                row = {field: getattr(circuit, field, None) for field in FIELDS}
+                row["time"] = now
+                row["host"] = api.host
+                try:
+                    queue.put_nowait(row)
+                except asyncio.QueueFull:
+                    stats.dropped += 1
+                    break
+
+        next_tick += interval
+        lag = loop.time() - next_tick
+        if lag > 0:
+            missed = int(lag // interval) + 1
+            stats.dropped += missed
+            next_tick += missed * interval
+        await asyncio.sleep(max(0.0, next_tick - loop.time()))
+
+
+async def write_rows(queue: asyncio.Queue, writer: RotatingWriter) -> None:
+    while True:
+        row = await queue.get()
+        writer.write(row)
+        queue.task_done()
+        if queue.empty():
+            writer.flush()
+
+
+async def report(stats: dict[str, CaptureStats], every: float) -> None:
+    started = time.monotonic()
+    while True:
+        await asyncio.sleep(every)
+        elapsed = time.monotonic() - started
+        for host, host_stats in stats.items():
+            print(
+                f"{host}: {host_stats.samples / elapsed:.2f} samples/s, "
+                f"{host_stats.dropped} dropped, {host_stats.errors} errors",
+                file=sys.stderr,
+            )
+
+
+async def capture(args: argparse.Namespace) -> dict[str, CaptureStats]:
+    queue: asyncio.Queue = asyncio.Queue(maxsize=args.queue_size)
+    writer = RotatingWriter(
+        args.format,
+        args.output,
+        int(args.rotate_mb * 1024 * 1024) if args.rotate_mb else None,
+        args.rotate_minutes * 60 if args.rotate_minutes else None,
+    )
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + args.duration if args.duration else None
+    stats: dict[str, CaptureStats] = {}
+
+    async with _SharedAsyncClient(verify=False) as client:
+        pollers = []
+        for target in args.panels:
+            host, _, token = target.partition("=")
+            api = SpanPanelApi(host, token or args.token, client)
+            stats[api.host] = CaptureStats()
+            pollers.append(
+                poll_panel(api, args.interval, queue, stats[api.host], deadline)
+            )
+
+        writer_task = asyncio.create_task(write_rows(queue, writer))
+        report_task = asyncio.create_task(report(stats, args.report))
+        try:
+            await asyncio.gather(*pollers)
+            await queue.join()
+        finally:
+            writer_task.cancel()
+            report_task.cancel()
+            writer.flush()
+            writer.close()
+            await client.aclose()
+
+    return stats
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("panels", nargs="+", metavar="HOST[=TOKEN]")
+    parser.add_argument("--token", help="access token for panels without one")
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds")
+    parser.add_argument("--duration", type=float, help="seconds, default forever")
+    parser.add_argument("--format", choices=("ndjson", "csv"), default="ndjson")
+    parser.add_argument("--output", help="file prefix, default stdout")
+    parser.add_argument("--rotate-mb", type=float)
+    parser.add_argument("--rotate-minutes", type=float)
+    parser.add_argument("--queue-size", type=int, default=10000)
+    parser.add_argument("--report", type=float, default=10.0, help="seconds")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    started = time.monotonic()
+    try:
+        stats = asyncio.run(capture(args))
+    except KeyboardInterrupt:
+        return 130
+
+    elapsed = time.monotonic() - started
+    for host, host_stats in stats.items():
+        print(
+            f"{host}: {host_stats.samples} samples "
+            f"({host_stats.samples / elapsed:.2f}/s), "
+            f"{host_stats.dropped} dropped, {host_stats.errors} errors",
+            file=sys.stderr,
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""
+Replay recorded panel traffic through the integration's parsers.
+
+    python scripts/replay.py recording.jsonl.gz \
+        --speed 10 --scan-interval 15
+
+Recordings come from the record_traffic service. Each one is served by
+SpanPanelReplayTransport to a SpanPanel that polls it as the coordinator
+would, so firmware changes that break parsing show up as failed updates.
+Without --speed updates run back to back, which makes a quick regression
+check; with it the recording plays against the clock and polls are
+--scan-interval / --speed real seconds apart, for performance runs on real
+data. Requests are not rate limited in either mode, so reported update
+times are parsing and update cost plus, with --speed, the recorded panel
+latency scaled by --speed.
+
+A JSON report per recording is printed. The exit status is 1 when any
+update failed.
+"""
+from __future__ import annotations
+
+import importlib.machinery
+import importlib.util
+import os
+import sys
+
+if "span_panel" not in sys.modules:
+    # The same way as capture.py.
+    _spec = importlib.machinery.ModuleSpec("span_panel", None, is_package=True)
+    _spec.submodule_search_locations = [
+        os.path.join(
+            os.path.dirname(os.path.abspath(__file__)),
+            os.pardir,
+            "custom_components",
+            "span_panel",
+        )
+    ]
+    sys.modules["span_panel"] = importlib.util.module_from_spec(_spec)
+
+import argparse
+import asyncio
+from collections import Counter
+import json
+import logging
+import time
+from typing import Any
+
+from capture import _SharedAsyncClient
+from span_panel.exceptions import SpanPanelReplayExhausted
+from span_panel.span_panel import SpanPanel
+from span_panel.span_panel_governor import UNLIMITED_RATE, SpanPanelGovernor
+from span_panel.span_panel_recording import SpanPanelReplayTransport
+
+_LOGGER = logging.getLogger(__name__)
+
+MAX_REPORTED_ERRORS = 10
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def replay(
+    path: str, speed: float | None, scan_interval: float
+) -> dict[str, Any]:
+    transport = SpanPanelReplayTransport(path, speed)
+    client = _SharedAsyncClient(transport=transport)
+    span_panel = SpanPanel(transport.header["host"], "replay", client)
+    # Neither mode is rate limited, so update times are parse and update cost
+    # (plus the recorded latency when playing against the clock).
+    span_panel.api.governor = SpanPanelGovernor(
+        rate=UNLIMITED_RATE, burst=int(UNLIMITED_RATE)
+    )
+    durations: list[float] = []
+    errors: Counter[str] = Counter()
+
+    try:
+        while True:
+            started = time.perf_counter()
+            try:
+                await span_panel.update()
+                span_panel.analytics
+            except SpanPanelReplayExhausted:
+                break
+            except Exception as err:  # report every kind of parse failure
+                errors[f"{type(err).__name__}: {err}"] += 1
+            durations.append(time.perf_counter() - started)
+            if speed is not None:
+                await asyncio.sleep(scan_interval / speed)
+    finally:
+        await client.aclose()
+
+    status = span_panel.status
+    return {
+        "recording": path,
+        "host": transport.header["host"],
+        "recorded_at": transport.header["started"],
+        "firmware": status.firmware_version if status is not None else None,
+        "updates": len(durations),
+        "failed_updates": sum(errors.values()),
+        "errors": dict(errors.most_common(MAX_REPORTED_ERRORS)),
+        "update_ms": {
+            name: round(_percentile(durations, fraction) * 1000, 2)
+            for name, fraction in (("p50", 0.5), ("p95", 0.95))
+        }
+        | {"max": round(max(durations, default=0.0) * 1000, 2)},
+    }
+
+
+async def replay_all(args: argparse.Namespace) -> list[dict[str, Any]]:
+    return [
+        await replay(path, args.speed, args.scan_interval)
+        for path in args.recordings
+    ]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("recordings", nargs="+", metavar="RECORDING")
+    parser.add_argument(
+        "--speed", type=float, help="times real time, default as fast as possible"
+    )
+    parser.add_argument("--scan-interval", type=float, default=15)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.ERROR, stream=sys.stderr)
+    reports = asyncio.run(replay_all(args))
+    json.dump(reports, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 1 if any(report["failed_updates"] for report in reports) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
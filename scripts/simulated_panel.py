@@ -0,0 +1,127 @@
+"""A simulated Span panel served over local HTTP, for soak.py and the tests."""
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import time
+from typing import Any
+
+
+class SimulatedPanel:
+    """
+    Serves status, panel and circuits documents whose power wanders and
+    whose energy counters integrate it over simulated time.
+    """
+
+    def __init__(self, serial: str, circuits: int) -> None:
+        self.serial = serial
+        self.now = time.time()
+        self.power = [-random.uniform(0, 1500) for _ in range(circuits)]
+        self.consumed = [0.0] * circuits
+        self.port: int | None = None
+        self._server: asyncio.AbstractServer | None = None
+
+    @property
+    def host(self) -> str:
+        return f"127.0.0.1:{self.port}"
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+        for index, power in enumerate(self.power):
+            self.consumed[index] += -power * seconds / 3600
+            self.power[index] = min(0.0, power + random.uniform(-50, 50))
+
+    def document(self, path: str) -> dict[str, Any] | None:
+        now_ms = int(self.now * 1000)
+        if path == "/api/v1/status":
+            return {
+                "software": {
+                    "firmwareVersion": "soak",
+                    "updateStatus": "idle",
+                    "env": "prod",
+                },
+                "system": {
+                    "manufacturer": "Span",
+                    "serial": self.serial,
+                    "model": "00200",
+                    "doorState": "CLOSED",
+                    "proximityProven": True,
+                    "uptime": 0,
+                },
+                "network": {"eth0Link": True, "wlanLink": False, "wwanLink": False},
+            }
+        if path == "/api/v1/panel":
+            return {
+                "mainRelayState": "CLOSED",
+                "mainMeterEnergy": {
+                    "producedEnergyWh": 0,
+                    "consumedEnergyWh": sum(self.consumed),
+                },
+                "instantGridPowerW": -sum(self.power),
+                "feedthroughPowerW": 0.0,
+                "feedthroughEnergy": {"producedEnergyWh": 0, "consumedEnergyWh": 0},
+                "gridSampleStartMs": now_ms - 1000,
+                "gridSampleEndMs": now_ms,
+                "dsmGridState": "DSM_GRID_UP",
+                "dsmState": "DSM_ON_GRID",
+                "currentRunConfig": "PANEL_ON_GRID",
+            }
+        if path == "/api/v1/circuits":
+            return {
+                "circuits": {
+                    f"c{index}": {
+                        "id": f"c{index}",
+                        "name": f"Circuit {index}",
+                        "relayState": "CLOSED",
+                        "instantPowerW": power,
+                        "instantPowerUpdateTimeS": int(self.now),
+                        "producedEnergyWh": 0.0,
+                        "consumedEnergyWh": self.consumed[index],
+                        "energyAccumUpdateTimeS": int(self.now),
+                        "tabs": [index + 1],
+                        "priority": "NICE_TO_HAVE",
+                        "isUserControllable": True,
+                        "isSheddable": False,
+                        "isNeverBackup": False,
+                    }
+                    for index, power in enumerate(self.power)
+                }
+            }
+        return None
+
+    async def start(self, port: int = 0) -> None:
+        self._server = await asyncio.start_server(self._serve, "127.0.0.1", port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def respond(self, path: str, writer: asyncio.StreamWriter) -> bool:
+        """Answer one request, returning whether to keep the connection."""
+        document = self.document(path)
+        status = b"200 OK" if document is not None else b"404 Not Found"
+        body = json.dumps(document or {}).encode()
+        writer.write(
+            b"HTTP/1.1 " + status + b"\r\nContent-Type: application/json"
+            b"\r\nContent-Length: " + str(len(body)).encode() + b"\r\n\r\n"
+            + body
+        )
+        await writer.drain()
+        return True
+
+    async def _serve(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Minimal HTTP/1.1 with keep-alive; request bodies are ignored."""
+        try:
+            while request := await reader.readuntil(b"\r\n\r\n"):
+                path = request.split(b" ", 2)[1].decode()
+                if not await self.respond(path, writer):
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
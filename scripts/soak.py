@@ -0,0 +1,240 @@
+"""
+Soak the integration's polling path against simulated panels.
+
+    python scripts/soak.py --panels 4 --circuits 40 \
+        --hours 24 --speedup 200
+
+Each simulated panel is a local HTTP server, so requests open real
+sockets. Every tick runs SpanPanel.update(), the same update path the
+coordinator runs, without the request governor's rate limit so the speedup
+is not capped by it. Time is accelerated: ticks are --scan-interval
+simulated seconds apart but only --scan-interval / --speedup real seconds.
+
+Home Assistant is not needed, and not used: the coordinator, its listeners
+and the entity platforms do not run. Each tick calls the library code they
+call instead (analytics, circuit group totals, anomaly detection, site
+totals, the metrics buffer and, with --archive, the sample archive).
+tests/test_soak.py soaks the real coordinator and entity platforms, so
+growth in Home Assistant's own objects, such as entity state writes, is
+measured there.
+
+Memory growth by allocation site (tracemalloc, after a warm-up), open
+sockets and event loop lag percentiles are reported as JSON. The exit
+status is 1 when any --max-* threshold is exceeded.
+"""
+from __future__ import annotations
+
+import importlib.machinery
+import importlib.util
+import os
+import sys
+
+if "span_panel" not in sys.modules:
+    # The same way as capture.py.
+    _spec = importlib.machinery.ModuleSpec("span_panel", None, is_package=True)
+    _spec.submodule_search_locations = [
+        os.path.join(
+            os.path.dirname(os.path.abspath(__file__)),
+            os.pardir,
+            "custom_components",
+            "span_panel",
+        )
+    ]
+    sys.modules["span_panel"] = importlib.util.module_from_spec(_spec)
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+import tracemalloc
+from typing import Any
+
+from capture import _SharedAsyncClient
+from simulated_panel import SimulatedPanel
+from span_panel.span_panel import SpanPanel
+from span_panel.span_panel_anomaly import SpanPanelAnomalyDetector
+from span_panel.span_panel_archive import SpanPanelArchive, archive_sample
+from span_panel.span_panel_governor import UNLIMITED_RATE, SpanPanelGovernor
+from span_panel.span_panel_metrics import SpanPanelMetrics
+from span_panel.span_panel_site import SpanPanelSite
+
+_LOGGER = logging.getLogger(__name__)
+
+LAG_PROBE_INTERVAL = 0.05
+TOP_ALLOCATION_SITES = 10
+
+
+def open_sockets() -> int | None:
+    """Sockets held by this process; Linux only."""
+    try:
+        fds = os.listdir("/proc/self/fd")
+    except OSError:
+        return None
+    count = 0
+    for fd in fds:
+        try:
+            count += os.readlink(f"/proc/self/fd/{fd}").startswith("socket:")
+        except OSError:
+            pass
+    return count
+
+
+async def probe_lag(lags: list[float]) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + LAG_PROBE_INTERVAL
+        await asyncio.sleep(LAG_PROBE_INTERVAL)
+        lags.append(max(0.0, loop.time() - expected))
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def soak(args: argparse.Namespace) -> dict[str, Any]:
+    simulated = [
+        SimulatedPanel(f"soak-{index}", args.circuits) for index in range(args.panels)
+    ]
+    for panel in simulated:
+        await panel.start()
+
+    client = None if args.client_per_request else _SharedAsyncClient()
+    panels = [SpanPanel(panel.host, "token", client) for panel in simulated]
+    for panel in panels:
+        panel.api.governor = SpanPanelGovernor(
+            rate=UNLIMITED_RATE, burst=int(UNLIMITED_RATE)
+        )
+        panel.groups = {"Even": [f"c{index}" for index in range(0, args.circuits, 2)]}
+    detectors = [SpanPanelAnomalyDetector() for _ in panels]
+    site = SpanPanelSite()
+    metrics = SpanPanelMetrics()
+    archives = []
+    if args.archive:
+        for panel in simulated:
+            archive = SpanPanelArchive(os.path.join(args.archive, panel.serial))
+            archive.open(panel.now)
+            archives.append(archive)
+
+    ticks = int(args.hours * 3600 / args.scan_interval)
+    warmup = max(1, ticks // 10)
+    lags: list[float] = []
+    lag_task = asyncio.get_running_loop().create_task(probe_lag(lags))
+    baseline = None
+    sockets = []
+    errors = 0
+    started = time.monotonic()
+
+    for tick in range(ticks):
+        if tick == warmup:
+            baseline = tracemalloc.take_snapshot()
+            lags.clear()
+
+        for simulation in simulated:
+            simulation.advance(args.scan_interval)
+        results = await asyncio.gather(
+            *(panel.update(args.scan_interval) for panel in panels),
+            return_exceptions=True,
+        )
+        for index, (panel, result) in enumerate(zip(panels, results)):
+            if isinstance(result, Exception):
+                errors += 1
+                continue
+            simulation = simulated[index]
+            serial = panel.status.serial_number
+            panel.analytics
+            panel.group_totals
+            detectors[index].update(
+                panel.circuits, simulation.now % 86400, simulation.now
+            )
+            if serial not in site.members:
+                site.add(serial, None)
+            site.update(serial, panel.panel, simulation.now)
+            metrics.update(serial, panel.panel, panel.circuits)
+            if archives:
+                archives[index].append(
+                    simulation.now, archive_sample(panel.panel, panel.circuits)
+                )
+        metrics.exposition
+        sockets.append(open_sockets())
+        await asyncio.sleep(args.scan_interval / args.speedup)
+
+    lag_task.cancel()
+    growth = tracemalloc.take_snapshot().compare_to(baseline, "lineno")
+    for archive in archives:
+        archive.close()
+    if client is not None:
+        await client.aclose()
+    for panel in simulated:
+        await panel.stop()
+
+    known_sockets = [count for count in sockets if count is not None]
+    return {
+        "ticks": ticks,
+        "simulated_hours": args.hours,
+        "wall_seconds": round(time.monotonic() - started, 1),
+        "errors": errors,
+        "memory_growth_kb": round(sum(stat.size_diff for stat in growth) / 1024, 1),
+        "top_growth": [
+            {"site": str(stat.traceback), "kb": round(stat.size_diff / 1024, 1)}
+            for stat in growth[:TOP_ALLOCATION_SITES]
+        ],
+        "sockets_max": max(known_sockets) if known_sockets else None,
+        "sockets_last": known_sockets[-1] if known_sockets else None,
+        "lag_ms": {
+            name: round(percentile(lags, fraction) * 1000, 2)
+            for name, fraction in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))
+        }
+        | {"max": round(max(lags, default=0.0) * 1000, 2)},
+    }
+
+
+def failures(report: dict[str, Any], args: argparse.Namespace) -> list[str]:
+    found = []
+    if report["memory_growth_kb"] > args.max_growth_kb:
+        found.append(f"memory grew {report['memory_growth_kb']} KiB")
+    if report["sockets_max"] is not None and report["sockets_max"] > args.max_sockets:
+        found.append(f"{report['sockets_max']} sockets open")
+    if report["lag_ms"]["p99"] > args.max_lag_ms:
+        found.append(f"p99 loop lag {report['lag_ms']['p99']} ms")
+    if report["errors"]:
+        found.append(f"{report['errors']} failed updates")
+    return found
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__.split("\n\n")[0].strip(),
+        epilog="Runs the library update path without Home Assistant; "
+        "tests/test_soak.py soaks the coordinator and entity platforms.",
+    )
+    parser.add_argument("--panels", type=int, default=1)
+    parser.add_argument("--circuits", type=int, default=40)
+    parser.add_argument("--hours", type=float, default=24)
+    parser.add_argument("--scan-interval", type=float, default=15)
+    parser.add_argument("--speedup", type=float, default=100)
+    parser.add_argument("--archive", help="directory for a sample archive")
+    parser.add_argument(
+        "--client-per-request",
+        action="store_true",
+        help="let SpanPanelApi create a client per request instead of sharing one",
+    )
+    parser.add_argument("--max-growth-kb", type=float, default=1024)
+    parser.add_argument("--max-sockets", type=int, default=64)
+    parser.add_argument("--max-lag-ms", type=float, default=100)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    tracemalloc.start()
+    report = asyncio.run(soak(args))
+    report["failures"] = failures(report, args)
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 1 if report["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
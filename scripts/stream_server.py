@@ -0,0 +1,245 @@
+"""
+Serve a stand-in panel event stream, to exercise SpanPanelStream.
+
+    python scripts/stream_server.py --port 8080 \
+        --interval 1 --keepalive 15 --drop-after 120
+
+    python scripts/stream_server.py --check 60 \
+        --drop-after 10 --malformed
+
+The server is a simulated panel, as in soak.py, that also answers URL_STREAM with
+server-sent events: full status, panel and circuits documents on connect,
+then a panel event and one circuit event per circuit every --interval
+seconds. A keepalive comment is sent every --keepalive seconds (0 disables
+them, so the client's idle timeout fires instead), the connection is dropped
+after --drop-after seconds, and with --malformed each connection also
+carries one circuit event the parser rejects.
+
+With --check the server runs for that many seconds against a SpanPanel that
+streams from it and polls every --scan-interval seconds as the coordinator
+would. A JSON report of connections, events, updates, polls and the longest
+gap between updates is printed; the exit status is 1 when the stream never
+reconnected after a drop or the panel went longer than --max-gap without an
+update.
+"""
+from __future__ import annotations
+
+import importlib.machinery
+import importlib.util
+import os
+import sys
+
+if "span_panel" not in sys.modules:
+    # The same way as capture.py.
+    _spec = importlib.machinery.ModuleSpec("span_panel", None, is_package=True)
+    _spec.submodule_search_locations = [
+        os.path.join(
+            os.path.dirname(os.path.abspath(__file__)),
+            os.pardir,
+            "custom_components",
+            "span_panel",
+        )
+    ]
+    sys.modules["span_panel"] = importlib.util.module_from_spec(_spec)
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+from typing import Any
+
+from capture import _SharedAsyncClient
+from simulated_panel import SimulatedPanel
+from span_panel.const import URL_STREAM
+from span_panel.span_panel import SpanPanel
+from span_panel.span_panel_stream import (
+    STREAM_EVENT_CIRCUIT,
+    STREAM_EVENT_CIRCUITS,
+    STREAM_EVENT_PANEL,
+    STREAM_EVENT_STATUS,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+STREAM_PATH = URL_STREAM.format("").removeprefix("http://")
+
+
+class StreamingPanel(SimulatedPanel):
+    """A simulated panel that also serves an event stream."""
+
+    def __init__(
+        self,
+        serial: str,
+        circuits: int,
+        interval: float,
+        keepalive: float,
+        drop_after: float | None,
+        malformed: bool,
+    ) -> None:
+        super().__init__(serial, circuits)
+        self.interval = interval
+        self.keepalive = keepalive
+        self.drop_after = drop_after
+        self.malformed = malformed
+        self.connections = 0
+        self.events = 0
+        self.keepalives = 0
+        self.polls = 0
+
+    async def respond(self, path: str, writer: asyncio.StreamWriter) -> bool:
+        if path != STREAM_PATH:
+            self.polls += 1
+            return await super().respond(path, writer)
+        self.connections += 1
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream"
+            b"\r\nCache-Control: no-cache\r\nConnection: close\r\n\r\n"
+        )
+        try:
+            await self._stream(writer)
+        except asyncio.CancelledError:
+            pass  # the server is shutting down with the stream still open
+        return False
+
+    async def _stream(self, writer: asyncio.StreamWriter) -> None:
+        loop = asyncio.get_running_loop()
+        connected = loop.time()
+        for event, path in (
+            (STREAM_EVENT_STATUS, "/api/v1/status"),
+            (STREAM_EVENT_PANEL, "/api/v1/panel"),
+            (STREAM_EVENT_CIRCUITS, "/api/v1/circuits"),
+        ):
+            self._send(writer, event, self.document(path))
+        if self.malformed:
+            # A list where an object belongs: a TypeError in the parser.
+            self._send(writer, STREAM_EVENT_CIRCUIT, ["malformed"])
+        await writer.drain()
+
+        next_tick = next_keepalive = connected
+        while self.drop_after is None or loop.time() - connected < self.drop_after:
+            now = loop.time()
+            if now >= next_tick:
+                self.advance(self.interval)
+                self._send(writer, STREAM_EVENT_PANEL, self.document("/api/v1/panel"))
+                for circuit in self.document("/api/v1/circuits")["circuits"].values():
+                    self._send(writer, STREAM_EVENT_CIRCUIT, circuit)
+                next_tick += self.interval
+            if self.keepalive and now >= next_keepalive:
+                writer.write(b":keepalive\n\n")
+                self.keepalives += 1
+                next_keepalive += self.keepalive
+            await writer.drain()
+            wake = min(next_tick, next_keepalive) if self.keepalive else next_tick
+            await asyncio.sleep(max(0.0, wake - loop.time()))
+
+    def _send(
+        self, writer: asyncio.StreamWriter, event: str, payload: Any
+    ) -> None:
+        writer.write(
+            f"event: {event}\ndata: {json.dumps(payload)}\n\n".encode()
+        )
+        self.events += 1
+
+
+async def check(panel: StreamingPanel, args: argparse.Namespace) -> dict[str, Any]:
+    """Stream from the server for args.check seconds, polling as HA would."""
+    client = _SharedAsyncClient()
+    span_panel = SpanPanel(panel.host, "token", client)
+    update_times: list[float] = []
+    polls_skipped = 0
+
+    def _on_update() -> None:
+        update_times.append(time.monotonic())
+
+    span_panel.start_stream(_on_update)
+    started = time.monotonic()
+    try:
+        while time.monotonic() - started < args.check:
+            live = span_panel.stream.is_live
+            try:
+                await span_panel.update(args.scan_interval)
+            except Exception as err:  # report, and keep polling as HA would
+                _LOGGER.warning("Poll failed: %s", err)
+            else:
+                if live:
+                    polls_skipped += 1
+                else:
+                    update_times.append(time.monotonic())
+            await asyncio.sleep(args.scan_interval)
+    finally:
+        span_panel.stop_stream()
+        await client.aclose()
+
+    gaps = [
+        later - earlier
+        for earlier, later in zip([started, *update_times], update_times)
+    ]
+    return {
+        "seconds": args.check,
+        "connections": panel.connections,
+        "events_sent": panel.events,
+        "keepalives_sent": panel.keepalives,
+        "polls_served": panel.polls,
+        "polls_skipped": polls_skipped,
+        "updates": len(update_times),
+        "max_gap_s": round(max(gaps, default=float(args.check)), 2),
+    }
+
+
+def failures(report: dict[str, Any], args: argparse.Namespace) -> list[str]:
+    found = []
+    if args.drop_after is not None and args.check > args.drop_after * 2:
+        if report["connections"] < 2:
+            found.append("the stream never reconnected")
+    if report["max_gap_s"] > args.max_gap:
+        found.append(f"{report['max_gap_s']} s without an update")
+    return found
+
+
+async def serve(args: argparse.Namespace) -> int:
+    panel = StreamingPanel(
+        "stream-0",
+        args.circuits,
+        args.interval,
+        args.keepalive,
+        args.drop_after,
+        args.malformed,
+    )
+    await panel.start(args.port if args.check is None else 0)
+    try:
+        if args.check is None:
+            _LOGGER.warning("Serving %s on %s", STREAM_PATH, panel.host)
+            await asyncio.Event().wait()
+        report = await check(panel, args)
+    finally:
+        await panel.stop()
+
+    report["failures"] = failures(report, args)
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 1 if report["failures"] else 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--circuits", type=int, default=16)
+    parser.add_argument("--interval", type=float, default=1)
+    parser.add_argument("--keepalive", type=float, default=15)
+    parser.add_argument("--drop-after", type=float, help="seconds per connection")
+    parser.add_argument("--malformed", action="store_true")
+    parser.add_argument("--check", type=float, help="seconds to run a client for")
+    parser.add_argument("--scan-interval", type=float, default=15)
+    parser.add_argument("--max-gap", type=float, default=30)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    try:
+        return asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
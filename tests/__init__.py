@@ -0,0 +1 @@
+"""Tests for the Span Panel integration."""
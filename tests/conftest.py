@@ -0,0 +1,13 @@
+"""Fixtures for the Span Panel tests."""
+import os
+import sys
+
+import pytest
+
+# The simulated panel is shared with the scripts.
+sys.path.append(os.path.join(os.path.dirname(__file__), os.pardir, "scripts"))
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations):
+    yield
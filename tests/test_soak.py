@@ -0,0 +1,119 @@
+"""
+Soak the coordinator and entity platforms against a simulated panel.
+
+scripts/soak.py soaks the library update path on its own; this drives the
+real DataUpdateCoordinator, its listeners and the binary_sensor, select,
+sensor and switch entities, so growth in Home Assistant's own objects is
+measured too. Every tick advances the simulated panel by one scan interval
+and refreshes the coordinator, without the governor's rate limit.
+
+SPAN_SOAK_TICKS and SPAN_SOAK_MAX_GROWTH_KB lengthen the run or change the
+memory budget:
+
+    SPAN_SOAK_TICKS=5760 pytest tests/test_soak.py
+"""
+import os
+import tracemalloc
+
+from homeassistant.const import CONF_ACCESS_TOKEN, CONF_HOST, EVENT_STATE_CHANGED
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import entity_registry as er
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from simulated_panel import SimulatedPanel
+
+from custom_components.span_panel.const import (
+    CONF_CIRCUIT_GROUPS,
+    CONF_SITE_TOTALS,
+    COORDINATOR,
+    DEFAULT_SCAN_INTERVAL,
+    DOMAIN,
+)
+from custom_components.span_panel.span_panel_governor import (
+    UNLIMITED_RATE,
+    SpanPanelGovernor,
+)
+
+SOAK_TICKS = int(os.environ.get("SPAN_SOAK_TICKS", 400))
+SOAK_MAX_GROWTH_KB = float(os.environ.get("SPAN_SOAK_MAX_GROWTH_KB", 1024))
+SOAK_CIRCUITS = 16
+# Sockets that may open after the warm-up, for instance a pooled connection.
+SOAK_SOCKET_SLACK = 2
+
+
+def open_sockets() -> int:
+    """Sockets held by this process; Linux only."""
+    count = 0
+    for fd in os.listdir("/proc/self/fd"):
+        try:
+            count += os.readlink(f"/proc/self/fd/{fd}").startswith("socket:")
+        except OSError:
+            pass
+    return count
+
+
+async def test_soak(hass: HomeAssistant, socket_enabled) -> None:
+    panel = SimulatedPanel("soak-0", SOAK_CIRCUITS)
+    await panel.start()
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        unique_id=panel.serial,
+        data={CONF_HOST: panel.host, CONF_ACCESS_TOKEN: "token"},
+        options={
+            CONF_SITE_TOTALS: True,
+            CONF_CIRCUIT_GROUPS: {
+                "Even": [f"c{index}" for index in range(0, SOAK_CIRCUITS, 2)]
+            },
+        },
+    )
+    entry.add_to_hass(hass)
+    try:
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+        domains = {
+            entity.domain
+            for entity in er.async_entries_for_config_entry(
+                er.async_get(hass), entry.entry_id
+            )
+        }
+        assert {"binary_sensor", "select", "sensor", "switch"} <= domains
+
+        coordinator = hass.data[DOMAIN][entry.entry_id][COORDINATOR]
+        coordinator.data.api.governor = SpanPanelGovernor(
+            rate=UNLIMITED_RATE, burst=int(UNLIMITED_RATE)
+        )
+        state_changes = 0
+
+        @callback
+        def _count_state_change(_event) -> None:
+            nonlocal state_changes
+            state_changes += 1
+
+        unsub = hass.bus.async_listen(EVENT_STATE_CHANGED, _count_state_change)
+        warmup = max(1, SOAK_TICKS // 10)
+        tracemalloc.start()
+        try:
+            for tick in range(SOAK_TICKS):
+                if tick == warmup:
+                    baseline = tracemalloc.take_snapshot()
+                    sockets = open_sockets()
+                panel.advance(DEFAULT_SCAN_INTERVAL.total_seconds())
+                await coordinator.async_refresh()
+                await hass.async_block_till_done()
+                assert coordinator.last_update_success, f"tick {tick} failed"
+            growth = tracemalloc.take_snapshot().compare_to(baseline, "lineno")
+        finally:
+            tracemalloc.stop()
+            unsub()
+
+        # Circuit power wanders every tick, so entities must have written state.
+        assert state_changes >= SOAK_TICKS
+        growth_kb = sum(stat.size_diff for stat in growth) / 1024
+        top = "\n".join(str(stat) for stat in growth[:10])
+        assert growth_kb <= SOAK_MAX_GROWTH_KB, f"grew {growth_kb:.1f} KiB:\n{top}"
+        assert open_sockets() <= sockets + SOAK_SOCKET_SLACK
+
+        assert await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
+    finally:
+        await panel.stop()